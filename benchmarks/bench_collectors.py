@@ -0,0 +1,63 @@
+"""Compare per-scan latency of the collector backends over synthetic process tables.
+
+Run with ``python -m benchmarks.bench_collectors``. Both backends read the same
+synthetic procfs tree, psutil through ``psutil.PROCFS_PATH``. A cold scan
+inspects every process; a warm scan only re-lists an unchanged table.
+"""
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+from __future__ import annotations
+
+import argparse
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import psutil
+
+from benchmarks.synthetic import build_executables, build_proc_tree
+from procmond.core.collector import CollectorBackend, ProcessCollector, ProcfsBackend, PsutilBackend
+
+DEFAULT_SIZES = (1_000, 5_000, 20_000)
+
+
+def time_scans(backend: CollectorBackend, repeat: int) -> tuple[float, float]:
+    """Return the best cold-scan and warm-scan latency of a backend, in milliseconds."""
+    cold = warm = float("inf")
+    for _ in range(repeat):
+        if hasattr(psutil.process_iter, "cache_clear"):
+            psutil.process_iter.cache_clear()
+        collector = ProcessCollector(backend)
+        start = perf_counter()
+        collector.scan()
+        cold = min(cold, perf_counter() - start)
+        start = perf_counter()
+        collector.scan()
+        warm = min(warm, perf_counter() - start)
+    return cold * 1000, warm * 1000
+
+
+def main() -> None:
+    """Run the collector benchmark and print a latency table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="process counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'processes':>10} {'backend':>8} {'cold ms':>10} {'warm ms':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            executables = build_executables(Path(tmp), 200, size=16)
+            proc_root = build_proc_tree(Path(tmp), size, executables)
+            psutil.PROCFS_PATH = str(proc_root)
+            try:
+                for backend in (PsutilBackend(), ProcfsBackend(str(proc_root))):
+                    cold, warm = time_scans(backend, args.repeat)
+                    print(f"{size:>10} {backend.name:>8} {cold:>10.1f} {warm:>10.1f}")
+            finally:
+                psutil.PROCFS_PATH = "/proc"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measure how sharding a scan across worker processes scales with the number of workers.
+
+Run with ``python -m benchmarks.bench_sharded``. Each configuration scans the
+same synthetic procfs tree with the procfs backend: once in a single process,
+then sharded across 2, 4, 8... workers, up to the number of CPUs. The worker
+pool is started before timing. A cold scan inspects every process; a warm
+scan re-lists an unchanged table. Speedups are relative to the single-process
+scan, and are only meaningful on a host with at least as many idle cores as
+workers.
+"""
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+from functools import partial
+from pathlib import Path
+from time import perf_counter
+
+from benchmarks.synthetic import build_executables, build_proc_tree
+from procmond.core.collector import CollectorBackend, ProcessCollector, ProcfsBackend, ShardedBackend
+
+DEFAULT_SIZES = (10_000, 50_000)
+
+
+def default_workers() -> list[int]:
+    """Return 2, 4, 8... up to the number of CPUs."""
+    cpus = os.cpu_count() or 1
+    workers = []
+    count = 2
+    while count <= cpus:
+        workers.append(count)
+        count *= 2
+    return workers or [2]
+
+
+def time_scans(backend: CollectorBackend, repeat: int) -> tuple[float, float]:
+    """Return the best cold-scan and warm-scan latency of a backend, in milliseconds."""
+    ProcessCollector(backend).scan()
+    cold = warm = float("inf")
+    for _ in range(repeat):
+        collector = ProcessCollector(backend)
+        start = perf_counter()
+        collector.scan()
+        cold = min(cold, perf_counter() - start)
+        start = perf_counter()
+        collector.scan()
+        warm = min(warm, perf_counter() - start)
+    return cold * 1000, warm * 1000
+
+
+def main() -> None:
+    """Run the sharding benchmark and print a latency and speedup table."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="process counts to benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers(), help="worker counts to try")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'processes':>10} {'workers':>8} {'cold ms':>10} {'speedup':>8} {'warm ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            executables = build_executables(Path(tmp), 200, size=16)
+            proc_root = str(build_proc_tree(Path(tmp), size, executables))
+            base_cold, base_warm = time_scans(ProcfsBackend(proc_root), args.repeat)
+            print(f"{size:>10} {1:>8} {base_cold:>10.1f} {1:>8.2f} {base_warm:>10.1f} {1:>8.2f}")
+            for workers in args.workers:
+                backend = ShardedBackend(partial(ProcfsBackend, proc_root), workers)
+                try:
+                    cold, warm = time_scans(backend, args.repeat)
+                finally:
+                    backend.close()
+                print(
+                    f"{size:>10} {workers:>8} {cold:>10.1f} {base_cold / cold:>8.2f} "
+                    f"{warm:>10.1f} {base_warm / warm:>8.2f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
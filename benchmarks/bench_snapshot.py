@@ -0,0 +1,76 @@
+"""Compare the memory held by a scan's process records with a ProcessSnapshot of them.
+
+Run with ``python -m benchmarks.bench_snapshot``. Memory is measured with
+tracemalloc and reported per 10k processes, for process tables that share a
+few hundred executables, as a real system does.
+"""
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+from __future__ import annotations
+
+import argparse
+import hashlib
+import tracemalloc
+from copy import copy
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from procmond.models.process_record import ProcessRecord
+from procmond.models.process_snapshot import ProcessSnapshot
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+DEFAULT_SIZES = (10_000, 50_000)
+EXECUTABLES = 200
+PER_PROCESSES = 10_000
+
+
+def build_records(count: int) -> list[ProcessRecord]:
+    """Return ``count`` hashed process records sharing ``EXECUTABLES`` paths."""
+    digests = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(EXECUTABLES)]
+    records = []
+    for pid in range(1, count + 1):
+        record = ProcessRecord(pid)
+        record.name = f"worker{pid % EXECUTABLES}"
+        record.ppid = 1
+        record.create_time = 1_700_000_000.0 + pid
+        record.path = f"/usr/bin/worker{pid % EXECUTABLES}"
+        record.hash = digests[pid % EXECUTABLES]
+        records.append(record)
+    return records
+
+
+def measure(build: Callable[[], object]) -> tuple[int, float]:
+    """Return the bytes still allocated by ``build``'s result, and the seconds it took."""
+    tracemalloc.start()
+    start = perf_counter()
+    result = build()
+    elapsed = perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return size, elapsed
+
+
+def main() -> None:
+    """Run the snapshot benchmark and print a memory table."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="process counts to benchmark")
+    args = parser.parse_args()
+
+    print(f"{'processes':>10} {'container':>10} {'KiB/10k':>10} {'build ms':>10}")
+    for size in args.sizes:
+        records = build_records(size)
+        containers: dict[str, Callable[[], object]] = {
+            "records": lambda records=records: [copy(record) for record in records],
+            "snapshot": lambda records=records: ProcessSnapshot.from_records(records),
+        }
+        for name, build in containers.items():
+            used, elapsed = measure(build)
+            print(f"{size:>10} {name:>10} {used / 1024 * PER_PROCESSES / size:>10.0f} {elapsed * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
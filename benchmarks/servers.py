@@ -0,0 +1,77 @@
+"""Local stand-in HTTP and SMTP servers for benchmarking the alert handlers."""
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from socketserver import BaseServer
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    """Accepts every POST with a 200 response, over keep-alive connections."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        """Read and acknowledge a webhook call."""
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Keep the benchmark output clean."""
+
+
+class SMTPRequestHandler(StreamRequestHandler):
+    """Accepts every message, speaking just enough SMTP for smtplib."""
+
+    def handle(self) -> None:
+        """Answer SMTP commands until the client quits."""
+        self.wfile.write(b"220 localhost ESMTP\r\n")
+        for line in self.rfile:
+            command = line.split()[0].upper() if line.strip() else b""
+            if command == b"DATA":
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            self.wfile.write(b"250 OK\r\n")
+
+
+class SMTPServer(ThreadingTCPServer):
+    """A threaded stand-in SMTP server."""
+
+    daemon_threads = True
+
+
+@contextmanager
+def serving(server: BaseServer) -> Iterator[BaseServer]:
+    """Run ``server`` on a background thread until the block exits."""
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def webhook_server() -> ThreadingHTTPServer:
+    """Return a stand-in webhook server on a free local port."""
+    return ThreadingHTTPServer(("127.0.0.1", 0), WebhookRequestHandler)
+
+
+def smtp_server() -> SMTPServer:
+    """Return a stand-in SMTP server on a free local port."""
+    return SMTPServer(("127.0.0.1", 0), SMTPRequestHandler)
@@ -0,0 +1,214 @@
+"""Benchmark the daemon's scan cycle and alert handlers, and check the results against a baseline.
+
+Run with ``python -m benchmarks.suite``. For each process table size, a
+synthetic collector backend drives the daemon's own ``get_processes``,
+``store_records`` and ``check_alerts`` through several cycles, with a fraction
+of the processes replaced, executables rewritten, and names shared between
+executables on every cycle. The database starts with weeks of history. The
+alert handlers are timed against local stand-in webhook and SMTP servers.
+
+The median time of each step is written as JSON. If a baseline is given, any
+step that has become slower than the baseline by more than the tolerance fails
+the run. Refresh the baseline with ``--update-baseline`` after an intended
+change, on the machine the comparison will run on.
+"""
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from statistics import median
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from benchmarks.servers import serving, smtp_server, webhook_server
+from benchmarks.synthetic import SyntheticBackend, build_executables, populate_history
+from procmond import daemon
+from procmond.core.alert_state import AlertState
+from procmond.core.collector import ProcessCollector
+from procmond.core.detector_engine import DetectorEngine
+from procmond.core.hash_cache import HashCache
+from procmond.core.hashing import HashingEngine
+from procmond.core.storage import ProcessStore
+from procmond.models.alert import Alert
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+DEFAULT_SIZES = (1_000, 10_000)
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+# Steps faster than this are too noisy to fail a run on their relative change alone.
+MIN_REGRESSION_MS = 2.0
+# Arguments that don't affect the results, and are left out of the report.
+REPORT_EXCLUDES = {"output", "baseline", "tolerance", "update_baseline"}
+
+
+def timed(func: Callable[[], Any]) -> float:
+    """Return the time ``func`` took, in milliseconds, with garbage collection paused as timeit does."""
+    gc.collect()
+    gc.disable()
+    try:
+        start = perf_counter()
+        func()
+        return (perf_counter() - start) * 1000
+    finally:
+        gc.enable()
+
+
+def bench_cycle(size: int, args: argparse.Namespace, results: dict[str, float]) -> None:
+    """Time each step of the scan cycle over a synthetic table of ``size`` processes."""
+    with tempfile.TemporaryDirectory() as tmp:
+        executables = build_executables(Path(tmp), args.executables, size=16 * 1024)
+        backend = SyntheticBackend(
+            executables,
+            size,
+            churn=args.churn,
+            hash_change=args.hash_change,
+            duplicate_name=args.duplicate_name,
+        )
+        cache = HashCache(args.executables * 2)
+        daemon.collector = ProcessCollector(backend)
+        daemon.hashing_engine = HashingEngine(cache)
+        daemon.store = ProcessStore(str(Path(tmp, "procmond.db")), hash_cache=cache)
+        daemon.detector_engine = DetectorEngine()
+        daemon.alert_state = AlertState()
+        daemon.store.open()
+        try:
+            # A cold scan inspects every process; time it with throwaway collectors, then scan for real.
+            cold = [timed(ProcessCollector(backend).scan) for _ in range(args.cycles)]
+            results[f"get_processes.cold[{size}]"] = median(cold)
+            records = daemon.get_processes()
+            daemon.hashing_engine.hash_records(records)
+            populate_history(daemon.store, records, args.history_weeks, timedelta(hours=args.history_interval))
+            daemon.detector_engine.rebuild(daemon.store.conn)
+
+            steps: dict[str, list[float]] = {
+                "get_processes": [],
+                "hash_records": [],
+                "store_records": [],
+                "check_alerts": [],
+            }
+            for _ in range(args.cycles):
+                backend.advance()
+                steps["get_processes"].append(timed(daemon.get_processes))
+                diff = daemon.collector.last_diff
+                if diff is None:
+                    msg = "get_processes did not record a scan."
+                    raise RuntimeError(msg)
+                current = diff.current
+                steps["hash_records"].append(
+                    timed(lambda current=current: daemon.hashing_engine.hash_records(current))
+                )
+                steps["store_records"].append(timed(lambda current=current: daemon.store_records(current)))
+                steps["check_alerts"].append(timed(daemon.check_alerts))
+            for step, times in steps.items():
+                results[f"{step}[{size}]"] = median(times)
+        finally:
+            daemon.store.close()
+            daemon.hashing_engine.close()
+
+
+def bench_handlers(args: argparse.Namespace, results: dict[str, float]) -> None:
+    """Time each alert handler delivering a batch of alerts."""
+    from procmond.handlers.email_alert_handler import email_alert_handler  # noqa: PLC0415
+    from procmond.handlers.syslog_alert_handler import syslog_alert_handler  # noqa: PLC0415
+    from procmond.handlers.webhook_alert_handler import webhook_alert_handler  # noqa: PLC0415
+
+    alerts = [
+        Alert(pid=pid, name="evil", path="/usr/local/bin/evil", message="Process does not have executable on disk.")
+        for pid in range(args.alerts)
+    ]
+    http = webhook_server()
+    smtp = smtp_server()
+    with serving(http), serving(smtp):
+        daemon.config.webhook_address = f"http://127.0.0.1:{http.server_port}/hook"
+        daemon.config.email_config.update(
+            subject_prefix="benchmark",
+            smtp_server_address="127.0.0.1",
+            smtp_server_port=smtp.server_address[1],
+            smtp_server_username="",
+            smtp_server_password="",
+            sender_address="root@localhost",
+            destination_address="root@localhost",
+            smtp_server_use_ssl=False,
+        )
+        handlers = {"syslog": syslog_alert_handler, "webhook": webhook_alert_handler, "email": email_alert_handler}
+        for name, handler in handlers.items():
+            times = [timed(lambda handler=handler: handler(alerts)) for _ in range(args.cycles)]
+            results[f"{name}_alert_handler[{args.alerts}]"] = median(times)
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Print each result against its baseline, and return the names of the steps that regressed."""
+    regressions = []
+    print(f"{'step':<32} {'ms':>10} {'baseline':>10} {'change':>8}")
+    for step, elapsed in results.items():
+        base = baseline.get(step)
+        if base is None:
+            print(f"{step:<32} {elapsed:>10.1f} {'-':>10} {'-':>8}")
+            continue
+        change = (elapsed - base) / base if base else 0.0
+        regressed = elapsed > base * (1 + tolerance) and elapsed - base > MIN_REGRESSION_MS
+        flag = "  REGRESSED" if regressed else ""
+        print(f"{step:<32} {elapsed:>10.1f} {base:>10.1f} {change:>+8.0%}{flag}")
+        if regressed:
+            regressions.append(step)
+    return regressions
+
+
+def main() -> None:
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="process counts to benchmark")
+    parser.add_argument("--cycles", type=int, default=10, help="scan cycles per size; the median is reported")
+    parser.add_argument("--executables", type=int, default=200, help="distinct executables shared by the processes")
+    parser.add_argument("--churn", type=float, default=0.02, help="fraction of processes replaced each cycle")
+    parser.add_argument("--hash-change", type=float, default=0.01, help="fraction of executables rewritten each cycle")
+    parser.add_argument("--duplicate-name", type=float, default=0.01, help="fraction of processes with a shared name")
+    parser.add_argument("--history-weeks", type=float, default=2, help="weeks of history in the database")
+    parser.add_argument("--history-interval", type=float, default=6, help="hours between historical scans")
+    parser.add_argument("--alerts", type=int, default=100, help="alerts per handler call")
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE, help="baseline results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed slowdown over the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args()
+
+    daemon.configure()
+    results: dict[str, float] = {}
+    for size in args.sizes:
+        bench_cycle(size, args, results)
+    bench_handlers(args, results)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in REPORT_EXCLUDES},
+        "results": results,
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"Wrote baseline to {args.baseline}")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if baseline and baseline["parameters"] != report["parameters"]:
+        print(f"The baseline in {args.baseline} was run with different parameters; not comparing.")
+        baseline = {}
+    regressions = compare(results, baseline.get("results", {}), args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} steps regressed by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
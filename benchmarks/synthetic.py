@@ -0,0 +1,144 @@
+"""Synthetic process tables for ProcMonD benchmarks."""
+
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+from __future__ import annotations
+
+import random
+from datetime import UTC, datetime, timedelta
+from typing import TYPE_CHECKING, ClassVar
+
+from procmond.core.collector import CollectorBackend, ProcessEntry
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from pathlib import Path
+
+    from procmond.core.storage import ProcessStore
+    from procmond.models.process_record import ProcessRecord
+
+BOOT_TIME = 1_700_000_000
+DEFAULT_HISTORY_INTERVAL = timedelta(hours=6)
+
+
+def build_executables(root: Path, count: int, size: int = 64 * 1024) -> list[Path]:
+    """Write ``count`` distinct fake executables of ``size`` bytes under ``root``."""
+    bin_dir = root / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    executables = []
+    for i in range(count):
+        exe = bin_dir / f"worker{i}"
+        exe.write_bytes(i.to_bytes(4, "little") * (size // 4))
+        executables.append(exe)
+    return executables
+
+
+def write_proc_entry(proc_root: Path, pid: int, name: str, exe: Path | None, start_ticks: int) -> None:
+    """Write a ``/proc/<pid>`` directory with a stat file and, if given, an exe link."""
+    pid_dir = proc_root / str(pid)
+    pid_dir.mkdir()
+    # Fields 3 onwards of /proc/<pid>/stat: state, ppid, then starttime at field 22.
+    fields = ["S", "1", *["0"] * 17, str(start_ticks), *["0"] * 30]
+    (pid_dir / "stat").write_text(f"{pid} ({name}) {' '.join(fields)}\n")
+    if exe is not None:
+        (pid_dir / "exe").symlink_to(exe)
+
+
+def build_proc_tree(root: Path, process_count: int, executables: list[Path]) -> Path:
+    """Build a fake procfs with ``process_count`` processes sharing ``executables``.
+
+    The tree is readable by both the procfs backend and psutil (via ``psutil.PROCFS_PATH``).
+    """
+    proc_root = root / "proc"
+    proc_root.mkdir(parents=True)
+    (proc_root / "stat").write_text(f"cpu 0 0 0 0 0 0 0 0 0 0\nbtime {BOOT_TIME}\n")
+    for pid in range(1, process_count + 1):
+        exe = executables[pid % len(executables)]
+        write_proc_entry(proc_root, pid, exe.name, exe, start_ticks=pid)
+    return proc_root
+
+
+class SyntheticBackend(CollectorBackend):
+    """A collector backend over an in-memory process table that changes a little between scans.
+
+    Every process runs one of a set of real executables, so hashing and file probes do real I/O.
+    """
+
+    name: ClassVar[str] = "synthetic"
+
+    def __init__(  # noqa: PLR0913
+        self,
+        executables: list[Path],
+        process_count: int,
+        *,
+        churn: float = 0.01,
+        hash_change: float = 0.0,
+        duplicate_name: float = 0.0,
+        seed: int = 0,
+    ) -> None:
+        """Create a table of ``process_count`` processes.
+
+        ``churn`` is the fraction of processes replaced by new ones on each ``advance()``, ``hash_change`` the
+        fraction of executables rewritten, and ``duplicate_name`` the fraction of processes that borrow the name
+        of a different executable.
+        """
+        self.executables = executables
+        self.churn = churn
+        self.hash_change = hash_change
+        self.duplicate_name = duplicate_name
+        self.__random = random.Random(seed)  # noqa: S311
+        self.__next_pid = 1
+        self.__clock = float(BOOT_TIME)
+        self.__generation = 0
+        self.__table: dict[int, tuple[ProcessEntry, str]] = {}
+        for _ in range(process_count):
+            self.__spawn()
+
+    def __spawn(self) -> None:
+        pid = self.__next_pid
+        self.__next_pid += 1
+        exe = self.__random.choice(self.executables)
+        name = exe.name
+        if self.__random.random() < self.duplicate_name:
+            name = self.__random.choice(self.executables).name
+        self.__clock += 0.001
+        self.__table[pid] = (ProcessEntry(pid, self.__clock, name, 1), str(exe))
+
+    def advance(self) -> None:
+        """Replace a fraction of the processes with new ones, and rewrite a fraction of the executables."""
+        pids = list(self.__table)
+        for pid in self.__random.sample(pids, round(len(pids) * self.churn)):
+            del self.__table[pid]
+            self.__spawn()
+        self.__generation += 1
+        for exe in self.__random.sample(self.executables, round(len(self.executables) * self.hash_change)):
+            exe.write_bytes(exe.read_bytes()[:-4] + self.__generation.to_bytes(4, "little"))
+
+    def list_processes(self) -> Iterator[ProcessEntry]:
+        """List the synthetic processes."""
+        for entry, _ in self.__table.values():
+            yield entry
+
+    def get_process(self, pid: int) -> ProcessEntry | None:
+        """Return a synthetic process, or None if it has been replaced."""
+        process = self.__table.get(pid)
+        return process[0] if process is not None else None
+
+    def read_exe(self, entry: ProcessEntry) -> str:
+        """Return the executable of a synthetic process."""
+        return self.__table[entry.pid][1]
+
+
+def populate_history(
+    store: ProcessStore, records: Iterable[ProcessRecord], weeks: float, interval: timedelta = DEFAULT_HISTORY_INTERVAL
+) -> int:
+    """Write ``weeks`` of scans of ``records`` into ``store``, one every ``interval``, ending now.
+
+    :return: The number of scans written.
+    """
+    records = list(records)
+    now = datetime.now(UTC)
+    scans = int(timedelta(weeks=weeks) / interval)
+    for i in range(scans, 0, -1):
+        store.write_snapshot(records, timestamp=now - i * interval)
+    return scans
@@ -8,13 +8,6 @@ from __future__ import annotations
 import argparse
 import sys
 
-from rich.console import Console
-
-from procmond.daemon import check_alerts, get_processes, store_records
-from procmond.daemon import main as daemon_main
-
-console = Console()
-
 
 def create_parser() -> argparse.ArgumentParser:
     """Create the argument parser for the CLI."""
@@ -35,19 +28,37 @@ def create_parser() -> argparse.ArgumentParser:
     smoke_parser = subparsers.add_parser("smoke", help="Run single-pass smoke test")
     smoke_parser.add_argument("--config", help="Path to configuration file", default=None)
 
+    # Export command - copies process history to columnar files
+    export_parser = subparsers.add_parser("export", help="Export process history to Parquet or gzipped CSV files")
+    export_parser.add_argument("--config", help="Path to configuration file", default=None)
+    export_parser.add_argument("--output-dir", help="Directory to write the files to", default=None)
+    export_parser.add_argument("--format", choices=("auto", "parquet", "csv"), help="File format", default=None)
+    export_parser.add_argument("--follow", action="store_true", help="Keep exporting new history until interrupted")
+
     return parser
 
 
 def run_daemon() -> None:
     """Run the full daemon monitoring loop."""
-    daemon_main()
+    from procmond import daemon  # noqa: PLC0415
+
+    daemon.configure()
+    daemon.main()
 
 
 def run_smoke() -> None:
     """Run a single smoke test pass."""
+    # Imported here so that the CLI starts quickly; rich in particular is slow to import.
+    from rich.console import Console  # noqa: PLC0415
+
+    from procmond import daemon  # noqa: PLC0415
+
+    console = Console()
     console.print("Running smoke test...")
-    processes = get_processes()
+    daemon.configure()
+    processes = daemon.get_processes()
     console.print(f"Found {len(processes)} processes")
+    daemon.hashing_engine.hash_records(processes)
 
     # Show first 5 processes for verification
     for p in processes[:5]:
@@ -57,15 +68,54 @@ def run_smoke() -> None:
             console.print(f"Error serializing process: {e}")
 
     # Store records to create database if needed
-    store_records(processes)
+    daemon.store_records(processes)
+    daemon.hashing_engine.close()
 
     # Check for alerts
-    alerts = check_alerts()
+    alerts = daemon.check_alerts()
     console.print(f"Found {len(alerts)} alerts")
     for a in alerts[:5]:
         console.print(a)
 
 
+def run_export(args: argparse.Namespace) -> None:
+    """Export the process history written since the last export.
+
+    :param args: The parsed arguments of the export command.
+    """
+    from rich.console import Console  # noqa: PLC0415
+
+    from procmond.core.config_manager import get_config  # noqa: PLC0415
+    from procmond.core.export import ExportResult, SnapshotExporter  # noqa: PLC0415
+
+    console = Console()
+    config = get_config()
+    try:
+        exporter = SnapshotExporter(
+            config.database_path,
+            args.output_dir or config.export_output_dir,
+            export_format=args.format or config.export_format,
+            chunk_rows=config.export_chunk_rows,
+        )
+    except (ImportError, ValueError) as e:
+        console.print(str(e), style="red", markup=False)
+        sys.exit(1)
+
+    def report(result: ExportResult) -> None:
+        console.print(
+            f"Exported {result.rows_exported} rows to {result.files_written} {exporter.format} files "
+            f"in {exporter.output_dir}, up to scan {result.last_scan_id}"
+        )
+
+    if not args.follow:
+        report(exporter.run())
+        return
+    try:
+        exporter.follow(config.export_interval, report)
+    except KeyboardInterrupt:
+        console.print("Stopped exporting")
+
+
 def main() -> None:
     """Main CLI entry point."""
     parser = create_parser()
@@ -81,6 +131,8 @@ def main() -> None:
         run_daemon()
     elif args.command == "smoke":
         run_smoke()
+    elif args.command == "export":
+        run_export(args)
     else:
         parser.print_help()
         sys.exit(1)
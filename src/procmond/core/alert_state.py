@@ -0,0 +1,144 @@
+"""Alert deduplication for ProcMonD.
+
+The detectors report every suspicious condition that is present, every cycle,
+so a process with no executable on disk would otherwise be alerted on every
+refresh for as long as it runs. This module remembers the conditions that have
+already been reported and passes on only the alerts worth sending: a condition
+that has just appeared, a periodic reminder that one is still present, and
+notice that one has gone away.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from copy import copy
+from logging import getLogger
+from time import monotonic
+from typing import TYPE_CHECKING, NamedTuple
+
+from procmond.core.metrics import registry
+from procmond.models.alert import AlertStatus
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from procmond.models.alert import Alert
+
+logger = getLogger(__name__)
+
+alerts_suppressed = registry.counter(
+    "procmond_alerts_suppressed_total", "Alerts not sent because their condition was already reported."
+)
+alerts_resolved = registry.counter("procmond_alerts_resolved_total", "Reported conditions that have gone away.")
+alert_state_size = registry.gauge("procmond_alert_state_size", "Reported conditions being tracked.")
+
+# The detectors whose conditions are told apart by the executable's hash. For the others, a hash that is missing
+# because hashing was deferred, or that has changed, doesn't make the condition a different one.
+HASH_KEYED_DETECTORS = frozenset(("hash_change",))
+
+
+class AlertFingerprint(NamedTuple):
+    """The identity of a reported condition. An alert with the same fingerprint reports the same condition."""
+
+    detector: str
+    pid: int
+    create_time: float
+    path: str
+    hash: str
+
+    @classmethod
+    def of(cls, alert: Alert) -> AlertFingerprint:
+        """Return the fingerprint of an alert.
+
+        :param alert: The alert.
+        :return: The fingerprint of the condition the alert reports.
+        """
+        file_hash = alert.hash if alert.detector in HASH_KEYED_DETECTORS else ""
+        return cls(alert.detector, alert.pid, alert.create_time, alert.path, file_hash)
+
+
+class AlertState:
+    """The AlertState tracks the conditions that have been reported, evicting the least recently seen if full.
+
+    An AlertState is not thread-safe; the daemon only updates it from the thread that runs the detectors.
+    """
+
+    suppression_seconds: float
+    max_entries: int
+
+    def __init__(
+        self, suppression_seconds: float = 3600, max_entries: int = 10000, clock: Callable[[], float] = monotonic
+    ) -> None:
+        """Creates a new state with nothing reported.
+
+        :param suppression_seconds: How long to hold back repeats of a reported condition before sending a
+            reminder. 0 turns deduplication off, so every alert is sent every cycle.
+        :param max_entries: The most conditions to remember. A forgotten condition is reported again as new.
+        :param clock: Returns the current time in seconds.
+        """
+        self.suppression_seconds = suppression_seconds
+        self.max_entries = max(1, max_entries)
+        self.__clock = clock
+        # Each reported condition, with its latest alert and when it was last sent.
+        self.__reported: OrderedDict[AlertFingerprint, tuple[Alert, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of reported conditions being tracked.
+
+        :return: The number of reported conditions.
+        """
+        return len(self.__reported)
+
+    def update(self, alerts: Iterable[Alert], checked: Iterable[str] | None = None) -> list[Alert]:
+        """Compare a cycle's alerts with those already reported, and return those that should be sent.
+
+        :param alerts: The alerts raised this cycle.
+        :param checked: The detectors that reported every condition they found this cycle; a condition is only
+            resolved when its detector was checked and didn't report it again. Defaults to every detector.
+        :return: The new alerts, reminders, and copies of the alerts whose condition has been resolved.
+        """
+        if self.suppression_seconds <= 0:
+            return list(alerts)
+        now = self.__clock()
+        to_send = []
+        seen = set()
+        for alert in alerts:
+            fingerprint = AlertFingerprint.of(alert)
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            reported = self.__reported.get(fingerprint)
+            if reported is None:
+                alert.status = AlertStatus.NEW
+                self.__reported[fingerprint] = (alert, now)
+                to_send.append(alert)
+            elif now - reported[1] >= self.suppression_seconds:
+                alert.status = AlertStatus.REMINDER
+                self.__reported[fingerprint] = (alert, now)
+                to_send.append(alert)
+            else:
+                self.__reported[fingerprint] = (alert, reported[1])
+                alerts_suppressed.inc()
+            self.__reported.move_to_end(fingerprint)
+
+        checked_detectors = None if checked is None else set(checked)
+        for fingerprint, (alert, _) in list(self.__reported.items()):
+            if fingerprint in seen:
+                continue
+            if checked_detectors is not None and fingerprint.detector not in checked_detectors:
+                continue
+            del self.__reported[fingerprint]
+            resolved = copy(alert)
+            resolved.status = AlertStatus.RESOLVED
+            to_send.append(resolved)
+            alerts_resolved.inc()
+
+        while len(self.__reported) > self.max_entries:
+            fingerprint, _ = self.__reported.popitem(last=False)
+            logger.debug("Forgetting reported alert %s; the alert state is full.", fingerprint)
+        alert_state_size.set(len(self.__reported))
+        return to_send
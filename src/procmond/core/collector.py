@@ -0,0 +1,591 @@
+"""Process collection for ProcMonD.
+
+This module walks the process list and keeps a table of the processes seen by
+the previous scan, keyed by (pid, create_time), so that only processes that
+spawned or changed since then are fully inspected. Processes are listed by a
+pluggable backend: psutil, or a direct reader of procfs on Linux. On hosts
+with many cores and processes, either backend can be sharded across a pool of
+worker processes, each inspecting a share of the PIDs.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import os
+from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import BrokenExecutor
+from logging import getLogger
+from pathlib import Path
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple
+
+from psutil import AccessDenied, NoSuchProcess, Process, ZombieProcess, pids, process_iter
+
+from procmond.core.file_probe import probe_files
+from procmond.core.metrics import registry
+from procmond.models.process_record import ProcessRecord
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from concurrent.futures import ProcessPoolExecutor
+
+logger = getLogger(__name__)
+
+scan_seconds = registry.histogram("procmond_scan_seconds", "Time taken to list and inspect the running processes.")
+processes_scanned = registry.counter("procmond_processes_scanned_total", "Processes listed by scans.")
+processes_inspected = registry.counter("procmond_processes_inspected_total", "Processes inspected in full.")
+
+ProcessKey = tuple[int, float]
+
+# Appended by the kernel to the exe link of a process whose executable has been deleted.
+DELETED_SUFFIX = " (deleted)"
+
+# How a shard worker's read of a process's executable turned out.
+EXE_READ = 0
+EXE_ACCESS_DENIED = 1
+EXE_ZOMBIE = 2
+
+
+class ScanDiff(NamedTuple):
+    """The result of a scan: the current process list and how it differs from the previous scan."""
+
+    current: list[ProcessRecord]
+    spawned: list[ProcessRecord]
+    exited: list[ProcessRecord]
+    unchanged: list[ProcessRecord]
+
+
+class ProcessEntry(NamedTuple):
+    """The cheap-to-read identity of a process, as listed by a collector backend."""
+
+    pid: int
+    create_time: float
+    name: str
+    ppid: int
+    handle: Any = None
+
+
+class CollectorBackend(ABC):
+    """A CollectorBackend lists the running processes and reads their executable paths."""
+
+    name: ClassVar[str]
+
+    @abstractmethod
+    def list_processes(self) -> Iterator[ProcessEntry]:
+        """List the running processes in a single pass.
+
+        :return: An iterator over the identity of each running process.
+        """
+
+    def list_pids(self) -> list[int]:
+        """List the IDs of the running processes, without reading anything else about them.
+
+        :return: The process IDs.
+        """
+        return [entry.pid for entry in self.list_processes()]
+
+    @abstractmethod
+    def get_process(self, pid: int) -> ProcessEntry | None:
+        """Read the identity of a single process.
+
+        :param pid: The process ID.
+        :return: The identity of the process, or None if it has exited.
+        """
+
+    @abstractmethod
+    def read_exe(self, entry: ProcessEntry) -> str:
+        """Read the executable path of a process.
+
+        :param entry: The process, as listed by this backend.
+        :return: The executable path, or an empty string if the process has none. If the backend can tell that the
+            executable has been deleted, the path ends with DELETED_SUFFIX, as the kernel reports it.
+        :raises AccessDenied: If the process cannot be inspected.
+        :raises ZombieProcess: If the process is a zombie.
+        :raises NoSuchProcess: If the process has exited.
+        """
+
+    def close(self) -> None:
+        """Release anything the backend holds on to between scans."""
+        return
+
+
+class PsutilBackend(CollectorBackend):
+    """The PsutilBackend lists processes with a single ``process_iter(attrs=[...])`` pass."""
+
+    name = "psutil"
+
+    def list_processes(self) -> Iterator[ProcessEntry]:
+        """List the running processes, reading each process's stat data once.
+
+        :return: An iterator over the identity of each running process.
+        """
+        for process in process_iter(["create_time", "name", "ppid"]):
+            info = process.info
+            yield ProcessEntry(process.pid, info["create_time"] or 0.0, info["name"] or "", info["ppid"] or 0, process)
+
+    def list_pids(self) -> list[int]:
+        """List the IDs of the running processes through psutil.
+
+        :return: The process IDs.
+        """
+        return pids()
+
+    def get_process(self, pid: int) -> ProcessEntry | None:
+        """Read the identity of a single process through psutil.
+
+        :param pid: The process ID.
+        :return: The identity of the process, or None if it has exited or cannot be read.
+        """
+        try:
+            process = Process(pid)
+            with process.oneshot():
+                return ProcessEntry(pid, process.create_time(), process.name(), process.ppid(), process)
+        except (NoSuchProcess, AccessDenied):
+            return None
+
+    def read_exe(self, entry: ProcessEntry) -> str:
+        """Read the executable path of a process through psutil.
+
+        :param entry: The process, as listed by this backend.
+        :return: The executable path, or an empty string if the process has none.
+        """
+        return entry.handle.exe()
+
+
+class ProcfsBackend(CollectorBackend):
+    """The ProcfsBackend reads ``/proc/<pid>/stat`` and the ``exe`` link directly, without psutil.
+
+    Process names are the kernel's ``comm`` value, which is truncated to 15 characters.
+    """
+
+    name = "procfs"
+
+    def __init__(self, proc_root: str = "/proc") -> None:
+        """Creates a new procfs backend.
+
+        :param proc_root: The mount point of procfs.
+        """
+        self.proc_root = proc_root
+        self.__clock_ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self.__boot_time = self.__read_boot_time()
+        self.__buffer = bytearray(4096)
+
+    def __read_boot_time(self) -> float:
+        try:
+            with Path(self.proc_root, "stat").open("rb") as f:
+                for line in f:
+                    if line.startswith(b"btime"):
+                        return float(line.split()[1])
+        except OSError:
+            logger.warning("Cannot read the boot time from %s/stat.", self.proc_root)
+        return 0.0
+
+    def list_processes(self) -> Iterator[ProcessEntry]:
+        """List the running processes, reading each ``/proc/<pid>/stat`` into a reused buffer.
+
+        :return: An iterator over the identity of each running process.
+        """
+        with os.scandir(self.proc_root) as it:
+            for dir_entry in it:
+                if not dir_entry.name.isdigit():
+                    continue
+                entry = self.__read_stat(int(dir_entry.name), dir_entry.path)
+                if entry is not None:
+                    yield entry
+
+    def list_pids(self) -> list[int]:
+        """List the IDs of the running processes from the directories in procfs.
+
+        :return: The process IDs.
+        """
+        with os.scandir(self.proc_root) as it:
+            return [int(dir_entry.name) for dir_entry in it if dir_entry.name.isdigit()]
+
+    def get_process(self, pid: int) -> ProcessEntry | None:
+        """Read the identity of a single process from ``/proc/<pid>/stat``.
+
+        :param pid: The process ID.
+        :return: The identity of the process, or None if it has exited.
+        """
+        return self.__read_stat(pid, f"{self.proc_root}/{pid}")
+
+    def __read_stat(self, pid: int, pid_path: str) -> ProcessEntry | None:
+        buf = self.__buffer
+        try:
+            with open(f"{pid_path}/stat", "rb", buffering=0) as f:  # noqa: PTH123
+                size = f.readinto(buf)
+        except OSError:
+            # The process exited between listing /proc and reading its stat file.
+            return None
+        data = bytes(buf[:size])
+        # The name is between parentheses and may itself contain spaces and parentheses.
+        rpar = data.rfind(b")")
+        fields = data[rpar + 2 :].split()
+        return ProcessEntry(
+            pid,
+            self.__boot_time + int(fields[19]) / self.__clock_ticks,
+            data[data.find(b"(") + 1 : rpar].decode(errors="replace"),
+            int(fields[1]),
+            fields[0],
+        )
+
+    def read_exe(self, entry: ProcessEntry) -> str:
+        """Read the executable path of a process from its ``exe`` link.
+
+        :param entry: The process, as listed by this backend.
+        :return: The executable path, or an empty string if the process has none. The path ends with DELETED_SUFFIX
+            if the executable has been deleted.
+        """
+        if entry.handle == b"Z":
+            raise ZombieProcess(entry.pid, entry.name)
+        try:
+            exe = os.readlink(f"{self.proc_root}/{entry.pid}/exe")  # noqa: PTH115
+        except PermissionError:
+            raise AccessDenied(entry.pid, entry.name) from None
+        except FileNotFoundError:
+            if not Path(self.proc_root, str(entry.pid)).exists():
+                raise NoSuchProcess(entry.pid, entry.name) from None
+            # Kernel threads have no executable.
+            return ""
+        return exe
+
+
+class ShardResult(NamedTuple):
+    """What a shard worker read about each of its processes, one column per field, to keep pickling cheap."""
+
+    pids: array[int]
+    create_times: array[float]
+    ppids: array[int]
+    exe_statuses: array[int]
+    names: list[str]
+    exes: list[str]
+
+
+class ShardedExe(NamedTuple):
+    """The executable path of a process as read by a shard worker, or how reading it failed."""
+
+    status: int
+    path: str
+
+
+# The backend of a shard worker process, created once by _start_shard_worker().
+_shard_backend: CollectorBackend | None = None
+
+
+def _start_shard_worker(backend_factory: Callable[[], CollectorBackend]) -> None:
+    global _shard_backend  # noqa: PLW0603
+    _shard_backend = backend_factory()
+
+
+def _inspect_shard(shard: array[int]) -> ShardResult:
+    backend = _shard_backend
+    if backend is None:
+        msg = "The shard worker was not started."
+        raise RuntimeError(msg)
+    result = ShardResult(array("q"), array("d"), array("q"), array("B"), [], [])
+    for pid in shard:
+        entry = backend.get_process(pid)
+        if entry is None:
+            continue
+        try:
+            exe, status = backend.read_exe(entry), EXE_READ
+        except AccessDenied:
+            exe, status = "", EXE_ACCESS_DENIED
+        except ZombieProcess:
+            exe, status = "", EXE_ZOMBIE
+        except FileNotFoundError:
+            exe, status = "", EXE_READ
+        except NoSuchProcess:
+            continue
+        result.pids.append(entry.pid)
+        result.create_times.append(entry.create_time)
+        result.ppids.append(entry.ppid)
+        result.exe_statuses.append(status)
+        result.names.append(entry.name)
+        result.exes.append(exe)
+    return result
+
+
+class ShardedBackend(CollectorBackend):
+    """The ShardedBackend splits the PIDs between a pool of worker processes, each running another backend.
+
+    Each worker reads the identity and executable path of its share of the processes, and sends them back in
+    columns. Single processes, such as those reported by process events, are read in the daemon's own process.
+    """
+
+    name = "sharded"
+
+    def __init__(self, backend_factory: Callable[[], CollectorBackend], workers: int) -> None:
+        """Creates a new sharded backend. The worker processes are started by the first scan.
+
+        :param backend_factory: Creates the backend each worker uses, e.g. a backend class. Must be picklable.
+        :param workers: The number of worker processes, and of shards per scan.
+        """
+        self.workers = max(1, workers)
+        self.__backend_factory = backend_factory
+        self.__local = backend_factory()
+        self.__pool: ProcessPoolExecutor | None = None
+
+    def list_processes(self) -> Iterator[ProcessEntry]:
+        """List the running processes, reading each shard in a worker process.
+
+        If the worker pool fails, the processes are listed in the daemon's own process instead.
+
+        :return: An iterator over the identity of each running process.
+        """
+        process_ids = array("q", self.__local.list_pids())
+        shards = [process_ids[index :: self.workers] for index in range(self.workers)]
+        try:
+            if self.__pool is None:
+                self.__pool = self.__start_pool()
+            results = list(self.__pool.map(_inspect_shard, shards))
+        except (BrokenExecutor, OSError):
+            logger.exception("The collector's worker processes failed; listing processes in the daemon instead.")
+            self.close()
+            yield from self.__local.list_processes()
+            return
+        for result in results:
+            for index, pid in enumerate(result.pids):
+                exe = ShardedExe(result.exe_statuses[index], result.exes[index])
+                yield ProcessEntry(pid, result.create_times[index], result.names[index], result.ppids[index], exe)
+
+    def __start_pool(self) -> ProcessPoolExecutor:
+        # Imported here, since multiprocessing is slow to import and only needed when sharding.
+        from concurrent.futures import ProcessPoolExecutor  # noqa: PLC0415
+        from multiprocessing import get_all_start_methods, get_context  # noqa: PLC0415
+
+        # The daemon runs several threads, which fork() doesn't carry over safely, so workers start from scratch.
+        start_method = "forkserver" if "forkserver" in get_all_start_methods() else "spawn"
+        return ProcessPoolExecutor(
+            self.workers,
+            mp_context=get_context(start_method),
+            initializer=_start_shard_worker,
+            initargs=(self.__backend_factory,),
+        )
+
+    def list_pids(self) -> list[int]:
+        """List the IDs of the running processes.
+
+        :return: The process IDs.
+        """
+        return self.__local.list_pids()
+
+    def get_process(self, pid: int) -> ProcessEntry | None:
+        """Read the identity of a single process, in the daemon's own process.
+
+        :param pid: The process ID.
+        :return: The identity of the process, or None if it has exited.
+        """
+        return self.__local.get_process(pid)
+
+    def read_exe(self, entry: ProcessEntry) -> str:
+        """Return the executable path of a process, as read by its shard's worker.
+
+        :param entry: The process, as listed by this backend.
+        :return: The executable path, or an empty string if the process has none.
+        """
+        if not isinstance(entry.handle, ShardedExe):
+            return self.__local.read_exe(entry)
+        status, path = entry.handle
+        if status == EXE_ACCESS_DENIED:
+            raise AccessDenied(entry.pid, entry.name)
+        if status == EXE_ZOMBIE:
+            raise ZombieProcess(entry.pid, entry.name)
+        return path
+
+    def close(self) -> None:
+        """Stop the worker processes."""
+        if self.__pool is not None:
+            self.__pool.shutdown(wait=True, cancel_futures=True)
+            self.__pool = None
+        self.__local.close()
+
+
+COLLECTOR_BACKENDS: dict[str, type[CollectorBackend]] = {
+    PsutilBackend.name: PsutilBackend,
+    ProcfsBackend.name: ProcfsBackend,
+}
+
+
+def create_backend(name: str, workers: int = 0) -> CollectorBackend:
+    """Create the collector backend with the given name, falling back to psutil where procfs isn't available.
+
+    :param name: The name of the backend, as set by CollectorBackend in the config.
+    :param workers: The number of worker processes to shard each scan across. 0 or 1 scans in the daemon's process.
+    :return: The collector backend.
+    """
+    backend = COLLECTOR_BACKENDS.get(name.lower())
+    if backend is None:
+        msg = f"Invalid collector backend: {name}"
+        raise ValueError(msg)
+    if backend is ProcfsBackend and not Path("/proc/self/stat").exists():
+        logger.warning("procfs is not available, using the psutil collector backend instead.")
+        backend = PsutilBackend
+    if workers > 1:
+        return ShardedBackend(backend, workers)
+    return backend()
+
+
+def probe_records(process_records: Iterable[ProcessRecord]) -> None:
+    """Stat the executable of each record, once per unique path, and share the result between records.
+
+    :param process_records: The process records from a scan.
+    """
+    records = list(process_records)
+    probes = probe_files(record.path for record in records if not record.deleted)
+    for record in records:
+        record.probe = probes.get(record.path)
+
+
+def inspect_process(entry: ProcessEntry, backend: CollectorBackend) -> ProcessRecord | None:
+    """Build a ProcessRecord by fully inspecting a single process.
+
+    :param entry: The process, as listed by the backend.
+    :param backend: The backend that listed the process.
+    :return: The process record, whose valid flag is False if the process couldn't be inspected,
+        or None if the process exited before it could be inspected.
+    """
+    processes_inspected.inc()
+    proc = ProcessRecord(entry.pid)
+    proc.create_time = entry.create_time
+    try:
+        proc.name = entry.name
+        proc.ppid = entry.ppid
+        exe = backend.read_exe(entry)
+        if exe.endswith(DELETED_SUFFIX):
+            # Record the original path, as psutil does, but without a stat to check that it's really gone.
+            proc.path = exe.removesuffix(DELETED_SUFFIX)
+            proc.deleted = True
+        else:
+            proc.path = exe
+
+    except AccessDenied:
+        logger.warning("%s is not an accessible process.", proc)
+        proc.valid = False
+    except FileNotFoundError:
+        logger.warning("%s executable could not be found.", proc)
+        proc.valid = True
+        proc.accessible = True
+    except ZombieProcess:
+        logger.warning("%s is a zombie process.", proc)
+        proc.valid = False
+    except NoSuchProcess:
+        logger.warning("%s process no longer exists.", proc)
+        return None
+    return proc
+
+
+def exe_changed(proc: ProcessRecord, entry: ProcessEntry) -> bool:
+    """Check whether a listing that read each process's executable saw a different one to the process's record.
+
+    Only sharded listings read the executable of every process; other listings can't tell, so report no change.
+
+    :param proc: The record of the process from an earlier scan.
+    :param entry: The process, as listed by the backend now.
+    :return: True if the process's record is out of date, including a record that couldn't read an executable
+        that can now be read.
+    """
+    if not isinstance(entry.handle, ShardedExe):
+        return False
+    status, path = entry.handle
+    if status != EXE_READ:
+        return False
+    return not proc.valid or path.removesuffix(DELETED_SUFFIX) != proc.path
+
+
+class ProcessCollector:
+    """The ProcessCollector walks the process list, inspecting only processes that are new or have changed."""
+
+    def __init__(self, backend: CollectorBackend | None = None) -> None:
+        """Creates a new collector with an empty process table.
+
+        :param backend: The backend used to list and inspect processes. Defaults to psutil.
+        """
+        self.backend = backend if backend is not None else PsutilBackend()
+        self.__table: dict[ProcessKey, ProcessRecord] = {}
+        self.last_diff: ScanDiff | None = None
+
+    def __len__(self) -> int:
+        """Return the number of processes in the table.
+
+        :return: The number of processes seen by the last scan.
+        """
+        return len(self.__table)
+
+    def scan(self) -> ScanDiff:
+        """Walk the current process list and diff it against the previous scan.
+
+        A process is unchanged if its (pid, create_time) was seen by the previous scan and its name and,
+        where the listing reads it, its executable are the same, so PID reuse and exec() both count as a spawn.
+        Only spawned processes are inspected, including ones that couldn't be inspected before; unchanged
+        records are carried over with their executable hash reset so it is checked again.
+
+        :return: The scan diff. Processes that couldn't be inspected are tracked but not reported.
+        """
+        start = perf_counter()
+        table: dict[ProcessKey, ProcessRecord] = {}
+        current: list[ProcessRecord] = []
+        spawned: list[ProcessRecord] = []
+        unchanged: list[ProcessRecord] = []
+        for entry in self.backend.list_processes():
+            key = (entry.pid, entry.create_time)
+            proc = self.__table.get(key)
+            if proc is not None and proc.name == entry.name and not exe_changed(proc, entry):
+                proc.reset_hash()
+                if proc.valid:
+                    unchanged.append(proc)
+            else:
+                proc = inspect_process(entry, self.backend)
+                if proc is None:
+                    continue
+                if proc.valid:
+                    spawned.append(proc)
+            table[key] = proc
+            if proc.valid:
+                current.append(proc)
+
+        exited = [proc for key, proc in self.__table.items() if proc.valid and key not in table]
+        self.__table = table
+        probe_records(current)
+        logger.debug(
+            "Scanned %s processes: %s spawned, %s exited, %s unchanged.",
+            len(table),
+            len(spawned),
+            len(exited),
+            len(unchanged),
+        )
+        processes_scanned.inc(len(table))
+        scan_seconds.observe(perf_counter() - start)
+        self.last_diff = ScanDiff(current, spawned, exited, unchanged)
+        return self.last_diff
+
+    def observe(self, pids: Iterable[int]) -> ScanDiff:
+        """Inspect individual processes between full scans, such as those reported by process events.
+
+        Each process is inspected again even if it is already in the table, since an exec() doesn't always change
+        the process name. It replaces its previous record and is reported as spawned. Exits are left for the
+        next full scan to reconcile.
+
+        :param pids: The IDs of the processes to inspect.
+        :return: A scan diff whose current list is every valid process in the table.
+        """
+        spawned: list[ProcessRecord] = []
+        for pid in pids:
+            entry = self.backend.get_process(pid)
+            if entry is None:
+                continue
+            key = (entry.pid, entry.create_time)
+            proc = inspect_process(entry, self.backend)
+            if proc is None:
+                continue
+            self.__table[key] = proc
+            if proc.valid:
+                spawned.append(proc)
+        probe_records(spawned)
+        current = [proc for proc in self.__table.values() if proc.valid]
+        logger.debug("Observed %s spawned processes.", len(spawned))
+        return ScanDiff(current, spawned, [], [])
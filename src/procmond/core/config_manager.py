@@ -42,24 +42,68 @@ class ConfigManager:
 
     root_path: str | Path = Path.cwd()
     database_path: str = "procmond.db"
+    database_synchronous: str = "NORMAL"
+    database_cache_size: int = 16384
+    retention_hours: float = 24
+    compaction_batch_size: int = 1000
+    compaction_budget_ms: float = 100
     refresh_rate: int = 30
-    hash_buffer_size: int = 1024
+    adaptive_refresh: bool = False
+    min_refresh_rate: float = 5
+    max_refresh_rate: float = 120
+    cpu_budget_percent: float = 5
+    cycle_deadline_percent: float = 90
+    collector_backend: str = "psutil"
+    collector_workers: int = 0
+    process_events: bool = False
+    hash_buffer_size: int = 1048576
+    hash_cache_size: int = 4096
+    hash_workers: int = 4
+    hash_byte_budget: int = 0
+    disabled_detectors: tuple[str, ...] = ()
+    detector_budget_ms: float = 1000
+    detector_budgets: dict[str, float]
+    detector_over_budget: str = "warn"
+    metrics_enabled: bool = False
+    metrics_address: str = "127.0.0.1"
+    metrics_port: int = 9464
+    profile_on_start: bool = False
+    profile_cycles: int = 5
+    profile_mode: str = "sample"
+    profile_sample_interval_ms: float = 5
+    export_output_dir: str = "export"
+    export_format: str = "auto"
+    export_chunk_rows: int = 50000
+    export_interval: float = 300
     alert_to_syslog: bool = True
     alert_to_email: bool = False
     alert_to_webhook: bool = False
+    alert_queue_size: int = 1000
+    alert_batch_size: int = 100
+    alert_linger_ms: float = 500
+    alert_max_retries: int = 5
+    alert_retry_delay: float = 1
+    alert_connection_idle_seconds: float = 60
+    alert_suppression_seconds: float = 3600
+    alert_state_size: int = 10000
     email_config: ClassVar[dict[str, str | int | bool]] = {}
     logging_level: str = "INFO"
     log_file: str = "procmond.log"
     log_message_format: str = "%(asctime)s [%(levelname)s]: %(message)s"
     log_message_datefmt: str = "%m/%d/%Y %I:%M:%S %p"
 
-    def __init__(self) -> None:
+    def __init__(self) -> None:  # noqa: PLR0915
         """Loads the application configuration from the config file."""
+        self.detector_budgets = {}
         user_config_path = get_custom_config_path()
 
         config = ConfigParser(interpolation=ExtendedInterpolation())
         config["GENERAL"] = {}  # Creating an empty section to enable defaults.
         config["ALERT_PROVIDERS"] = {}  # Creating an empty section to enable defaults.
+        config["DETECTORS"] = {}  # Creating an empty section to enable defaults.
+        config["METRICS"] = {}  # Creating an empty section to enable defaults.
+        config["PROFILING"] = {}  # Creating an empty section to enable defaults.
+        config["EXPORT"] = {}  # Creating an empty section to enable defaults.
         config_locations = ["/etc/procmond.conf", "procmond.conf"]
         if user_config_path:
             config_locations = user_config_path
@@ -67,14 +111,71 @@ class ConfigManager:
 
         self.root_path = config["GENERAL"].get("RootPath", self.root_path)
         self.database_path = config["GENERAL"].get("DatabasePath", self.database_path)
+        self.database_synchronous = config["GENERAL"].get("DatabaseSynchronous", self.database_synchronous)
+        self.database_cache_size = config["GENERAL"].getint("DatabaseCacheSize", self.database_cache_size)
+        self.retention_hours = config["GENERAL"].getfloat("RetentionHours", self.retention_hours)
+        self.compaction_batch_size = config["GENERAL"].getint("CompactionBatchSize", self.compaction_batch_size)
+        self.compaction_budget_ms = config["GENERAL"].getfloat("CompactionBudgetMs", self.compaction_budget_ms)
         self.refresh_rate = config["GENERAL"].getint("RefreshRate", self.refresh_rate)
+        self.adaptive_refresh = config["GENERAL"].getboolean("AdaptiveRefresh", self.adaptive_refresh)
+        self.min_refresh_rate = config["GENERAL"].getfloat("MinRefreshRate", self.min_refresh_rate)
+        self.max_refresh_rate = config["GENERAL"].getfloat("MaxRefreshRate", self.max_refresh_rate)
+        self.cpu_budget_percent = config["GENERAL"].getfloat("CpuBudgetPercent", self.cpu_budget_percent)
+        self.cycle_deadline_percent = config["GENERAL"].getfloat("CycleDeadlinePercent", self.cycle_deadline_percent)
+        self.collector_backend = config["GENERAL"].get("CollectorBackend", self.collector_backend)
+        self.collector_workers = config["GENERAL"].getint("CollectorWorkers", self.collector_workers)
+        self.process_events = config["GENERAL"].getboolean("ProcessEvents", self.process_events)
         self.hash_buffer_size = config["GENERAL"].getint("HashBufferSize", self.hash_buffer_size)
+        self.hash_cache_size = config["GENERAL"].getint("HashCacheSize", self.hash_cache_size)
+        self.hash_workers = config["GENERAL"].getint("HashWorkers", self.hash_workers)
+        self.hash_byte_budget = config["GENERAL"].getint("HashByteBudget", self.hash_byte_budget)
         self.logging_level = config["GENERAL"].get("ApplicationLoggingLevel", self.logging_level)
         self.log_file = config["GENERAL"].get("LogFile", self.log_file)
 
+        detectors_section = config["DETECTORS"]
+        self.disabled_detectors = tuple(
+            name.strip() for name in detectors_section.get("DisabledDetectors", "").split(",") if name.strip()
+        )
+        self.detector_budget_ms = detectors_section.getfloat("BudgetMs", self.detector_budget_ms)
+        self.detector_over_budget = detectors_section.get("OverBudget", self.detector_over_budget)
+        for key in detectors_section:
+            # ConfigParser lower-cases option names, so "BudgetMs.hash_change" arrives as "budgetms.hash_change".
+            if key.startswith("budgetms."):
+                self.detector_budgets[key.removeprefix("budgetms.")] = detectors_section.getfloat(
+                    key, self.detector_budget_ms
+                )
+
+        self.metrics_enabled = config["METRICS"].getboolean("Enabled", self.metrics_enabled)
+        self.metrics_address = config["METRICS"].get("BindAddress", self.metrics_address)
+        self.metrics_port = config["METRICS"].getint("Port", self.metrics_port)
+
+        self.profile_on_start = config["PROFILING"].getboolean("ProfileOnStart", self.profile_on_start)
+        self.profile_cycles = config["PROFILING"].getint("Cycles", self.profile_cycles)
+        self.profile_mode = config["PROFILING"].get("Mode", self.profile_mode)
+        self.profile_sample_interval_ms = config["PROFILING"].getfloat(
+            "SampleIntervalMs", self.profile_sample_interval_ms
+        )
+
+        self.export_output_dir = config["EXPORT"].get("OutputDir", self.export_output_dir)
+        self.export_format = config["EXPORT"].get("Format", self.export_format)
+        self.export_chunk_rows = config["EXPORT"].getint("ChunkRows", self.export_chunk_rows)
+        self.export_interval = config["EXPORT"].getfloat("Interval", self.export_interval)
+
         self.alert_to_syslog = config["ALERT_PROVIDERS"].getboolean("AlertToSyslog", self.alert_to_syslog)
         self.alert_to_email = config["ALERT_PROVIDERS"].getboolean("AlertToEmail", self.alert_to_email)
         self.alert_to_webhook = config["ALERT_PROVIDERS"].getboolean("AlertToWebHook", self.alert_to_webhook)
+        self.alert_queue_size = config["ALERT_PROVIDERS"].getint("AlertQueueSize", self.alert_queue_size)
+        self.alert_batch_size = config["ALERT_PROVIDERS"].getint("AlertBatchSize", self.alert_batch_size)
+        self.alert_linger_ms = config["ALERT_PROVIDERS"].getfloat("AlertLingerMs", self.alert_linger_ms)
+        self.alert_max_retries = config["ALERT_PROVIDERS"].getint("AlertMaxRetries", self.alert_max_retries)
+        self.alert_retry_delay = config["ALERT_PROVIDERS"].getfloat("AlertRetryDelay", self.alert_retry_delay)
+        self.alert_connection_idle_seconds = config["ALERT_PROVIDERS"].getfloat(
+            "AlertConnectionIdleSeconds", self.alert_connection_idle_seconds
+        )
+        self.alert_suppression_seconds = config["ALERT_PROVIDERS"].getfloat(
+            "AlertSuppressionSeconds", self.alert_suppression_seconds
+        )
+        self.alert_state_size = config["ALERT_PROVIDERS"].getint("AlertStateSize", self.alert_state_size)
 
         if self.alert_to_email and config.has_section("EMAIL_CONFIG"):
             email_section = config["EMAIL_CONFIG"]
@@ -98,3 +199,27 @@ class ConfigManager:
             msg = f"Invalid log level: {self.logging_level}"
             raise TypeError(msg)
         return numeric_level
+
+
+# The configuration the daemon runs with, loaded by the first call to get_config().
+_config: ConfigManager | None = None
+
+
+def get_config() -> ConfigManager:
+    """Get the daemon's configuration, loading it from the config file if nothing has loaded it yet.
+
+    :return: The daemon's configuration.
+    """
+    global _config  # noqa: PLW0603
+    if _config is None:
+        _config = ConfigManager()
+    return _config
+
+
+def set_config(config: ConfigManager) -> None:
+    """Replace the daemon's configuration, e.g. with one loaded from another file.
+
+    :param config: The configuration to use.
+    """
+    global _config  # noqa: PLW0603
+    _config = config
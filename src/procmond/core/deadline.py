@@ -0,0 +1,88 @@
+"""Per-cycle deadlines for ProcMonD.
+
+This module lets the pipeline give each scan cycle a deadline, and lets the
+work done in the cycle see it without passing it through every call: the
+pipeline opens a deadline scope on the thread running a stage, and code such
+as the hashing engine and the detector registry asks for the current deadline.
+Work that hasn't started by the deadline is deferred to the next cycle rather
+than holding it up.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from time import monotonic
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+_scope = threading.local()
+
+
+class Deadline:
+    """A Deadline is a point in time, on the monotonic clock, by which a cycle's work should be done."""
+
+    __slots__ = ("at",)
+
+    def __init__(self, at: float) -> None:
+        """Creates a new deadline.
+
+        :param at: The time of the deadline, as returned by time.monotonic().
+        """
+        self.at = at
+
+    @classmethod
+    def after(cls, seconds: float) -> Deadline:
+        """Create a deadline some time from now.
+
+        :param seconds: The number of seconds until the deadline.
+        :return: The deadline.
+        """
+        return cls(monotonic() + seconds)
+
+    def remaining(self) -> float:
+        """Return the time left until the deadline.
+
+        :return: The number of seconds until the deadline, or 0 if it has passed.
+        """
+        return max(0.0, self.at - monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """Whether the deadline has passed."""
+        return monotonic() >= self.at
+
+    def __repr__(self) -> str:
+        """Return a string representation of the deadline.
+
+        :return: A string representation of the deadline.
+        """
+        return f"Deadline(in {self.at - monotonic():.3f} s)"
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline | None) -> Iterator[None]:
+    """Make a deadline the current one on this thread, for the duration of a block.
+
+    :param deadline: The deadline, or None for no deadline.
+    """
+    previous = getattr(_scope, "deadline", None)
+    _scope.deadline = deadline
+    try:
+        yield
+    finally:
+        _scope.deadline = previous
+
+
+def current_deadline() -> Deadline | None:
+    """Return the deadline of the work running on this thread.
+
+    :return: The deadline, or None if the work has no deadline.
+    """
+    return getattr(_scope, "deadline", None)
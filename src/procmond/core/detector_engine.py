@@ -0,0 +1,271 @@
+"""Incremental detection engine for ProcMonD.
+
+This module evaluates the detections in procmond.core.detectors against
+in-memory indexes that are updated from each scan's diff, instead of
+re-querying the whole process history every cycle. The database is only read
+once, at startup, to rebuild the indexes from the latest stored scan.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from logging import getLogger
+from typing import TYPE_CHECKING, NamedTuple
+
+from procmond.core.detectors import DUPLICATE_NAME_MESSAGE, HASH_CHANGE_MESSAGE, MISSING_EXE_MESSAGE
+from procmond.models.alert import Alert
+
+if TYPE_CHECKING:
+    from sqlite3 import Connection
+
+    from procmond.core.collector import ProcessKey, ScanDiff
+    from procmond.models.process_record import ProcessRecord
+
+logger = getLogger(__name__)
+
+
+class TrackedProcess(NamedTuple):
+    """The identity of a running process, as tracked by the engine."""
+
+    pid: int
+    name: str
+    path: str
+
+
+class PathState(NamedTuple):
+    """The state of an executable on disk, as last observed."""
+
+    hash: str | None
+    exists: bool
+    accessible: bool
+
+
+# The state of a process's executable once it has been deleted, whatever is at its path now.
+DELETED_EXE = PathState("", exists=False, accessible=True)
+
+
+class DetectorEngine:
+    """The DetectorEngine keeps the indexes needed by each detection up to date, one scan diff at a time.
+
+    Each scan costs time in proportion to the processes that spawned or exited, plus one check per
+    unique executable path; processes that are unchanged are not revisited.
+    """
+
+    def __init__(self) -> None:
+        """Creates a new engine with empty indexes."""
+        self.__processes: dict[ProcessKey, TrackedProcess] = {}
+        self.__records: dict[ProcessKey, ProcessRecord] = {}
+        # One live record per executable path, through which the path's state is observed each scan.
+        self.__path_records: dict[str, ProcessRecord] = {}
+        self.__path_processes: dict[str, set[ProcessKey]] = {}
+        self.__path_states: dict[str, PathState] = {}
+        self.__name_paths: dict[str, dict[str, set[ProcessKey]]] = {}
+        self.__hashes: dict[ProcessKey, str] = {}
+        self.__missing_exes: set[ProcessKey] = set()
+        self.__hash_changed: set[ProcessKey] = set()
+        # Processes restored from the database that the first scan after startup hasn't seen yet.
+        self.__unconfirmed: set[ProcessKey] = set()
+
+    def __len__(self) -> int:
+        """Return the number of tracked processes.
+
+        :return: The number of tracked processes.
+        """
+        return len(self.__processes)
+
+    def rebuild(self, conn: Connection) -> None:
+        """Restore the indexes from the latest scan in the process database.
+
+        :param conn: A connection to the process database.
+        """
+        rows = conn.execute(
+            'SELECT p.pid, p.create_time, p.name, e.path, e."hash", e.file_exists, p.accessible '
+            "FROM process_snapshots p "
+            "JOIN executables e ON e.id = p.executable_id "
+            "WHERE p.scan_id = (SELECT MAX(id) FROM scans);"
+        ).fetchall()
+        for pid, create_time, name, stored_path, file_hash, file_exists, accessible in rows:
+            key = (pid, create_time or 0.0)
+            # Rows migrated from the old processes table may have no path; live records use "" for that.
+            path = stored_path or ""
+            self.__track(key, TrackedProcess(pid, name, path))
+            self.__path_states[path] = PathState(file_hash, bool(file_exists), bool(accessible))
+            self.__observe(key, self.__path_states[path])
+            self.__unconfirmed.add(key)
+
+        changed = conn.execute(
+            "SELECT p.pid, p.create_time "
+            "FROM process_snapshots p "
+            "JOIN executables e ON e.id = p.executable_id "
+            "WHERE p.pid IN (SELECT pid FROM process_snapshots WHERE scan_id = (SELECT MAX(id) FROM scans)) "
+            "  AND p.accessible = 1 "
+            "  AND NOT e.path ISNULL "
+            '  AND NOT e."hash" ISNULL '
+            "  AND e.\"hash\" != '' "
+            "GROUP BY p.pid, p.create_time, e.path "
+            'HAVING count(DISTINCT e."hash") > 1;'
+        ).fetchall()
+        for pid, create_time in changed:
+            key = (pid, create_time or 0.0)
+            if key in self.__processes:
+                self.__hash_changed.add(key)
+        logger.debug("Rebuilt detector state for %s processes from the database.", len(self.__processes))
+
+    def apply(self, diff: ScanDiff) -> None:
+        """Update the indexes from a scan diff.
+
+        The records in the diff must already have been hashed.
+
+        :param diff: The diff produced by the collector's latest scan.
+        """
+        for record in diff.exited:
+            self.__untrack((record.pid, record.create_time))
+        for record in diff.spawned:
+            self.__add(record)
+        if self.__unconfirmed:
+            # These processes were running when the daemon stopped, and exited before it restarted.
+            for key in self.__unconfirmed:
+                self.__untrack(key)
+            self.__unconfirmed.clear()
+
+        for path, record in self.__path_records.items():
+            state = PathState(record.hash, record.exists, record.accessible)
+            if state != self.__path_states.get(path):
+                self.__path_states[path] = state
+                for key in self.__path_processes[path]:
+                    tracked = self.__records.get(key)
+                    if tracked is None or not tracked.deleted:
+                        self.__observe(key, state)
+
+    def alerts(self) -> list[Alert]:
+        """Evaluate each detection against the current indexes.
+
+        :return: A List of alerts, in the same order as the SQL detectors in check_alerts.
+        """
+        return self.missing_exe_alerts() + self.hash_change_alerts() + self.duplicate_name_alerts()
+
+    def missing_exe_alerts(self) -> list[Alert]:
+        """Report processes with no corresponding executable on disk.
+
+        :return: A List of Alerts, as for detectors.detect_process_without_exe.
+        """
+        return [self.__alert(key, MISSING_EXE_MESSAGE) for key in sorted(self.__missing_exes)]
+
+    def hash_change_alerts(self) -> list[Alert]:
+        """Report processes whose executable has changed on disk while they were running.
+
+        :return: A List of Alerts, as for detectors.detect_process_with_hash_change.
+        """
+        return [self.__alert(key, HASH_CHANGE_MESSAGE) for key in sorted(self.__hash_changed)]
+
+    def duplicate_name_alerts(self) -> list[Alert]:
+        """Report process names that are shared by executables at different paths.
+
+        :return: A List of Alerts, as for detectors.detect_process_with_duplicate_name.
+        """
+        duplicates = []
+        for name, paths in self.__name_paths.items():
+            if len(paths) < 2:  # noqa: PLR2004
+                continue
+            # A path seen only through deleted executables has no state of its own.
+            accessible = [path for path in paths if self.__path_states.get(path, DELETED_EXE).accessible]
+            if len(accessible) > 1:
+                duplicates.append((len(accessible), min(paths[accessible[0]]), accessible[0], name))
+        return [
+            self.__alert(key, DUPLICATE_NAME_MESSAGE.format(distinct_paths))
+            for distinct_paths, key, _path, _name in sorted(duplicates, reverse=True)
+        ]
+
+    def __alert(self, key: ProcessKey, message: str) -> Alert:
+        process = self.__processes[key]
+        return Alert(
+            pid=process.pid,
+            name=process.name,
+            path=process.path,
+            message=message,
+            create_time=key[1],
+            # The last hash seen, so that a cycle whose hashing was deferred reports the same condition.
+            file_hash=self.__hashes.get(key, ""),
+        )
+
+    def __add(self, record: ProcessRecord) -> None:
+        key = (record.pid, record.create_time)
+        process = TrackedProcess(record.pid, record.name, record.path)
+        previous = self.__processes.get(key)
+        if previous is not None:
+            self.__unconfirmed.discard(key)
+            if previous != process:
+                # The process has exec()ed a different executable.
+                self.__untrack(key)
+        if key not in self.__processes:
+            self.__track(key, process)
+        replaced = self.__records.get(key)
+        self.__records[key] = record
+        path_record = self.__path_records.get(record.path)
+        if path_record is None or path_record is replaced:
+            # The collector has replaced the record that the path was being observed through.
+            self.__choose_path_record(record.path, record)
+        if record.deleted:
+            self.__observe(key, DELETED_EXE)
+            return
+        state = PathState(record.hash, record.exists, record.accessible)
+        self.__path_states.setdefault(record.path, state)
+        self.__observe(key, state)
+
+    def __choose_path_record(self, path: str, preferred: ProcessRecord | None = None) -> None:
+        """Pick the live record through which a path is observed, skipping any whose executable was deleted."""
+        candidates = [preferred, *(self.__records.get(key) for key in self.__path_processes.get(path, ()))]
+        for candidate in candidates:
+            if candidate is not None and candidate.path == path and not candidate.deleted:
+                self.__path_records[path] = candidate
+                return
+        self.__path_records.pop(path, None)
+
+    def __track(self, key: ProcessKey, process: TrackedProcess) -> None:
+        self.__processes[key] = process
+        self.__path_processes.setdefault(process.path, set()).add(key)
+        self.__name_paths.setdefault(process.name, {}).setdefault(process.path, set()).add(key)
+
+    def __untrack(self, key: ProcessKey) -> None:
+        process = self.__processes.pop(key, None)
+        if process is None:
+            return
+        record = self.__records.pop(key, None)
+        self.__hashes.pop(key, None)
+        self.__missing_exes.discard(key)
+        self.__hash_changed.discard(key)
+
+        path_processes = self.__path_processes[process.path]
+        path_processes.discard(key)
+        if not path_processes:
+            del self.__path_processes[process.path]
+            self.__path_records.pop(process.path, None)
+            self.__path_states.pop(process.path, None)
+        elif record is not None and self.__path_records.get(process.path) is record:
+            # Observe the path through another of its processes from now on.
+            self.__choose_path_record(process.path)
+
+        name_paths = self.__name_paths.get(process.name, {})
+        keys = name_paths.get(process.path)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del name_paths[process.path]
+            if not name_paths:
+                del self.__name_paths[process.name]
+
+    def __observe(self, key: ProcessKey, state: PathState) -> None:
+        """Update a process's detections from the state of its executable."""
+        if state.accessible and not state.exists:
+            self.__missing_exes.add(key)
+        else:
+            self.__missing_exes.discard(key)
+        # A deferred (None) or deleted ("") hash says nothing about whether the content changed.
+        if state.hash:
+            baseline = self.__hashes.get(key)
+            if baseline is not None and baseline != state.hash:
+                self.__hash_changed.add(key)
+            self.__hashes[key] = state.hash
@@ -0,0 +1,311 @@
+"""Detector registry for ProcMonD.
+
+This module lets detections be added without changing the daemon. Each
+detector declares which inputs it needs: the current process snapshot, the
+diff from the previous scan, or the stored process history. The built-in
+detectors are always available; others are discovered through the
+``procmond.detectors`` entry point group, e.g. in a plugin's pyproject.toml:
+
+    [project.entry-points."procmond.detectors"]
+    my_rule = "my_package.rules:MyDetector"
+
+Every run of every detector is timed against a budget, so that one slow rule
+can't stretch the daemon's refresh loop unnoticed. Detectors that haven't
+started by the cycle's deadline are deferred to the next cycle.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import re
+from abc import ABC, abstractmethod
+from enum import Flag, auto
+from logging import getLogger
+from time import perf_counter
+from typing import TYPE_CHECKING, ClassVar, NamedTuple
+
+from procmond.core.deadline import current_deadline
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+    from importlib.metadata import EntryPoints
+
+    from procmond.core.collector import ScanDiff
+    from procmond.core.detector_engine import DetectorEngine
+    from procmond.models.alert import Alert
+    from procmond.models.process_record import ProcessRecord
+
+logger = getLogger(__name__)
+
+ENTRY_POINT_GROUP = "procmond.detectors"
+OVER_BUDGET_ACTIONS = ("warn", "skip")
+
+# A detector that overruns its budget with the "skip" action sits out 2, 4, 8... cycles, up to this many.
+MAX_SKIPPED_CYCLES = 64
+
+detectors_deferred = registry.counter(
+    "procmond_detectors_deferred_total", "Detector runs deferred to the next cycle by the cycle deadline."
+)
+
+
+def metric_name(detector_name: str) -> str:
+    """Make a detector's name safe to use in a metric name, which allows only letters, digits and underscores.
+
+    :param detector_name: The name of the detector.
+    :return: The name with every other character replaced by an underscore.
+    """
+    return re.sub(r"[^a-zA-Z0-9_]", "_", detector_name)
+
+
+def entry_points(group: str) -> EntryPoints:
+    """Select installed entry points, importing importlib.metadata only once detectors are loaded.
+
+    :param group: The entry point group.
+    :return: The entry points in the group.
+    """
+    from importlib import metadata  # noqa: PLC0415
+
+    return metadata.entry_points(group=group)
+
+
+class DetectorInput(Flag):
+    """The inputs a detector can ask for."""
+
+    SNAPSHOT = auto()
+    """The process records from the latest scan."""
+    DIFF = auto()
+    """The diff from the previous scan, and the incremental detector state it has been applied to."""
+    HISTORY = auto()
+    """The process history in the database."""
+
+
+class DetectionContext(NamedTuple):
+    """Everything a detector may read during one cycle."""
+
+    snapshot: list[ProcessRecord]
+    diff: ScanDiff | None
+    state: DetectorEngine
+    database_path: str
+
+    @property
+    def inputs(self) -> DetectorInput:
+        """The inputs available in this context.
+
+        :return: The available inputs.
+        """
+        available = DetectorInput.SNAPSHOT | DetectorInput.HISTORY
+        if self.diff is not None:
+            available |= DetectorInput.DIFF
+        return available
+
+
+class Detector(ABC):
+    """A Detector inspects the processes seen by a scan and reports anything suspicious."""
+
+    name: ClassVar[str]
+    inputs: ClassVar[DetectorInput]
+
+    @abstractmethod
+    def detect(self, context: DetectionContext) -> list[Alert]:
+        """Run the detection.
+
+        :param context: The inputs for this cycle. Only those declared in ``inputs`` are guaranteed to be usable.
+        :return: A List of Alerts.
+        """
+
+
+class MissingExeDetector(Detector):
+    """Reports processes with no corresponding executable on disk."""
+
+    name = "missing_exe"
+    inputs = DetectorInput.DIFF
+
+    def detect(self, context: DetectionContext) -> list[Alert]:  # noqa: D102
+        return context.state.missing_exe_alerts()
+
+
+class HashChangeDetector(Detector):
+    """Reports processes whose executable has been modified on disk while they were running."""
+
+    name = "hash_change"
+    inputs = DetectorInput.DIFF
+
+    def detect(self, context: DetectionContext) -> list[Alert]:  # noqa: D102
+        return context.state.hash_change_alerts()
+
+
+class DuplicateNameDetector(Detector):
+    """Reports processes that share a name with a process running from a different path."""
+
+    name = "duplicate_name"
+    inputs = DetectorInput.DIFF
+
+    def detect(self, context: DetectionContext) -> list[Alert]:  # noqa: D102
+        return context.state.duplicate_name_alerts()
+
+
+BUILTIN_DETECTORS: list[type[Detector]] = [MissingExeDetector, HashChangeDetector, DuplicateNameDetector]
+
+
+class DetectorRegistry:
+    """The DetectorRegistry holds the enabled detectors and runs each of them within its time budget."""
+
+    budget_ms: float
+    over_budget: str
+
+    def __init__(
+        self,
+        disabled: Iterable[str] = (),
+        budget_ms: float = 1000,
+        budgets: Mapping[str, float] | None = None,
+        over_budget: str = "warn",
+    ) -> None:
+        """Creates a new, empty registry.
+
+        :param disabled: The names of detectors that should not be run.
+        :param budget_ms: The default time budget for a single detector run, in milliseconds. 0 means no budget.
+        :param budgets: Time budgets for individual detectors by name, overriding the default.
+        :param over_budget: What to do when a detector overruns its budget: "warn" logs a warning, and "skip" also
+            leaves the detector out of the following cycles, backing off each time it overruns again.
+        """
+        if over_budget.lower() not in OVER_BUDGET_ACTIONS:
+            msg = f"Invalid detector over-budget action: {over_budget}"
+            raise ValueError(msg)
+        self.disabled = {name.strip().lower() for name in disabled if name.strip()}
+        self.budget_ms = budget_ms
+        self.budgets = {name.lower(): budget for name, budget in (budgets or {}).items()}
+        self.over_budget = over_budget.lower()
+        self.timings: dict[str, float] = {}
+        # The detectors that ran to completion in the last cycle, so every condition they detect was reported.
+        self.completed: list[str] = []
+        self.__detectors: dict[str, Detector] = {}
+        self.__loaded = False
+        self.__strikes: dict[str, int] = {}
+        self.__skip_cycles: dict[str, int] = {}
+        self.__deferred: set[str] = set()
+
+    @property
+    def detectors(self) -> list[Detector]:
+        """The enabled detectors, in the order they run.
+
+        :return: The enabled detectors.
+        """
+        return list(self.__detectors.values())
+
+    def register(self, detector: Detector) -> None:
+        """Add a detector, unless it has been disabled.
+
+        :param detector: The detector to add.
+        """
+        name = detector.name.lower()
+        if name in self.disabled:
+            logger.info("Detector %s is disabled.", name)
+            return
+        if name in self.__detectors:
+            logger.warning("Detector %s is already registered; ignoring %r.", name, detector)
+            return
+        self.__detectors[name] = detector
+
+    def load(self) -> None:
+        """Register the built-in detectors, then any installed through entry points. Only loads once."""
+        if self.__loaded:
+            return
+        self.__loaded = True
+        for detector_type in BUILTIN_DETECTORS:
+            self.register(detector_type())
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                loaded = entry_point.load()
+                detector = loaded() if isinstance(loaded, type) else loaded
+            except Exception:
+                logger.exception("Cannot load detector %s from %s.", entry_point.name, entry_point.value)
+                continue
+            if not isinstance(detector, Detector):
+                logger.error("Entry point %s does not provide a Detector.", entry_point.name)
+                continue
+            self.register(detector)
+
+    def run(self, context: DetectionContext) -> list[Alert]:
+        """Run each enabled detector whose inputs are available.
+
+        A detector that raises is logged and skipped; the others still run. Once the current cycle's
+        deadline has passed, the remaining detectors are deferred to the next cycle, where they run
+        whatever the deadline, so that every detector runs at least every other cycle.
+
+        :param context: The inputs for this cycle.
+        :return: The alerts from every detector, in the order the detectors were registered. Each alert's detector
+            is set to the name of the detector that raised it.
+        """
+        self.load()
+        alerts = []
+        self.completed = []
+        available = context.inputs
+        deadline = current_deadline()
+        deferred: set[str] = set()
+        for name, detector in self.__detectors.items():
+            if detector.inputs & available != detector.inputs:
+                logger.debug("Skipping detector %s: its inputs are not available.", name)
+                continue
+            if self.__skipping(name, scheduled=deadline is not None):
+                continue
+            if deadline is not None and deadline.expired and name not in self.__deferred:
+                deferred.add(name)
+                detectors_deferred.inc()
+                continue
+            start = perf_counter()
+            try:
+                found = detector.detect(context)
+            except Exception:
+                logger.exception("Detector %s failed.", name)
+            else:
+                for alert in found:
+                    alert.detector = alert.detector or name
+                alerts.extend(found)
+                self.completed.append(name)
+            elapsed = perf_counter() - start
+            self.timings[name] = elapsed
+            registry.gauge(
+                f"procmond_detector_{metric_name(name)}_seconds", f"Time taken by the {name} detector."
+            ).set(elapsed)
+            self.__check_budget(name, elapsed * 1000)
+        if deferred:
+            logger.warning("Out of time this cycle; deferred detectors %s.", ", ".join(sorted(deferred)))
+        if deadline is not None:
+            # Runs without a deadline, such as for process events between scans, don't count as a cycle.
+            self.__deferred = deferred
+        return alerts
+
+    def __skipping(self, name: str, *, scheduled: bool) -> bool:
+        if self.__skip_cycles.get(name, 0) <= 0:
+            return False
+        # Only scheduled cycles count down the backoff; process events between scans may come in bursts.
+        if scheduled:
+            self.__skip_cycles[name] -= 1
+        return True
+
+    def __check_budget(self, name: str, elapsed_ms: float) -> None:
+        budget = self.budgets.get(name, self.budget_ms)
+        if budget <= 0 or elapsed_ms <= budget:
+            self.__strikes.pop(name, None)
+            return
+        registry.counter(
+            f"procmond_detector_{metric_name(name)}_overruns_total",
+            f"Runs of the {name} detector that went over budget.",
+        ).inc()
+        if self.over_budget == "skip":
+            strikes = self.__strikes.get(name, 0) + 1
+            self.__strikes[name] = strikes
+            self.__skip_cycles[name] = min(2**strikes, MAX_SKIPPED_CYCLES)
+            logger.warning(
+                "Detector %s took %.1f ms, over its %.1f ms budget; skipping it for %s cycles.",
+                name,
+                elapsed_ms,
+                budget,
+                self.__skip_cycles[name],
+            )
+        else:
+            logger.warning("Detector %s took %.1f ms, over its %.1f ms budget.", name, elapsed_ms, budget)
@@ -1,7 +1,13 @@
 """Detection algorithms for ProcMonD.
 
 This module contains functions that detect suspicious process behavior
-by analyzing the process database.
+by analyzing the process database (see procmond.core.storage for its layout).
+
+Each query starts from the rows of the latest scan, which it finds with a
+single seek on scans and then on the (scan_id, pid) primary key of
+process_snapshots. Older history is only read for the processes still
+running, from the covering process_snapshots_pid_index, so no query reads
+more of the table as the history grows.
 """
 
 #  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
@@ -12,35 +18,81 @@ from __future__ import annotations
 
 from sqlite3 import connect
 
+from procmond.core.config_manager import get_config
 from procmond.models.alert import Alert
 
+MISSING_EXE_MESSAGE = "Process does not have executable on disk."
+DUPLICATE_NAME_MESSAGE = "{} processes exist with the same name, but different paths."
+HASH_CHANGE_MESSAGE = "Process executable has been modified on disk while the process was running."
+
+MISSING_EXE_SQL = """
+    SELECT p.pid, p.name, e.path
+    FROM process_snapshots p
+             JOIN executables e ON e.id = p.executable_id
+    WHERE p.scan_id = (SELECT MAX(id) FROM scans)
+      AND p.accessible = 1
+      AND e.file_exists = 0
+    ORDER BY p.pid
+    """
+
+DUPLICATE_NAME_SQL = """
+    SELECT pid, name, path, count(path) AS distinct_paths
+    FROM (
+             SELECT p.pid, p.name, e.path
+             FROM process_snapshots p
+                      JOIN executables e ON e.id = p.executable_id
+             WHERE p.scan_id = (SELECT MAX(id) FROM scans)
+               AND p.accessible = 1
+               AND NOT e.path ISNULL
+             GROUP BY p.name, e.path
+         )
+    GROUP BY name
+    HAVING distinct_paths > 1
+    ORDER BY distinct_paths DESC
+    """
+
+# The history of each running process is the rows with its pid and creation time, however many scans there are.
+HASH_CHANGE_SQL = """
+    SELECT p.pid, p.name, e.path, count(DISTINCT he.hash) AS unique_hashes
+    FROM process_snapshots p
+             JOIN executables e ON e.id = p.executable_id
+             JOIN process_snapshots h ON h.pid = p.pid AND h.create_time IS p.create_time
+             JOIN executables he ON he.id = h.executable_id
+    WHERE p.scan_id = (SELECT MAX(id) FROM scans)
+      AND p.accessible = 1
+      AND NOT e.path ISNULL
+      AND he.path = e.path
+      AND NOT he.hash ISNULL
+      AND he.hash != ''
+    GROUP BY p.pid, p.create_time
+    HAVING unique_hashes > 1
+    ORDER BY unique_hashes DESC
+    """
+
+DETECTOR_QUERIES = {
+    "missing_exe": MISSING_EXE_SQL,
+    "duplicate_name": DUPLICATE_NAME_SQL,
+    "hash_change": HASH_CHANGE_SQL,
+}
+
 
 def detect_process_without_exe() -> list[Alert]:
     """Checks for processes with no corresponding executables on disk.
 
     :return: A List of Alerts for each process that has no associated executable.
     """
-    # import config lazily to avoid circular import when daemon initializes
-    from procmond.daemon import config  # noqa: PLC0415
-
+    config = get_config()
     result = []
     with connect(config.database_path) as conn:
         cur = conn.cursor()
-        sql = """SELECT id, updated_at, name, path, file_exists
-                FROM processes
-                WHERE file_exists = 0
-                  AND accessible = 1
-                  AND updated_at = (SELECT MAX(updated_at) FROM processes)
-                ORDER BY updated_at DESC
-                """
-        cur.execute(sql)
+        cur.execute(MISSING_EXE_SQL)
         for record in cur:
-            pid, _updated_at, name, file_path, _file_exists = record
+            pid, name, file_path = record
             alert = Alert(
                 pid=pid,
                 name=name,
                 path=file_path,
-                message="Process does not have executable on disk.",
+                message=MISSING_EXE_MESSAGE,
             )
             result.append(alert)
     return result
@@ -54,34 +106,18 @@ def detect_process_with_duplicate_name() -> list[Alert]:
 
     :return: A List of Alerts for each process that has no associated executable.
     """
-    # import config lazily to avoid circular import when daemon initializes
-    from procmond.daemon import config  # noqa: PLC0415
-
+    config = get_config()
     result = []
     with connect(config.database_path) as conn:
         cur = conn.cursor()
-        sql = """
-                SELECT id, updated_at, name, path, count(path) AS distinct_paths
-                FROM (
-                         SELECT id, updated_at, name, path, file_exists
-                         FROM processes
-                         WHERE updated_at = (SELECT MAX(updated_at) FROM processes)
-                           AND accessible = 1
-                           AND NOT path ISNULL
-                         GROUP BY name, path
-                     )
-                GROUP BY name
-                HAVING distinct_paths > 1
-                ORDER BY distinct_paths DESC
-                """
-        cur.execute(sql)
+        cur.execute(DUPLICATE_NAME_SQL)
         for record in cur:
-            pid, _updated_at, name, file_path, distinct_paths = record
+            pid, name, file_path, distinct_paths = record
             alert = Alert(
                 pid=pid,
                 name=name,
                 path=file_path,
-                message=(f"{distinct_paths} processes exist with the same name, but different paths."),
+                message=DUPLICATE_NAME_MESSAGE.format(distinct_paths),
             )
             result.append(alert)
     return result
@@ -90,37 +126,24 @@ def detect_process_with_duplicate_name() -> list[Alert]:
 def detect_process_with_hash_change() -> list[Alert]:
     """Checks for processes where the executable on disk has changed while the process is running.
 
-    :return: A List of Alerts for each process that has no associated executable.
-    """
-    # import config lazily to avoid circular import when daemon initializes
-    from procmond.daemon import config  # noqa: PLC0415
+    A process is identified by its pid and creation time, so a reused pid is not mistaken for a change. Only
+    processes in the latest scan are checked; one that has since exited is no longer reported. An executable
+    that has been deleted has no hash, and is reported by detect_process_without_exe instead.
 
+    :return: A List of Alerts for each process whose executable has had more than one hash.
+    """
+    config = get_config()
     result = []
     with connect(config.database_path) as conn:
         cur = conn.cursor()
-        sql = """
-                SELECT id, name, path, count(hash) AS unique_hashes
-                FROM (
-                         SELECT id, updated_at, name, path, hash
-                         FROM processes
-                         WHERE accessible = 1
-                           AND NOT path ISNULL
-                           AND NOT hash ISNULL
-                         GROUP BY id, path
-                         ORDER BY name
-                     )
-                GROUP BY id, path, hash
-                HAVING unique_hashes > 1
-                ORDER BY unique_hashes DESC
-                """
-        cur.execute(sql)
+        cur.execute(HASH_CHANGE_SQL)
         for record in cur:
-            pid, _updated_at, name, file_path, _file_exists = record
+            pid, name, file_path, _unique_hashes = record
             alert = Alert(
                 pid=pid,
                 name=name,
                 path=file_path,
-                message=("Process executable has been modified on disk while the process was running."),
+                message=HASH_CHANGE_MESSAGE,
             )
             result.append(alert)
     return result
@@ -0,0 +1,243 @@
+"""Alert dispatch for ProcMonD.
+
+This module delivers alerts to each enabled sink (syslog, email, webhook) on
+a worker thread of its own, so that a slow or unreachable sink neither blocks
+the daemon nor holds up the other sinks. Each sink has a bounded queue that
+drops its oldest alerts when the sink falls behind, collects alerts into
+batches, and retries failed deliveries with exponential backoff.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from collections import deque
+from logging import getLogger
+from threading import Condition, Event, Thread
+from time import monotonic
+from typing import TYPE_CHECKING
+
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from procmond.models.alert import Alert
+
+logger = getLogger(__name__)
+
+# The longest wait between retries, in seconds, however many times a delivery has failed.
+MAX_RETRY_DELAY = 300.0
+
+alerts_emitted = registry.counter("procmond_alerts_emitted_total", "Alerts sent to the alert sinks for delivery.")
+
+
+class SinkWorker:
+    """A SinkWorker owns the queue for one sink and delivers its alerts in batches on a background thread."""
+
+    name: str
+    batch_size: int
+    linger: float
+    max_retries: int
+    retry_delay: float
+
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        handler: Callable[[list[Alert]], None],
+        *,
+        queue_size: int = 1000,
+        batch_size: int = 100,
+        linger: float = 0.5,
+        max_retries: int = 5,
+        retry_delay: float = 1.0,
+    ) -> None:
+        """Creates a new worker and starts its thread.
+
+        :param name: The name of the sink, used in logs and metric names.
+        :param handler: Delivers a batch of alerts, raising an exception if the delivery failed.
+        :param queue_size: The most alerts that may wait for delivery. Beyond this, the oldest are dropped.
+        :param batch_size: The most alerts delivered at once.
+        :param linger: How long to wait for a batch to fill before delivering it anyway, in seconds.
+        :param max_retries: How many times to retry a failed delivery before dropping the batch.
+        :param retry_delay: The wait before the first retry, in seconds. It doubles with each retry.
+        """
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.linger = linger
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.__handler = handler
+        self.__queue: deque[tuple[float, Alert]] = deque(maxlen=max(1, queue_size))
+        self.__condition = Condition()
+        self.__stopping = Event()
+        self.__queue_depth = registry.gauge(
+            f"procmond_alert_{name}_queue_depth", f"Alerts waiting for delivery to {name}."
+        )
+        self.__latency = registry.gauge(
+            f"procmond_alert_{name}_latency_seconds",
+            f"Time from queueing to delivery for the oldest alert in the last batch delivered to {name}.",
+        )
+        self.__delivered = registry.counter(f"procmond_alert_{name}_delivered_total", f"Alerts delivered to {name}.")
+        self.__dropped = registry.counter(
+            f"procmond_alert_{name}_dropped_total", f"Alerts dropped before they could be delivered to {name}."
+        )
+        self.__failures = registry.counter(
+            f"procmond_alert_{name}_failures_total", f"Failed attempts to deliver alerts to {name}."
+        )
+        self.__delivery_seconds = registry.histogram(
+            f"procmond_alert_{name}_delivery_seconds", f"Time taken by each attempt to deliver alerts to {name}."
+        )
+        self.__thread = Thread(target=self.__run, name=f"procmond-alert-{name}", daemon=True)
+        self.__thread.start()
+
+    def __len__(self) -> int:
+        """Return the number of alerts waiting for delivery.
+
+        :return: The queue depth.
+        """
+        return len(self.__queue)
+
+    def submit(self, alerts: Iterable[Alert]) -> None:
+        """Queue alerts for delivery, dropping the oldest waiting alerts if the queue is full. Never blocks.
+
+        :param alerts: The alerts to deliver.
+        """
+        now = monotonic()
+        with self.__condition:
+            for alert in alerts:
+                if len(self.__queue) == self.__queue.maxlen:
+                    self.__dropped.inc()
+                self.__queue.append((now, alert))
+            self.__queue_depth.set(len(self.__queue))
+            self.__condition.notify()
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop the worker, making one last attempt to deliver anything still queued.
+
+        :param timeout: The longest time to wait for the worker to finish, in seconds.
+        """
+        self.__stopping.set()
+        with self.__condition:
+            self.__condition.notify()
+        self.__thread.join(timeout)
+
+    def __run(self) -> None:
+        while True:
+            batch = self.__next_batch()
+            if batch is None:
+                return
+            self.__deliver(batch)
+
+    def __next_batch(self) -> list[tuple[float, Alert]] | None:
+        with self.__condition:
+            while not self.__queue:
+                if self.__stopping.is_set():
+                    return None
+                self.__condition.wait()
+            # Give the batch a chance to fill up, counting from when its oldest alert was queued.
+            deadline = self.__queue[0][0] + self.linger
+            while len(self.__queue) < self.batch_size and not self.__stopping.is_set():
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    break
+                self.__condition.wait(remaining)
+            batch = [self.__queue.popleft() for _ in range(min(self.batch_size, len(self.__queue)))]
+            self.__queue_depth.set(len(self.__queue))
+        return batch
+
+    def __deliver(self, batch: list[tuple[float, Alert]]) -> None:
+        alerts = [alert for _, alert in batch]
+        attempt = 0
+        while True:
+            try:
+                with self.__delivery_seconds.time():
+                    self.__handler(alerts)
+            except Exception:
+                self.__failures.inc()
+                attempt += 1
+                if attempt > self.max_retries or self.__stopping.is_set():
+                    logger.exception("Could not deliver %s alerts to %s; dropping them.", len(alerts), self.name)
+                    self.__dropped.inc(len(alerts))
+                    return
+                delay = min(self.retry_delay * 2 ** (attempt - 1), MAX_RETRY_DELAY)
+                logger.warning("Delivery to %s failed; retrying in %.1f s.", self.name, delay, exc_info=True)
+                # Waiting on the stop event lets close() cut the backoff short.
+                self.__stopping.wait(delay)
+                continue
+            self.__delivered.inc(len(alerts))
+            self.__latency.set(monotonic() - batch[0][0])
+            return
+
+
+class AlertDispatcher:
+    """The AlertDispatcher fans each batch of alerts out to every registered sink."""
+
+    def __init__(
+        self,
+        queue_size: int = 1000,
+        batch_size: int = 100,
+        linger: float = 0.5,
+        max_retries: int = 5,
+        retry_delay: float = 1.0,
+    ) -> None:
+        """Creates a new dispatcher with no sinks.
+
+        :param queue_size: The most alerts that may wait for delivery to each sink.
+        :param batch_size: The most alerts delivered to a sink at once.
+        :param linger: How long to wait for a batch to fill before delivering it anyway, in seconds.
+        :param max_retries: How many times to retry a failed delivery before dropping the batch.
+        :param retry_delay: The wait before the first retry, in seconds. It doubles with each retry.
+        """
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.linger = linger
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.__sinks: dict[str, SinkWorker] = {}
+
+    @property
+    def sinks(self) -> list[SinkWorker]:
+        """The registered sinks.
+
+        :return: The worker for each sink.
+        """
+        return list(self.__sinks.values())
+
+    def add_sink(self, name: str, handler: Callable[[list[Alert]], None]) -> None:
+        """Register a sink and start its worker.
+
+        :param name: The name of the sink.
+        :param handler: Delivers a batch of alerts, raising an exception if the delivery failed.
+        """
+        if name in self.__sinks:
+            msg = f"Alert sink {name} is already registered"
+            raise ValueError(msg)
+        self.__sinks[name] = SinkWorker(
+            name,
+            handler,
+            queue_size=self.queue_size,
+            batch_size=self.batch_size,
+            linger=self.linger,
+            max_retries=self.max_retries,
+            retry_delay=self.retry_delay,
+        )
+
+    def dispatch(self, alerts: list[Alert]) -> None:
+        """Queue alerts for delivery to every sink. Never blocks.
+
+        :param alerts: The alerts to deliver.
+        """
+        alerts_emitted.inc(len(alerts))
+        for sink in self.__sinks.values():
+            sink.submit(alerts)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Stop every sink's worker, making one last attempt to deliver anything still queued.
+
+        :param timeout: The longest time to wait for each worker, in seconds.
+        """
+        for sink in self.__sinks.values():
+            sink.close(timeout)
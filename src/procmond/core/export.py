@@ -0,0 +1,251 @@
+"""Columnar export of the process history for ProcMonD.
+
+This module copies the process history out of the daemon's database into
+compressed files partitioned by day, so that it can be analysed offline
+without competing with the daemon for the database. Files are written as
+Parquet when pyarrow is installed, and as gzipped CSV otherwise.
+
+The history is read in chunks of a fixed number of rows, in (scan, pid)
+order, over a read-only connection. Each chunk is read in a short
+transaction of its own, so the export never holds the database open long
+enough to stop the daemon checkpointing its WAL. After each chunk is written,
+the key of its last row is saved as a high-water mark in the output
+directory, and the next export carries on from there.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+from datetime import datetime
+from importlib.util import find_spec
+from itertools import groupby
+from logging import getLogger
+from pathlib import Path
+from sqlite3 import Connection, connect
+from time import perf_counter, sleep
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Sequence
+
+logger = getLogger(__name__)
+
+EXPORT_FORMATS = ("auto", "parquet", "csv")
+# The high-water mark, kept with the files it describes.
+STATE_FILE = "export-state.json"
+COLUMNS = (
+    "scan_id",
+    "scanned_at",
+    "pid",
+    "ppid",
+    "create_time",
+    "name",
+    "path",
+    "hash",
+    "file_exists",
+    "valid",
+    "accessible",
+)
+BOOLEAN_COLUMNS = frozenset(("file_exists", "valid", "accessible"))
+
+# Walks the history by its primary key, so each chunk starts with an index seek however far in it is.
+SELECT_CHUNK = """
+    SELECT p.scan_id, s.scanned_at, p.pid, p.ppid, p.create_time, p.name, e.path, e."hash", e.file_exists,
+           p.valid, p.accessible
+    FROM process_snapshots p
+    JOIN scans s ON s.id = p.scan_id
+    LEFT JOIN executables e ON e.id = p.executable_id
+    WHERE (p.scan_id, p.pid) > (?, ?) AND p.scan_id <= ?
+    ORDER BY p.scan_id, p.pid
+    LIMIT ?
+    """
+
+Row = tuple[object, ...]
+
+
+class ExportResult(NamedTuple):
+    """The work done by a single export."""
+
+    rows_exported: int
+    files_written: int
+    last_scan_id: int
+    elapsed_ms: float
+
+
+def pyarrow_available() -> bool:
+    """Check whether pyarrow is installed, without importing it.
+
+    :return: True if Parquet files can be written.
+    """
+    return find_spec("pyarrow") is not None
+
+
+class SnapshotExporter:
+    """The SnapshotExporter copies new process history to partitioned files, a bounded chunk at a time."""
+
+    database_path: str
+    output_dir: Path
+    format: str
+    chunk_rows: int
+
+    def __init__(
+        self, database_path: str, output_dir: str | Path, *, export_format: str = "auto", chunk_rows: int = 50_000
+    ) -> None:
+        """Creates a new exporter. The database is only opened while exporting.
+
+        :param database_path: The location of the daemon's SQLite database.
+        :param output_dir: The directory the files and the high-water mark are written to.
+        :param export_format: "parquet", "csv" for gzipped CSV, or "auto" for Parquet when pyarrow is installed.
+        :param chunk_rows: The most rows read, held in memory and written to a file at a time.
+        """
+        if export_format not in EXPORT_FORMATS:
+            msg = f"Unknown export format {export_format!r}; expected one of {', '.join(EXPORT_FORMATS)}."
+            raise ValueError(msg)
+        if export_format == "auto":
+            export_format = "parquet" if pyarrow_available() else "csv"
+        elif export_format == "parquet" and not pyarrow_available():
+            msg = "Exporting to Parquet needs pyarrow; install procmond-prototype[export] or export to csv instead."
+            raise ImportError(msg)
+        self.database_path = database_path
+        self.output_dir = Path(output_dir)
+        self.format = export_format
+        self.chunk_rows = max(1, chunk_rows)
+        self.__write: Callable[[Path, Sequence[Row]], None] = (
+            _write_parquet if export_format == "parquet" else _write_csv
+        )
+        self.__extension = ".parquet" if export_format == "parquet" else ".csv.gz"
+
+    @property
+    def state_path(self) -> Path:
+        """The location of the high-water mark."""
+        return self.output_dir / STATE_FILE
+
+    def high_water_mark(self) -> tuple[int, int]:
+        """Read the key of the last row exported.
+
+        :return: The scan ID and pid of the last row exported, or (0, 0) if nothing has been exported yet.
+        """
+        try:
+            state = json.loads(self.state_path.read_text())
+        except FileNotFoundError:
+            return 0, 0
+        return int(state["scan_id"]), int(state["pid"])
+
+    def run(self) -> ExportResult:
+        """Export the rows of every scan written since the high-water mark, up to the newest scan now.
+
+        :return: The work done by this export.
+        """
+        start = perf_counter()
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        mark = self.high_water_mark()
+        exported = 0
+        files = 0
+        conn = self.__connect()
+        try:
+            (newest_scan,) = conn.execute("SELECT coalesce(max(id), 0) FROM scans;").fetchone()
+            while True:
+                rows = conn.execute(SELECT_CHUNK, (*mark, newest_scan, self.chunk_rows)).fetchall()
+                if not rows:
+                    break
+                files += self.__write_chunk(rows)
+                exported += len(rows)
+                last = rows[-1]
+                mark = (last[0], last[2])
+                self.__save_mark(mark)
+        finally:
+            conn.close()
+        elapsed = perf_counter() - start
+        if exported:
+            logger.info(
+                "Exported %s process rows to %s files in %s in %.1f ms.",
+                exported,
+                files,
+                self.output_dir,
+                elapsed * 1000,
+            )
+        return ExportResult(exported, files, mark[0], elapsed * 1000)
+
+    def follow(self, interval: float, on_export: Callable[[ExportResult], None] | None = None) -> None:
+        """Export new history every so often, until interrupted.
+
+        :param interval: The number of seconds between exports.
+        :param on_export: Called with the result of each export.
+        """
+        while True:
+            result = self.run()
+            if on_export is not None:
+                on_export(result)
+            sleep(interval)
+
+    def __connect(self) -> Connection:
+        # Read-only, so that the export can't take the write lock from the daemon.
+        uri = f"{Path(self.database_path).resolve().as_uri()}?mode=ro"
+        return connect(uri, uri=True)
+
+    def __write_chunk(self, rows: Sequence[Row]) -> int:
+        files = 0
+        # scanned_at is stored as an ISO 8601 string, so its first 10 characters are the day of the scan.
+        for day, day_rows in groupby(rows, key=lambda row: str(row[1])[:10]):
+            partition_rows = list(day_rows)
+            first = partition_rows[0]
+            partition = self.output_dir / f"date={day}"
+            partition.mkdir(exist_ok=True)
+            # Named after the first row, so a chunk exported again after a crash replaces its earlier file.
+            path = partition / f"part-{first[0]:012d}-{first[2]}{self.__extension}"
+            # Written under a temporary name, so readers never see half a file.
+            temporary = path.with_name(f".{path.name}.tmp")
+            self.__write(temporary, partition_rows)
+            temporary.replace(path)
+            files += 1
+        return files
+
+    def __save_mark(self, mark: tuple[int, int]) -> None:
+        temporary = self.state_path.with_name(f".{STATE_FILE}.tmp")
+        temporary.write_text(json.dumps({"database": self.database_path, "scan_id": mark[0], "pid": mark[1]}))
+        # Replaced, not rewritten, so an interrupted export leaves the previous mark intact.
+        temporary.replace(self.state_path)
+
+
+def _write_csv(path: Path, rows: Sequence[Row]) -> None:
+    with gzip.open(path, "wt", encoding="utf-8", newline="", compresslevel=6) as out:
+        writer = csv.writer(out)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+
+def _write_parquet(path: Path, rows: Sequence[Row]) -> None:
+    import pyarrow as pa  # noqa: PLC0415  # pyright: ignore[reportMissingImports]
+    import pyarrow.parquet as pq  # noqa: PLC0415  # pyright: ignore[reportMissingImports]
+
+    schema = pa.schema(
+        [
+            ("scan_id", pa.int64()),
+            ("scanned_at", pa.timestamp("us", tz="UTC")),
+            ("pid", pa.int64()),
+            ("ppid", pa.int64()),
+            ("create_time", pa.float64()),
+            ("name", pa.string()),
+            ("path", pa.string()),
+            ("hash", pa.string()),
+            ("file_exists", pa.bool_()),
+            ("valid", pa.bool_()),
+            ("accessible", pa.bool_()),
+        ]
+    )
+    columns: dict[str, list[object]] = {}
+    for name, values in zip(COLUMNS, zip(*rows, strict=True), strict=True):
+        if name == "scanned_at":
+            columns[name] = [datetime.fromisoformat(v) if isinstance(v, str) else v for v in values]
+        elif name in BOOLEAN_COLUMNS:
+            # SQLite stores the flags as 0 and 1.
+            columns[name] = [None if v is None else bool(v) for v in values]
+        else:
+            columns[name] = list(values)
+    pq.write_table(pa.table(columns, schema=schema), path, compression="zstd")
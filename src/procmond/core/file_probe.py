@@ -0,0 +1,88 @@
+"""File metadata probes for ProcMonD.
+
+Many processes usually share a few executables, so rather than each process
+record checking its own executable on disk, this module stats each unique path
+once per scan and shares the result with every record that uses the path.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import os
+import stat
+from typing import TYPE_CHECKING, NamedTuple
+
+from procmond.core.hash_cache import FileIdentity
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+files_probed = registry.counter("procmond_files_probed_total", "Executable paths stat-ed by scans.")
+
+
+class FileProbe(NamedTuple):
+    """The metadata of a file on disk, as observed by a single stat."""
+
+    exists: bool
+    accessible: bool
+    device: int = 0
+    inode: int = 0
+    size: int = 0
+    mtime_ns: int = 0
+    ctime_ns: int = 0
+    mode: int = 0
+
+    @property
+    def is_file(self) -> bool:
+        """Whether the file exists and is a regular file."""
+        return self.exists and stat.S_ISREG(self.mode)
+
+    @property
+    def identity(self) -> FileIdentity:
+        """The stat identity of the file, as used by the hash cache."""
+        return FileIdentity(self.device, self.inode, self.size, self.mtime_ns, self.ctime_ns)
+
+
+# A file that isn't there.
+MISSING = FileProbe(exists=False, accessible=True)
+# A file whose directory we aren't allowed to look in.
+DENIED = FileProbe(exists=False, accessible=False)
+
+
+def probe_file(file_path: str) -> FileProbe:
+    """Stat a file.
+
+    :param file_path: The path of the file on disk.
+    :return: The file's metadata, or MISSING or DENIED if it cannot be stat-ed.
+    """
+    files_probed.inc()
+    try:
+        # os.stat() rather than Path.stat(), to save building a Path for every executable on every scan.
+        st = os.stat(file_path)  # noqa: PTH116
+    except PermissionError:
+        return DENIED
+    except (OSError, ValueError):
+        return MISSING
+    return FileProbe(
+        exists=True,
+        accessible=True,
+        device=st.st_dev,
+        inode=st.st_ino,
+        size=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        ctime_ns=st.st_ctime_ns,
+        mode=st.st_mode,
+    )
+
+
+def probe_files(paths: Iterable[str]) -> dict[str, FileProbe]:
+    """Stat each unique file once.
+
+    :param paths: The paths of the files on disk. Duplicates and empty paths are skipped.
+    :return: A mapping of path to metadata.
+    """
+    return {file_path: probe_file(file_path) for file_path in dict.fromkeys(paths) if file_path}
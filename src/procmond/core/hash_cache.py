@@ -0,0 +1,183 @@
+"""Content-hash cache for ProcMonD.
+
+This module provides an LRU-bounded cache of executable file hashes keyed by
+each file's stat identity, persisted to the process database so that unchanged
+binaries are not re-read and re-hashed on every scan.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import UTC, datetime
+from logging import getLogger
+from pathlib import Path
+from threading import Lock
+from typing import TYPE_CHECKING, NamedTuple
+
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from sqlite3 import Connection, Cursor
+
+logger = getLogger(__name__)
+
+cache_hits = registry.counter("procmond_hash_cache_hits_total", "Executable hashes found in the hash cache.")
+cache_misses = registry.counter("procmond_hash_cache_misses_total", "Executable hashes not found in the hash cache.")
+
+
+class FileIdentity(NamedTuple):
+    """The stat identity of a file. If any field changes, the file's content may have changed."""
+
+    device: int
+    inode: int
+    size: int
+    mtime_ns: int
+    ctime_ns: int
+
+    @classmethod
+    def from_path(cls, file_path: str) -> FileIdentity:
+        """Stat a file and return its identity.
+
+        :param file_path: The path of the file on disk.
+        :return: The stat identity of the file.
+        """
+        st = Path(file_path).stat()
+        return cls(st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+
+
+class HashCache:
+    """The HashCache maps file identities to their SHA256 digests, evicting the least recently used entries.
+
+    A cache may be shared between threads, such as the scan thread that hashes files and the thread that
+    flushes the cache to the database.
+    """
+
+    max_entries: int
+    hits: int
+    misses: int
+
+    def __init__(self, max_entries: int = 4096) -> None:
+        """Creates a new, empty hash cache.
+
+        :param max_entries: The maximum number of digests kept in memory and in the database.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.__entries: OrderedDict[FileIdentity, str] = OrderedDict()
+        self.__touched: set[FileIdentity] = set()
+        self.__lock = Lock()
+
+    def __len__(self) -> int:
+        """Return the number of cached digests.
+
+        :return: The number of cached digests.
+        """
+        return len(self.__entries)
+
+    @staticmethod
+    def create_schema(cur: Cursor) -> None:
+        """Create the hash cache table if it doesn't already exist.
+
+        :param cur: A cursor on the process database.
+        """
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS hash_cache "
+            "(device INTEGER, inode INTEGER, size INTEGER, mtime_ns INTEGER, ctime_ns INTEGER, "
+            '"hash" VARCHAR, last_used DATETIME, '
+            "CONSTRAINT hash_cache_pk PRIMARY KEY (device, inode, size, mtime_ns, ctime_ns));"
+        )
+
+    def get(self, identity: FileIdentity) -> str | None:
+        """Look up the digest of a file identity.
+
+        :param identity: The stat identity of the file.
+        :return: The cached digest, or None if the identity is not cached.
+        """
+        with self.__lock:
+            digest = self.__entries.get(identity)
+            if digest is None:
+                self.misses += 1
+                cache_misses.inc()
+                return None
+            self.hits += 1
+            cache_hits.inc()
+            self.__entries.move_to_end(identity)
+            self.__touched.add(identity)
+        return digest
+
+    def put(self, identity: FileIdentity, digest: str) -> None:
+        """Store the digest of a file identity, evicting the least recently used entry if full.
+
+        :param identity: The stat identity of the file.
+        :param digest: The hex digest of the file's content.
+        """
+        with self.__lock:
+            self.__entries[identity] = digest
+            self.__entries.move_to_end(identity)
+            self.__touched.add(identity)
+            while len(self.__entries) > self.max_entries:
+                evicted, _ = self.__entries.popitem(last=False)
+                self.__touched.discard(evicted)
+
+    def digest(self, file_path: str, compute: Callable[[str], str]) -> str:
+        """Return the digest of a file, computing it only if its stat identity isn't cached.
+
+        :param file_path: The path of the file on disk.
+        :param compute: A function that reads the file and returns its hex digest.
+        :return: The hex digest of the file's content.
+        """
+        identity = FileIdentity.from_path(file_path)
+        cached = self.get(identity)
+        if cached is not None:
+            return cached
+        file_hash = compute(file_path)
+        # Only cache the digest if the file didn't change underneath us while it was being read.
+        if file_hash and FileIdentity.from_path(file_path) == identity:
+            self.put(identity, file_hash)
+        return file_hash
+
+    def load(self, conn: Connection) -> None:
+        """Load the most recently used digests from the process database.
+
+        :param conn: A connection to the process database.
+        """
+        cur = conn.cursor()
+        self.create_schema(cur)
+        cur.execute(
+            'SELECT device, inode, size, mtime_ns, ctime_ns, "hash" FROM hash_cache ORDER BY last_used DESC LIMIT ?',
+            (self.max_entries,),
+        )
+        # Rows arrive most recent first, so insert them in reverse to keep the LRU order.
+        rows = cur.fetchall()
+        with self.__lock:
+            for *identity, digest in reversed(rows):
+                self.__entries[FileIdentity(*identity)] = digest
+        logger.debug("Loaded %s cached executable hashes.", len(self.__entries))
+
+    def flush(self, conn: Connection) -> None:
+        """Persist the digests used since the last flush and prune the table to the cache size.
+
+        The changes are made in the caller's transaction, which the caller is responsible for committing.
+
+        :param conn: A connection to the process database, on which the hash cache table exists.
+        """
+        timestamp = datetime.now(UTC)
+        with self.__lock:
+            rows = [(*identity, self.__entries[identity], timestamp) for identity in self.__touched]
+            self.__touched.clear()
+        cur = conn.cursor()
+        cur.executemany(
+            'INSERT OR REPLACE INTO hash_cache (device, inode, size, mtime_ns, ctime_ns, "hash", last_used) '
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        cur.execute(
+            "DELETE FROM hash_cache WHERE rowid NOT IN (SELECT rowid FROM hash_cache ORDER BY last_used DESC LIMIT ?)",
+            (self.max_entries,),
+        )
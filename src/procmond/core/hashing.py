@@ -0,0 +1,263 @@
+"""Executable hashing for ProcMonD.
+
+This module hashes the executables behind a process scan. Each unique file is
+hashed once per scan on a bounded thread pool (``hashlib`` releases the GIL
+while digesting), reading into reused buffers or through ``mmap`` for large
+files, and a per-cycle byte budget keeps a scan from saturating disk I/O.
+Files that can't be hashed before the cycle's deadline are left for the next
+scan.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from functools import partial
+from hashlib import sha256
+from logging import getLogger
+from mmap import ACCESS_READ, mmap
+from os import fstat
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from procmond.core.deadline import current_deadline
+from procmond.core.file_probe import probe_file
+from procmond.core.hash_cache import FileIdentity
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Mapping
+
+    from procmond.core.deadline import Deadline
+    from procmond.core.file_probe import FileProbe
+    from procmond.core.hash_cache import HashCache
+    from procmond.models.process_record import ProcessRecord
+
+logger = getLogger(__name__)
+
+hash_seconds = registry.histogram("procmond_hash_seconds", "Time taken to hash the executables of each scan.")
+files_hashed = registry.counter("procmond_files_hashed_total", "Executables read and hashed.")
+bytes_hashed = registry.counter("procmond_hashed_bytes_total", "Bytes read from executables to hash them.")
+files_deferred = registry.counter(
+    "procmond_files_deferred_total", "Executables left for a later scan by the byte budget or the cycle deadline."
+)
+
+DEFAULT_BUFFER_SIZE = 1024 * 1024
+DEFAULT_MMAP_THRESHOLD = 16 * 1024 * 1024
+
+_buffers = threading.local()
+
+
+def _read_buffer(buffer_size: int) -> memoryview:
+    """Return this thread's reusable read buffer, allocating it on first use.
+
+    :param buffer_size: The size of the buffer in bytes.
+    :return: A writable view over the buffer.
+    """
+    buf: memoryview | None = getattr(_buffers, "buffer", None)
+    if buf is None or len(buf) != buffer_size:
+        buf = memoryview(bytearray(buffer_size))
+        _buffers.buffer = buf
+    return buf
+
+
+def hash_file(
+    file_path: str,
+    buffer_size: int = DEFAULT_BUFFER_SIZE,
+    mmap_threshold: int = DEFAULT_MMAP_THRESHOLD,
+) -> str:
+    """Calculate the SHA256 hash of a file on disk.
+
+    Files of at least ``mmap_threshold`` bytes are memory-mapped and digested in a single call,
+    smaller files are read into a reused per-thread buffer.
+
+    :param file_path: The path of the file to hash.
+    :param buffer_size: The number of bytes to read at a time.
+    :param mmap_threshold: The file size at which to switch to mmap, or 0 to never use mmap.
+    :return: The hex digest of the file's content.
+    """
+    hasher = sha256()
+    with Path(file_path).open("rb", buffering=0) as f:
+        if mmap_threshold and fstat(f.fileno()).st_size >= mmap_threshold:
+            with mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+                hasher.update(mm)
+        else:
+            buf = _read_buffer(buffer_size)
+            while n := f.readinto(buf):
+                hasher.update(buf[:n])
+    return hasher.hexdigest()
+
+
+def _hash_and_restat(file_path: str, buffer_size: int, mmap_threshold: int) -> tuple[str, FileIdentity]:
+    """Hash a file on a worker thread and report its identity once the read has finished.
+
+    :param file_path: The path of the file to hash.
+    :param buffer_size: The number of bytes to read at a time.
+    :param mmap_threshold: The file size at which to switch to mmap.
+    :return: The hex digest and the stat identity of the file after hashing.
+    """
+    return hash_file(file_path, buffer_size, mmap_threshold), FileIdentity.from_path(file_path)
+
+
+class HashingEngine:
+    """The HashingEngine hashes the unique executables of a scan concurrently, within a per-cycle byte budget."""
+
+    workers: int
+    buffer_size: int
+    mmap_threshold: int
+    byte_budget: int
+    bytes_hashed: int
+    files_hashed: int
+    files_deferred: int
+
+    def __init__(
+        self,
+        cache: HashCache | None = None,
+        workers: int = 4,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+        mmap_threshold: int = DEFAULT_MMAP_THRESHOLD,
+        byte_budget: int = 0,
+    ) -> None:
+        """Creates a new hashing engine. The worker pool is started on first use.
+
+        :param cache: The hash cache consulted before, and updated after, hashing each file.
+        :param workers: The maximum number of files hashed at once.
+        :param buffer_size: The number of bytes read at a time from files below the mmap threshold.
+        :param mmap_threshold: The file size at which to switch to mmap, or 0 to never use mmap.
+        :param byte_budget: The maximum number of bytes read per cycle, or 0 for no limit.
+        """
+        self.cache = cache
+        self.workers = max(1, workers)
+        self.buffer_size = buffer_size
+        self.mmap_threshold = mmap_threshold
+        self.byte_budget = byte_budget
+        self.bytes_hashed = 0
+        self.files_hashed = 0
+        self.files_deferred = 0
+        self.__executor: ThreadPoolExecutor | None = None
+
+    def __get_executor(self) -> ThreadPoolExecutor:
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="procmond-hash")
+        return self.__executor
+
+    def hash_paths(
+        self, paths: Iterable[str], probes: Mapping[str, FileProbe | None] | None = None
+    ) -> dict[str, str | None]:
+        """Hash each unique regular file, using the cache where the file's identity hasn't changed.
+
+        Paths that cannot be stat-ed or are not regular files are left out of the result. Files that
+        would exceed the byte budget, or that aren't hashed by the current cycle's deadline, are mapped
+        to None and will be picked up by a later cycle. A file already being read at the deadline is
+        still hashed into the cache, ready for the next cycle.
+
+        :param paths: The executable paths seen by the scan. Duplicates are hashed once.
+        :param probes: The scan's probe of each path, if it has one; other paths are stat-ed here.
+        :return: A mapping of path to hex digest, or None where hashing was deferred.
+        """
+        results: dict[str, str | None] = {}
+        pending: dict[str, FileIdentity] = {}
+        budget_used = 0
+        deadline = current_deadline()
+        for file_path in dict.fromkeys(paths):
+            probe = probes.get(file_path) if probes is not None else None
+            if probe is None:
+                probe = probe_file(file_path)
+            if not probe.is_file:
+                continue
+            identity = probe.identity
+            cached = self.cache.get(identity) if self.cache is not None else None
+            if cached is not None:
+                results[file_path] = cached
+                continue
+            # Always allow the first file through, so a single file larger than the budget still gets hashed.
+            over_budget = self.byte_budget and budget_used and budget_used + identity.size > self.byte_budget
+            if over_budget or (deadline is not None and deadline.expired):
+                results[file_path] = None
+                self.__defer()
+                continue
+            budget_used += identity.size
+            pending[file_path] = identity
+
+        if pending:
+            self.__hash_pending(pending, results, deadline)
+        return results
+
+    def __hash_pending(
+        self, pending: dict[str, FileIdentity], results: dict[str, str | None], deadline: Deadline | None
+    ) -> None:
+        executor = self.__get_executor()
+        futures = {
+            file_path: executor.submit(_hash_and_restat, file_path, self.buffer_size, self.mmap_threshold)
+            for file_path in pending
+        }
+        done, _ = wait(futures.values(), timeout=deadline.remaining() if deadline is not None else None)
+        for file_path, future in futures.items():
+            if future not in done:
+                # Out of time: files not started yet are dropped, and files being read finish into the cache.
+                if not future.cancel():
+                    future.add_done_callback(partial(self.__finish_late, file_path, pending[file_path]))
+                results[file_path] = None
+                self.__defer()
+                continue
+            try:
+                digest, identity = future.result()
+            except OSError as e:
+                # Leave the path out; the record's own hashing reports access errors as it always has.
+                logger.debug("Could not hash %s: %s", file_path, e)
+                continue
+            results[file_path] = digest
+            self.__record(pending[file_path], digest, identity)
+
+    def __defer(self) -> None:
+        self.files_deferred += 1
+        files_deferred.inc()
+
+    def __record(self, expected: FileIdentity, digest: str, identity: FileIdentity) -> None:
+        self.files_hashed += 1
+        self.bytes_hashed += identity.size
+        files_hashed.inc()
+        bytes_hashed.inc(identity.size)
+        if self.cache is not None and identity == expected:
+            self.cache.put(identity, digest)
+
+    def __finish_late(self, file_path: str, expected: FileIdentity, future: Future[tuple[str, FileIdentity]]) -> None:
+        try:
+            digest, identity = future.result()
+        except OSError as e:
+            logger.debug("Could not hash %s: %s", file_path, e)
+            return
+        self.__record(expected, digest, identity)
+
+    def hash_records(self, process_records: Iterable[ProcessRecord]) -> None:
+        """Hash the executables of a scan and assign each digest to every record that uses it.
+
+        :param process_records: The process records from the current scan.
+        """
+        by_path: dict[str, list[ProcessRecord]] = {}
+        for record in process_records:
+            # Whatever is at a deleted executable's path now is a different file.
+            if record.path and not record.deleted:
+                by_path.setdefault(record.path, []).append(record)
+        with hash_seconds.time():
+            digests = self.hash_paths(by_path, {path: records[0].probe for path, records in by_path.items()})
+        for file_path, digest in digests.items():
+            for record in by_path[file_path]:
+                record.hash = digest
+        logger.debug(
+            "Hashed %s executables. Totals: %s files hashed, %s bytes read, %s deferred.",
+            len(by_path),
+            self.files_hashed,
+            self.bytes_hashed,
+            self.files_deferred,
+        )
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=True)
+            self.__executor = None
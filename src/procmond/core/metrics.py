@@ -0,0 +1,225 @@
+"""Runtime metrics for ProcMonD.
+
+This module provides simple counters, gauges and histograms that the daemon's
+subsystems update as they work, collected in a process-wide registry that can
+be rendered in the Prometheus text exposition format.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from math import inf
+from threading import Lock
+from time import perf_counter
+from typing import TYPE_CHECKING, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator, Sequence
+
+MetricT = TypeVar("MetricT", bound="Metric")
+
+# Upper bounds, in seconds, of the default histogram buckets: from 1 ms up to a 30 s refresh interval.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Metric:
+    """A Metric is a single named value reported by the daemon."""
+
+    kind = "untyped"
+    name: str
+    description: str
+    value: float
+
+    def __init__(self, name: str, description: str) -> None:
+        """Creates a new metric starting at zero.
+
+        :param name: The metric name.
+        :param description: A one-line description of what is measured.
+        """
+        self.name = name
+        self.description = description
+        self.value = 0
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the metric.
+
+        :param amount: The amount to add.
+        """
+        with self._lock:
+            self.value += amount
+
+    def samples(self) -> list[tuple[str, float]]:
+        """Return the metric's samples, as exposed to Prometheus.
+
+        :return: Pairs of sample name, including any labels, and value.
+        """
+        return [(self.name, self.value)]
+
+
+class Counter(Metric):
+    """A Counter is a metric that only ever increases, such as the number of rows written."""
+
+    kind = "counter"
+
+
+class Gauge(Metric):
+    """A Gauge is a metric that can go up and down, such as a queue depth or the duration of the last write."""
+
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        """Set the gauge to a value.
+
+        :param value: The new value.
+        """
+        self.value = value
+
+    def dec(self, amount: float = 1) -> None:
+        """Decrease the gauge.
+
+        :param amount: The amount to subtract.
+        """
+        with self._lock:
+            self.value -= amount
+
+
+class Histogram(Metric):
+    """A Histogram counts observations, such as the duration of each scan, in buckets by size."""
+
+    kind = "histogram"
+    buckets: tuple[float, ...]
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        """Creates a new histogram with no observations.
+
+        :param name: The metric name.
+        :param description: A one-line description of what is measured.
+        :param buckets: The upper bound of each bucket, in ascending order. A final bucket for anything larger
+            is always added.
+        """
+        super().__init__(name, description)
+        self.buckets = (*sorted(buckets), inf)
+        self.__counts = [0] * len(self.buckets)
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Record an observation.
+
+        :param value: The observed value.
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.__counts[index] += 1
+            self.count += 1
+            self.value += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe how long a block takes, in seconds."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start)
+
+    def samples(self) -> list[tuple[str, float]]:
+        """Return the cumulative bucket counts, sum and count, as exposed to Prometheus.
+
+        :return: Pairs of sample name, including any labels, and value.
+        """
+        with self._lock:
+            counts = list(self.__counts)
+            total, count = self.value, self.count
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts, strict=True):
+            cumulative += bucket_count
+            samples.append((f'{self.name}_bucket{{le="{_format_value(bound)}"}}', cumulative))
+        samples.extend([(f"{self.name}_sum", total), (f"{self.name}_count", count)])
+        return samples
+
+
+class MetricsRegistry:
+    """The MetricsRegistry holds every metric in the daemon by name."""
+
+    def __init__(self) -> None:
+        """Creates a new, empty registry."""
+        self.__metrics: dict[str, Metric] = {}
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Get or create a counter.
+
+        :param name: The metric name.
+        :param description: A one-line description of what is counted.
+        :return: The counter registered under the name.
+        """
+        return self.__register(Counter, name, description)
+
+    def gauge(self, name: str, description: str) -> Gauge:
+        """Get or create a gauge.
+
+        :param name: The metric name.
+        :param description: A one-line description of what is measured.
+        :return: The gauge registered under the name.
+        """
+        return self.__register(Gauge, name, description)
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Get or create a histogram.
+
+        :param name: The metric name.
+        :param description: A one-line description of what is measured.
+        :param buckets: The upper bound of each bucket, if the histogram is created.
+        :return: The histogram registered under the name.
+        """
+        return self.__register(Histogram, name, description, buckets)
+
+    def __register(self, metric_type: type[MetricT], name: str, description: str, *args: object) -> MetricT:
+        metric = self.__metrics.get(name)
+        if metric is None:
+            metric = metric_type(name, description, *args)
+            self.__metrics[name] = metric
+        if not isinstance(metric, metric_type):
+            msg = f"Metric {name} is already registered as a {metric.kind}"
+            raise TypeError(msg)
+        return metric
+
+    def collect(self) -> list[Metric]:
+        """Return every registered metric, sorted by name.
+
+        :return: The registered metrics.
+        """
+        return sorted(self.__metrics.values(), key=lambda metric: metric.name)
+
+    def render(self) -> str:
+        """Render every registered metric in the Prometheus text exposition format.
+
+        :return: The metrics, as served at /metrics.
+        """
+        lines = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.description)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{sample} {_format_value(value)}" for sample, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if value == inf:
+        return "+Inf"
+    if isinstance(value, int) or value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
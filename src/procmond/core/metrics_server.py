@@ -0,0 +1,115 @@
+"""Metrics endpoint for ProcMonD.
+
+This module serves the metrics registry over HTTP at ``/metrics``, in the
+Prometheus text exposition format, from a background thread. Nothing is
+started unless the endpoint is enabled; the metrics themselves are plain
+in-memory updates whether or not anything reads them.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import socket
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from threading import Thread
+from typing import cast
+
+from procmond.core.metrics import MetricsRegistry, registry
+
+logger = getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Answers GET /metrics with the rendered registry, and anything else with 404."""
+
+    def do_GET(self) -> None:
+        """Serve the metrics."""
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        # The server is always the MetricsHTTPServer that created this handler.
+        body = cast("MetricsHTTPServer", self.server).registry.render().encode()
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        """Log requests at debug level rather than to stderr.
+
+        :param format: The message format.
+        :param args: The message arguments.
+        """
+        logger.debug("Metrics request from %s: %s", self.address_string(), format % args)
+
+
+class MetricsHTTPServer(ThreadingHTTPServer):
+    """An HTTP server that knows which registry to render."""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], metrics: MetricsRegistry) -> None:
+        """Creates a new server bound to an address.
+
+        :param address: The address and port to listen on.
+        :param metrics: The registry to serve.
+        """
+        self.registry = metrics
+        if ":" in address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(address, MetricsRequestHandler)
+
+
+class MetricsServer:
+    """The MetricsServer runs the /metrics endpoint on a background thread."""
+
+    address: str
+    port: int
+
+    def __init__(self, address: str = "127.0.0.1", port: int = 9464, metrics: MetricsRegistry = registry) -> None:
+        """Creates a new server. Nothing listens until start() is called.
+
+        :param address: The address to listen on.
+        :param port: The port to listen on, or 0 to pick a free one.
+        :param metrics: The registry to serve.
+        """
+        self.address = address
+        self.port = port
+        self.__metrics = metrics
+        self.__server: MetricsHTTPServer | None = None
+        self.__thread: Thread | None = None
+
+    def start(self) -> bool:
+        """Start listening.
+
+        :return: True if the endpoint is up, or False if the address could not be bound.
+        """
+        try:
+            self.__server = MetricsHTTPServer((self.address, self.port), self.__metrics)
+        except OSError:
+            logger.exception("Cannot serve metrics on %s:%s.", self.address, self.port)
+            return False
+        self.port = self.__server.server_address[1]
+        self.__thread = Thread(target=self.__server.serve_forever, name="procmond-metrics", daemon=True)
+        self.__thread.start()
+        logger.info("Serving metrics at http://%s:%s/metrics", self.address, self.port)
+        return True
+
+    def stop(self) -> None:
+        """Stop listening."""
+        if self.__server is None:
+            return
+        self.__server.shutdown()
+        self.__server.server_close()
+        self.__server = None
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
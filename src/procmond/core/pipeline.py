@@ -0,0 +1,289 @@
+"""The daemon's scan pipeline for ProcMonD.
+
+This module runs each scan through four stages (collect, store, detect and
+deliver alerts) as asyncio tasks connected by bounded queues, so that a slow
+database write or mail server doesn't hold up the next scan. The blocking work
+in each stage runs on an executor:
+
+* collect and detect share a single thread, since both work on the collector's
+  process records and the detector state;
+* store has its own thread, which owns the database connection;
+* alert delivery has its own thread, so it never blocks collection.
+
+Scans fire on a fixed-rate schedule: each is due a whole number of intervals
+after the first, so their start times don't drift, and a scan that overruns
+skips the ticks it missed instead of firing them back to back. With an
+adaptive scheduler, each interval is chosen as the previous scan finishes.
+Each cycle may also have a deadline, a share of the interval after it starts:
+hashing and detectors that haven't started by then are deferred to the next
+cycle, and a cycle whose detection finishes late is counted as an overrun.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from logging import getLogger
+from math import floor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from procmond.core.deadline import Deadline, deadline_scope
+from procmond.core.metrics import registry
+from procmond.models.process_snapshot import ProcessSnapshot
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from procmond.core.collector import ScanDiff
+    from procmond.core.proc_events import ProcEventListener
+    from procmond.core.profiler import CycleProfiler
+    from procmond.core.scheduler import AdaptiveScheduler
+    from procmond.models.alert import Alert
+
+logger = getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_QUEUE_SIZE = 4
+# The longest a single wait for process events blocks its thread, so that shutdown isn't held up.
+EVENT_WAIT_SECONDS = 1.0
+
+scans_skipped = registry.counter("procmond_scans_skipped_total", "Scheduled scans skipped because a scan overran.")
+scan_lag = registry.gauge("procmond_scan_lag_seconds", "How late the last scan started, relative to its schedule.")
+alert_batches_dropped = registry.counter(
+    "procmond_alert_batches_dropped_total", "Alert batches dropped because alert delivery fell behind."
+)
+scan_jitter = registry.histogram(
+    "procmond_scan_jitter_seconds", "How late each scan started, relative to its schedule.", (0.01, 0.1, 1.0, 10.0)
+)
+cycle_overruns = registry.counter(
+    "procmond_cycle_overruns_total", "Scan cycles whose detection finished after the cycle's deadline."
+)
+stage_seconds = {
+    stage: registry.histogram(f"procmond_stage_{stage}_seconds", f"Time taken by the {stage} stage of each scan.")
+    for stage in ("collect", "store", "detect", "deliver", "observe")
+}
+
+
+class Pipeline:
+    """The Pipeline schedules scans and moves each one through the collect, store, detect and alert stages."""
+
+    interval: float
+    queue_size: int
+
+    def __init__(  # noqa: PLR0913
+        self,
+        interval: float,
+        *,
+        collect: Callable[[], ScanDiff],
+        store: Callable[[ProcessSnapshot], None],
+        detect: Callable[[ScanDiff], list[Alert]],
+        deliver: Callable[[list[Alert]], None],
+        events: ProcEventListener | None = None,
+        observe: Callable[[list[int]], list[Alert]] | None = None,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        profiler: CycleProfiler | None = None,
+        scheduler: AdaptiveScheduler | None = None,
+        cycle_budget: float = 0.0,
+    ) -> None:
+        """Creates a new pipeline. Nothing runs until run() is awaited.
+
+        :param interval: The number of seconds between the start of each scan. Ignored if a scheduler is given.
+        :param collect: Scans the process list and hashes the executables.
+        :param store: Writes a snapshot of a scan's process records to the database.
+        :param detect: Runs the detectors against a scan's diff.
+        :param deliver: Sends a batch of alerts to the enabled alert handlers.
+        :param events: A started process event listener, to check processes as they exec() between scans.
+        :param observe: Inspects the processes that exec()ed and runs the detectors against them.
+        :param queue_size: The number of scans or alert batches that may wait for each stage.
+        :param profiler: Profiles the stages of a few cycles, when asked to.
+        :param scheduler: Chooses the interval before each next scan from the scans and alerts so far.
+        :param cycle_budget: The share of the interval that each cycle's collection and detection may take before
+            unstarted work is deferred, e.g. 0.9. 0 means no deadline.
+        """
+        self.interval = scheduler.interval if scheduler is not None else interval
+        self.queue_size = max(1, queue_size)
+        self.cycle_budget = max(0.0, cycle_budget)
+        self.__collect = collect
+        self.__store = store
+        self.__detect = detect
+        self.__deliver = deliver
+        self.__events = events
+        self.__observe = observe
+        self.__profiler = profiler
+        self.__scheduler = scheduler
+        self.__scan_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="procmond-scan")
+        self.__store_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="procmond-store")
+        self.__alert_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="procmond-alert")
+        self.__event_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="procmond-events")
+
+    async def run(self, cycles: int | None = None) -> None:
+        """Run the pipeline.
+
+        :param cycles: The number of scans to run before returning, once every stage has finished with them.
+            Defaults to running until cancelled.
+        """
+        store_queue: asyncio.Queue[ProcessSnapshot] = asyncio.Queue(self.queue_size)
+        detect_queue: asyncio.Queue[tuple[ScanDiff, Deadline | None]] = asyncio.Queue(self.queue_size)
+        alert_queue: asyncio.Queue[list[Alert]] = asyncio.Queue(self.queue_size)
+        workers = [
+            asyncio.create_task(self.__store_stage(store_queue), name="procmond-store"),
+            asyncio.create_task(self.__detect_stage(detect_queue, alert_queue), name="procmond-detect"),
+            asyncio.create_task(self.__alert_stage(alert_queue), name="procmond-alert"),
+        ]
+        collector = asyncio.create_task(
+            self.__collect_stage(store_queue, detect_queue, alert_queue, cycles), name="procmond-collect"
+        )
+        tasks = [collector, *workers]
+        try:
+            # Stop everything as soon as any stage fails, rather than letting the others run on without it.
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+            drained = asyncio.create_task(self.__drain(store_queue, detect_queue, alert_queue))
+            done, _ = await asyncio.wait([drained, *workers], return_when=asyncio.FIRST_COMPLETED)
+            drained.cancel()
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if self.__profiler is not None:
+                self.__profiler.stop()
+
+    @staticmethod
+    async def __drain(*queues: asyncio.Queue[Any]) -> None:
+        # In stage order, since detection adds to the alert queue after that may have emptied.
+        for queue in queues:
+            await queue.join()
+
+    def close(self) -> None:
+        """Shut down the pipeline's executors, waiting for any work in progress."""
+        for executor in (self.__scan_executor, self.__store_executor, self.__alert_executor, self.__event_executor):
+            executor.shutdown(wait=True)
+
+    async def __collect_stage(
+        self,
+        store_queue: asyncio.Queue[ProcessSnapshot],
+        detect_queue: asyncio.Queue[tuple[ScanDiff, Deadline | None]],
+        alert_queue: asyncio.Queue[list[Alert]],
+        cycles: int | None,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        next_scan = loop.time()
+        cycle = 0
+        while cycles is None or cycle < cycles:
+            lag = loop.time() - next_scan
+            scan_lag.set(max(0.0, lag))
+            scan_jitter.observe(max(0.0, lag))
+            if lag >= self.interval:
+                # The previous scan overran; skip the ticks it missed rather than firing them back to back.
+                missed = floor(lag / self.interval)
+                scans_skipped.inc(missed)
+                logger.warning("Scanning is %.1f s behind schedule; skipping %s scans.", lag, missed)
+                next_scan += missed * self.interval
+            if self.__profiler is not None:
+                self.__profiler.cycle()
+            deadline = Deadline.after(self.interval * self.cycle_budget) if self.cycle_budget else None
+            diff, snapshot = await self.__run(
+                self.__scan_executor, "collect", self.__collect_snapshot, deadline=deadline
+            )
+            # Waiting here when the store or detect stage is behind keeps their queues bounded.
+            await store_queue.put(snapshot)
+            await detect_queue.put((diff, deadline))
+            cycle += 1
+            if self.__scheduler is not None:
+                self.interval = self.__scheduler.next_interval(diff)
+            next_scan += self.interval
+            if cycles is None or cycle < cycles:
+                await self.__wait_until(next_scan, alert_queue)
+
+    def __collect_snapshot(self) -> tuple[ScanDiff, ProcessSnapshot]:
+        diff = self.__collect()
+        # The next scan updates the collector's records in place, so the store stage gets a compact copy.
+        return diff, ProcessSnapshot.from_records(diff.current)
+
+    async def __wait_until(self, deadline: float, alert_queue: asyncio.Queue[list[Alert]]) -> None:
+        loop = asyncio.get_running_loop()
+        if self.__events is None or self.__observe is None or not self.__events.running:
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            return
+        while (remaining := deadline - loop.time()) > 0:
+            pids = await self.__run(
+                self.__event_executor, None, self.__events.wait, min(remaining, EVENT_WAIT_SECONDS)
+            )
+            if self.__events.take_resync():
+                logger.warning("Process events were dropped; running a full scan.")
+                return
+            if pids:
+                alerts = await self.__run(self.__scan_executor, "observe", self.__observe, pids)
+                self.__enqueue_alerts(alert_queue, alerts)
+
+    async def __store_stage(self, store_queue: asyncio.Queue[ProcessSnapshot]) -> None:
+        while True:
+            snapshot = await store_queue.get()
+            try:
+                await self.__run(self.__store_executor, "store", self.__store, snapshot)
+            finally:
+                store_queue.task_done()
+
+    async def __detect_stage(
+        self, detect_queue: asyncio.Queue[tuple[ScanDiff, Deadline | None]], alert_queue: asyncio.Queue[list[Alert]]
+    ) -> None:
+        while True:
+            diff, deadline = await detect_queue.get()
+            try:
+                alerts = await self.__run(self.__scan_executor, "detect", self.__detect, diff, deadline=deadline)
+                self.__enqueue_alerts(alert_queue, alerts)
+                if deadline is not None and deadline.expired:
+                    cycle_overruns.inc()
+                    logger.warning("A scan cycle overran its deadline; unstarted work was deferred.")
+            finally:
+                detect_queue.task_done()
+
+    async def __alert_stage(self, alert_queue: asyncio.Queue[list[Alert]]) -> None:
+        while True:
+            alerts = await alert_queue.get()
+            try:
+                await self.__run(self.__alert_executor, "deliver", self.__deliver, alerts)
+            except Exception:
+                logger.exception("Could not deliver %s alerts.", len(alerts))
+            finally:
+                alert_queue.task_done()
+
+    def __enqueue_alerts(self, alert_queue: asyncio.Queue[list[Alert]], alerts: list[Alert]) -> None:
+        if not alerts:
+            return
+        if self.__scheduler is not None:
+            self.__scheduler.record_alerts(len(alerts))
+        if alert_queue.full():
+            # Delivery has fallen behind; the newest alerts are the most useful, so drop the oldest batch.
+            dropped = alert_queue.get_nowait()
+            alert_queue.task_done()
+            alert_batches_dropped.inc()
+            logger.warning("Alert delivery is behind; dropped a batch of %s alerts.", len(dropped))
+        alert_queue.put_nowait(alerts)
+
+    async def __run(
+        self,
+        executor: ThreadPoolExecutor,
+        stage: str | None,
+        func: Callable[..., T],
+        *args: object,
+        deadline: Deadline | None = None,
+    ) -> T:
+        if stage is None:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        return await asyncio.get_running_loop().run_in_executor(executor, self.__timed, stage, deadline, func, *args)
+
+    def __timed(self, stage: str, deadline: Deadline | None, func: Callable[..., T], *args: object) -> T:
+        # Timed on the executor's thread, so time spent waiting for the thread isn't counted.
+        profiling = self.__profiler.stage(stage) if self.__profiler is not None else nullcontext()
+        with stage_seconds[stage].time(), profiling, deadline_scope(deadline):
+            return func(*args)
@@ -0,0 +1,210 @@
+"""Process events for ProcMonD.
+
+This module subscribes to the Linux kernel's proc connector over netlink,
+which reports every fork(), exec() and exit() as it happens. Processes that
+exec() are handed to the daemon between full scans, so that short-lived
+processes are inspected even if they exit before the next scan.
+
+The proc connector needs Linux and CAP_NET_ADMIN; where either is missing,
+the listener doesn't start and the daemon keeps polling.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import errno
+import socket
+import struct
+from logging import getLogger
+from threading import Event, Lock, Thread
+from typing import NamedTuple
+
+from procmond.core.metrics import registry
+
+logger = getLogger(__name__)
+
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+
+NLMSG_DONE = 3
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+
+# struct nlmsghdr: length, type, flags, sequence number, port ID.
+NLMSGHDR = struct.Struct("=IHHII")
+# struct cn_msg: index, value, sequence number, acknowledgement, payload length, flags.
+CN_MSG = struct.Struct("=IIIIHH")
+# struct proc_event: what, cpu, timestamp, then the event data; every event starts with a (pid, tgid) pair.
+PROC_EVENT = struct.Struct("=IIQII")
+# The fork event data: parent pid and tgid, then child pid and tgid.
+FORK_CHILD = struct.Struct("=II")
+
+RECEIVE_BUFFER_SIZE = 4 * 1024 * 1024
+# How often the reader thread checks whether the listener has been stopped, in seconds.
+READ_TIMEOUT = 0.5
+
+events_received = registry.counter("procmond_proc_events_total", "Process events received from the proc connector.")
+events_lost = registry.counter("procmond_proc_events_lost_total", "Times the proc connector dropped events.")
+
+
+class ProcEvent(NamedTuple):
+    """A single fork, exec or exit event, for a process as identified by its thread group ID."""
+
+    what: int
+    pid: int
+    tgid: int
+
+
+def _nlmsg_align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def parse_events(data: bytes) -> list[ProcEvent]:
+    """Parse the proc connector events in a netlink datagram.
+
+    Events for individual threads, rather than processes, are left out.
+
+    :param data: A datagram received from the proc connector socket.
+    :return: The fork, exec and exit events in the datagram.
+    """
+    result = []
+    offset = 0
+    while offset + NLMSGHDR.size <= len(data):
+        length, message_type, _flags, _seq, _port = NLMSGHDR.unpack_from(data, offset)
+        if length < NLMSGHDR.size:
+            break
+        event_offset = offset + NLMSGHDR.size + CN_MSG.size
+        if message_type == NLMSG_DONE and event_offset + PROC_EVENT.size <= offset + length:
+            what, _cpu, _timestamp, pid, tgid = PROC_EVENT.unpack_from(data, event_offset)
+            if what == PROC_EVENT_FORK:
+                pid, tgid = FORK_CHILD.unpack_from(data, event_offset + PROC_EVENT.size)
+            if what in {PROC_EVENT_FORK, PROC_EVENT_EXEC, PROC_EVENT_EXIT} and pid == tgid:
+                result.append(ProcEvent(what, pid, tgid))
+        offset += _nlmsg_align(length)
+    return result
+
+
+def _control_message(operation: int) -> bytes:
+    payload = struct.pack("=I", operation)
+    cn_msg = CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0)
+    length = NLMSGHDR.size + len(cn_msg) + len(payload)
+    return NLMSGHDR.pack(length, NLMSG_DONE, 0, 0, 0) + cn_msg + payload
+
+
+class ProcEventListener:
+    """The ProcEventListener reads process events on a background thread and collects the PIDs that exec()ed."""
+
+    def __init__(self) -> None:
+        """Creates a new listener. It isn't subscribed until started."""
+        self.__socket: socket.socket | None = None
+        self.__thread: Thread | None = None
+        self.__lock = Lock()
+        self.__wakeup = Event()
+        self.__pending: dict[int, None] = {}
+        self.__resync = False
+
+    @property
+    def running(self) -> bool:
+        """Whether the listener is subscribed to process events.
+
+        :return: True if events are being received.
+        """
+        return self.__socket is not None
+
+    def start(self) -> bool:
+        """Subscribe to the proc connector and start reading events.
+
+        :return: True if the listener started, or False if process events aren't available here.
+        """
+        if self.__socket is not None:
+            return True
+        family = getattr(socket, "AF_NETLINK", None)
+        if family is None:
+            logger.info("Process events need Linux; falling back to polling.")
+            return False
+        try:
+            sock = socket.socket(family, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+        except OSError as e:
+            logger.info("Process events are not available (%s); falling back to polling.", e)
+            return False
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+            sock.bind((0, CN_IDX_PROC))
+            sock.send(_control_message(PROC_CN_MCAST_LISTEN))
+            sock.settimeout(READ_TIMEOUT)
+        except OSError as e:
+            sock.close()
+            logger.info("Cannot subscribe to process events (%s); falling back to polling.", e)
+            return False
+        self.__socket = sock
+        self.__thread = Thread(target=self.__read_events, args=(sock,), name="procmond-proc-events", daemon=True)
+        self.__thread.start()
+        logger.info("Subscribed to process events.")
+        return True
+
+    def wait(self, timeout: float) -> list[int]:
+        """Wait for processes to exec(), for at most the timeout.
+
+        :param timeout: The longest time to wait, in seconds.
+        :return: The PIDs that have exec()ed since the last call, in the order they were first seen.
+        """
+        self.__wakeup.wait(timeout)
+        with self.__lock:
+            self.__wakeup.clear()
+            pids = list(self.__pending)
+            self.__pending.clear()
+        return pids
+
+    def take_resync(self) -> bool:
+        """Check whether events were lost since the last call, so that a full scan is needed to catch up.
+
+        :return: True if events were lost.
+        """
+        with self.__lock:
+            resync, self.__resync = self.__resync, False
+        return resync
+
+    def stop(self) -> None:
+        """Unsubscribe from the proc connector and stop reading events."""
+        sock, self.__socket = self.__socket, None
+        if sock is None:
+            return
+        if self.__thread is not None:
+            self.__thread.join(timeout=READ_TIMEOUT * 2)
+            self.__thread = None
+        try:
+            sock.send(_control_message(PROC_CN_MCAST_IGNORE))
+        except OSError:
+            logger.debug("Cannot unsubscribe from process events.", exc_info=True)
+        sock.close()
+
+    def __read_events(self, sock: socket.socket) -> None:
+        while self.__socket is sock:
+            try:
+                data = sock.recv(65536)
+            except TimeoutError:
+                continue
+            except OSError as e:
+                if e.errno != errno.ENOBUFS:
+                    logger.exception("Process events stopped.")
+                    return
+                # The kernel dropped events because they arrived faster than they were read.
+                events_lost.inc()
+                with self.__lock:
+                    self.__resync = True
+                self.__wakeup.set()
+                continue
+            events = parse_events(data)
+            events_received.inc(len(events))
+            execs = [event.tgid for event in events if event.what == PROC_EVENT_EXEC]
+            if execs:
+                with self.__lock:
+                    self.__pending.update(dict.fromkeys(execs))
+                self.__wakeup.set()
@@ -0,0 +1,221 @@
+"""On-demand profiling of the scan pipeline for ProcMonD.
+
+This module profiles a few consecutive scan cycles of a running daemon, so an
+operator can see where a slow cycle spends its time without restarting it
+under a profiler. A profile is requested from the config file or with a
+signal, runs for the requested number of cycles, is written to a file, and
+then switches itself off. Two modes are available:
+
+* ``sample`` takes a stack sample of each busy pipeline thread every few
+  milliseconds, and writes the samples as collapsed stacks, one per line, as
+  read by flamegraph.pl, speedscope and similar tools. Its overhead is low
+  enough to use in production.
+* ``cprofile`` runs the stages on the scan thread (collect, detect and
+  observe) under cProfile, and writes a pstats file. It counts every call, so
+  it slows those stages down noticeably while it runs.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from logging import getLogger
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import cProfile
+    from collections.abc import Iterator
+    from types import FrameType
+
+logger = getLogger(__name__)
+
+PROFILER_MODES = ("sample", "cprofile")
+# The stages that run on the scan thread. cProfile can only profile one thread at a time.
+CPROFILE_STAGES = frozenset(("collect", "detect", "observe"))
+
+
+class CycleProfiler:
+    """The CycleProfiler profiles the pipeline for a number of scan cycles when asked to, then switches itself off."""
+
+    output_dir: Path
+    mode: str
+    sample_interval: float
+
+    def __init__(self, output_dir: str | Path, *, mode: str = "sample", sample_interval: float = 0.005) -> None:
+        """Creates a new profiler. Nothing is profiled until a profile is requested.
+
+        :param output_dir: The directory the profiles are written to.
+        :param mode: "sample" for collapsed stack samples, or "cprofile" for a pstats file.
+        :param sample_interval: The number of seconds between stack samples, in sample mode.
+        """
+        if mode not in PROFILER_MODES:
+            msg = f"Unknown profiler mode {mode!r}; expected one of {', '.join(PROFILER_MODES)}."
+            raise ValueError(msg)
+        self.output_dir = Path(output_dir)
+        self.mode = mode
+        self.sample_interval = sample_interval
+        self.__lock = threading.Lock()
+        self.__requested = 0
+        self.__remaining = 0
+        self.__active = False
+        # Bumped whenever a profile starts, so that stages still running when it ends don't add to the next one.
+        self.__generation = 0
+        self.__profiles: list[cProfile.Profile] = []
+        self.__busy: dict[int, str] = {}
+        self.__samples: Counter[str] = Counter()
+        self.__stop_sampling = threading.Event()
+        self.__sampler: threading.Thread | None = None
+
+    @property
+    def active(self) -> bool:
+        """Whether a profile is being taken."""
+        return self.__active
+
+    def request(self, cycles: int) -> None:
+        """Ask for the next few scan cycles to be profiled. Safe to call from a signal handler.
+
+        :param cycles: The number of cycles to profile.
+        """
+        # No lock: a signal handler may run while the main thread holds it.
+        self.__requested = max(0, cycles)
+
+    def cycle(self) -> Path | None:
+        """Mark the start of a scan cycle, starting or finishing a profile as needed.
+
+        :return: The path of the profile that was written, if one was finished.
+        """
+        written = None
+        with self.__lock:
+            if self.__active:
+                self.__remaining -= 1
+                if self.__remaining > 0:
+                    return None
+                written = self.__finish()
+            requested, self.__requested = self.__requested, 0
+            if requested > 0:
+                self.__start(requested)
+        return written
+
+    def stop(self) -> Path | None:
+        """Finish the profile in progress early, writing what has been collected so far.
+
+        :return: The path of the profile that was written, if any.
+        """
+        with self.__lock:
+            if not self.__active:
+                return None
+            return self.__finish()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profile the work of a pipeline stage, if a profile is being taken. Used on the thread doing the work.
+
+        :param name: The name of the stage.
+        """
+        if not self.__active:
+            yield
+            return
+        if self.mode == "cprofile":
+            if name not in CPROFILE_STAGES:
+                yield
+                return
+            from cProfile import Profile  # noqa: PLC0415
+
+            generation = self.__generation
+            profile = Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                with self.__lock:
+                    if self.__active and self.__generation == generation:
+                        self.__profiles.append(profile)
+            return
+        ident = threading.get_ident()
+        self.__busy[ident] = name
+        try:
+            yield
+        finally:
+            self.__busy.pop(ident, None)
+
+    def __start(self, cycles: int) -> None:
+        self.__active = True
+        self.__remaining = cycles
+        self.__generation += 1
+        self.__profiles = []
+        self.__samples = Counter()
+        if self.mode == "sample":
+            self.__stop_sampling.clear()
+            self.__sampler = threading.Thread(target=self.__sample, name="procmond-profiler", daemon=True)
+            self.__sampler.start()
+        logger.info("Profiling the next %s scan cycles (%s mode).", cycles, self.mode)
+
+    def __finish(self) -> Path | None:
+        self.__active = False
+        if self.__sampler is not None:
+            self.__stop_sampling.set()
+            self.__sampler.join()
+            self.__sampler = None
+        file_name = f"procmond-profile-{time.strftime('%Y%m%d-%H%M%S')}"
+        try:
+            if self.mode == "cprofile":
+                return self.__write_pstats(self.output_dir / f"{file_name}.pstats")
+            return self.__write_samples(self.output_dir / f"{file_name}.folded")
+        except OSError:
+            logger.exception("Could not write the profile to %s.", self.output_dir)
+            return None
+        finally:
+            self.__profiles = []
+            self.__samples = Counter()
+
+    def __write_pstats(self, path: Path) -> Path | None:
+        if not self.__profiles:
+            logger.warning("No scan stages ran while profiling; nothing to write.")
+            return None
+        from pstats import Stats  # noqa: PLC0415
+
+        stats = Stats(*self.__profiles)
+        stats.dump_stats(path)
+        logger.info("Wrote a profile of %s stage runs to %s.", len(self.__profiles), path)
+        return path
+
+    def __write_samples(self, path: Path) -> Path | None:
+        if not self.__samples:
+            logger.warning("No scan stages ran while profiling; nothing to write.")
+            return None
+        with path.open("w") as out:
+            out.writelines(f"{stack} {count}\n" for stack, count in self.__samples.most_common())
+        logger.info("Wrote %s stack samples to %s.", self.__samples.total(), path)
+        return path
+
+    def __sample(self) -> None:
+        while not self.__stop_sampling.wait(self.sample_interval):
+            frames = sys._current_frames()  # noqa: SLF001  # pyright: ignore[reportPrivateUsage]
+            for ident, stage in list(self.__busy.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.__samples[f"{stage};{collapse_stack(frame)}"] += 1
+
+
+def collapse_stack(frame: FrameType) -> str:
+    """Describe a thread's stack as a single line, outermost call first.
+
+    :param frame: The innermost frame of the stack.
+    :return: The function of each frame, separated by semicolons.
+    """
+    names = []
+    current: FrameType | None = frame
+    while current is not None:
+        code = current.f_code
+        names.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+        current = current.f_back
+    return ";".join(reversed(names))
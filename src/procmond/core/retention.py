@@ -0,0 +1,186 @@
+"""History retention for ProcMonD.
+
+This module compacts the process history. Scans newer than the retention
+period are kept in full; in older scans, a process row is only kept if it is
+a change event: the process's first row, or one whose name or executable
+differs from the process's previous row. A compacted scan left with no rows
+is deleted. Compaction runs between scans in small batches, within a time
+budget, and returns freed pages to the filesystem with an incremental VACUUM.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from logging import getLogger
+from time import perf_counter
+from typing import TYPE_CHECKING, NamedTuple
+
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from procmond.core.storage import ProcessStore
+
+logger = getLogger(__name__)
+
+# PRAGMA auto_vacuum value for INCREMENTAL.
+AUTO_VACUUM_INCREMENTAL = 2
+MIN_BATCH_SIZE = 10
+# The maximum number of free pages returned to the filesystem per compaction step.
+VACUUM_PAGES = 2048
+
+rows_deleted = registry.counter("procmond_compaction_rows_deleted_total", "Redundant process rows deleted.")
+scans_deleted = registry.counter("procmond_compaction_scans_deleted_total", "Compacted scans left with no rows.")
+pages_reclaimed = registry.counter("procmond_compaction_pages_reclaimed_total", "Database pages returned to the OS.")
+compaction_seconds = registry.gauge("procmond_compaction_seconds", "Time taken by the last compaction step.")
+
+# Deletes rows of one scan that repeat the same process's previous row, with the same name and executable. Only the
+# previous row counts, so a process whose executable goes A -> B -> A keeps the row where it went back to A.
+DELETE_REDUNDANT_ROWS = """
+    DELETE FROM process_snapshots
+    WHERE rowid IN (
+        SELECT p.rowid
+        FROM process_snapshots p
+        WHERE p.scan_id = ?
+          AND EXISTS (
+              SELECT 1
+              FROM process_snapshots q
+              WHERE q.pid = p.pid
+                AND q.create_time IS p.create_time
+                AND q.scan_id = (
+                    SELECT max(r.scan_id)
+                    FROM process_snapshots r
+                    WHERE r.pid = p.pid
+                      AND r.create_time IS p.create_time
+                      AND r.scan_id < p.scan_id
+                )
+                AND q.executable_id IS p.executable_id
+                AND q.name IS p.name
+          )
+        LIMIT ?
+    )
+    """
+# Deletes a scan left with no rows. The newest scan is always kept, so that scan IDs are never reused.
+DELETE_EMPTY_SCAN = """
+    DELETE FROM scans
+    WHERE id = ?
+      AND id < (SELECT max(id) FROM scans)
+      AND NOT EXISTS (SELECT 1 FROM process_snapshots WHERE scan_id = ?)
+    """
+
+
+class CompactionResult(NamedTuple):
+    """The work done by a single compaction step."""
+
+    rows_deleted: int
+    scans_compacted: int
+    scans_deleted: int
+    pages_reclaimed: int
+    elapsed_ms: float
+
+
+class Compactor:
+    """The Compactor deletes redundant history older than the retention period, a bounded batch at a time."""
+
+    retention_hours: float
+    batch_size: int
+    budget_ms: float
+
+    def __init__(
+        self,
+        store: ProcessStore,
+        retention_hours: float = 24,
+        batch_size: int = 1000,
+        budget_ms: float = 100,
+    ) -> None:
+        """Creates a new compactor.
+
+        :param store: The store whose database is compacted.
+        :param retention_hours: How long full snapshots are kept.
+        :param batch_size: The maximum number of rows deleted per transaction.
+        :param budget_ms: The time after which a compaction step stops starting new batches.
+        """
+        self.store = store
+        self.retention_hours = retention_hours
+        self.batch_size = batch_size
+        self.budget_ms = budget_ms
+        self.__batch_size = batch_size
+        self.__warned_auto_vacuum = False
+
+    def run(self, now: datetime | None = None) -> CompactionResult:
+        """Compact scans older than the retention period until they are done or the time budget is spent.
+
+        Each batch is its own short transaction. If a batch takes longer than the budget, later batches
+        are made smaller, so that no single transaction holds the database for long.
+
+        :param now: The current time. Defaults to now.
+        :return: The work done by this step.
+        """
+        start = perf_counter()
+        deadline = start + self.budget_ms / 1000
+        cutoff = (now or datetime.now(UTC)) - timedelta(hours=self.retention_hours)
+        conn = self.store.conn
+        deleted = 0
+        compacted = 0
+        emptied = 0
+        while perf_counter() < deadline:
+            row = conn.execute(
+                "SELECT id FROM scans WHERE compacted = 0 AND scanned_at < ? ORDER BY id LIMIT 1;", (cutoff,)
+            ).fetchone()
+            if row is None:
+                break
+            (scan_id,) = row
+            batch_start = perf_counter()
+            with conn:
+                batch_deleted = conn.execute(DELETE_REDUNDANT_ROWS, (scan_id, self.__batch_size)).rowcount
+                if batch_deleted < self.__batch_size:
+                    if conn.execute(DELETE_EMPTY_SCAN, (scan_id, scan_id)).rowcount:
+                        emptied += 1
+                    else:
+                        conn.execute("UPDATE scans SET compacted = 1 WHERE id = ?;", (scan_id,))
+                    compacted += 1
+            deleted += batch_deleted
+            self.__adapt_batch_size(perf_counter() - batch_start)
+
+        reclaimed = self.__incremental_vacuum(deadline) if deleted else 0
+        elapsed = perf_counter() - start
+        rows_deleted.inc(deleted)
+        scans_deleted.inc(emptied)
+        pages_reclaimed.inc(reclaimed)
+        compaction_seconds.set(elapsed)
+        if deleted:
+            logger.info(
+                "Compacted %s scans: deleted %s rows and %s empty scans, and reclaimed %s pages in %.1f ms.",
+                compacted,
+                deleted,
+                emptied,
+                reclaimed,
+                elapsed * 1000,
+            )
+        return CompactionResult(deleted, compacted, emptied, reclaimed, elapsed * 1000)
+
+    def __adapt_batch_size(self, batch_seconds: float) -> None:
+        """Halve the batch size when a batch overruns the budget, and grow it back when batches are quick."""
+        if batch_seconds * 1000 > self.budget_ms:
+            self.__batch_size = max(MIN_BATCH_SIZE, self.__batch_size // 2)
+        elif batch_seconds * 4000 < self.budget_ms:
+            self.__batch_size = min(self.batch_size, self.__batch_size * 2)
+
+    def __incremental_vacuum(self, deadline: float) -> int:
+        """Return free pages to the filesystem, if the database uses incremental auto-vacuum."""
+        conn = self.store.conn
+        (auto_vacuum,) = conn.execute("PRAGMA auto_vacuum;").fetchone()
+        if auto_vacuum != AUTO_VACUUM_INCREMENTAL:
+            if not self.__warned_auto_vacuum:
+                logger.info("Run VACUUM once on %s to let compaction reclaim disk space.", self.store.database_path)
+                self.__warned_auto_vacuum = True
+            return 0
+        (before,) = conn.execute("PRAGMA freelist_count;").fetchone()
+        if not before or perf_counter() >= deadline:
+            return 0
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES});").fetchall()
+        (after,) = conn.execute("PRAGMA freelist_count;").fetchone()
+        return before - after
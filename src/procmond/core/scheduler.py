@@ -0,0 +1,139 @@
+"""Adaptive scan scheduling for ProcMonD.
+
+This module chooses the time between scans from what the last scans found.
+The interval shrinks towards a minimum while processes are coming and going
+quickly or alerts are being raised, and grows towards a maximum while nothing
+changes. Whatever the activity, the interval is kept long enough that the
+daemon stays within its CPU budget, measured from the CPU time it used over
+the previous cycle.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from logging import getLogger
+from time import process_time
+from typing import TYPE_CHECKING
+
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from procmond.core.collector import ScanDiff
+
+logger = getLogger(__name__)
+
+# Why the current interval was chosen.
+ACTIVITY = "activity"
+IDLE = "idle"
+STEADY = "steady"
+CPU_BUDGET = "cpu_budget"
+SCHEDULE_REASONS = (ACTIVITY, IDLE, STEADY, CPU_BUDGET)
+
+# The fraction of processes spawned or exited in one scan that counts as a burst of activity.
+DEFAULT_CHURN_THRESHOLD = 0.01
+# The interval is halved on activity, and grows by a quarter for each quiet scan.
+SPEED_UP = 0.5
+BACK_OFF = 1.25
+
+scan_interval = registry.gauge("procmond_scan_interval_seconds", "The time between scans chosen by the scheduler.")
+cycle_cpu_seconds = registry.gauge(
+    "procmond_scan_cycle_cpu_seconds", "CPU time used by the daemon over the last cycle."
+)
+interval_reasons = {
+    reason: registry.gauge(
+        f"procmond_scan_interval_reason_{reason}", f"1 if the scan interval was last set because of {reason}, else 0."
+    )
+    for reason in SCHEDULE_REASONS
+}
+
+
+class AdaptiveScheduler:
+    """The AdaptiveScheduler picks the interval before each next scan, between a minimum and a maximum."""
+
+    min_interval: float
+    max_interval: float
+    cpu_budget: float
+    churn_threshold: float
+    interval: float
+    reason: str
+
+    def __init__(  # noqa: PLR0913
+        self,
+        interval: float,
+        *,
+        min_interval: float,
+        max_interval: float,
+        cpu_budget: float = 0.05,
+        churn_threshold: float = DEFAULT_CHURN_THRESHOLD,
+        cpu_clock: Callable[[], float] = process_time,
+    ) -> None:
+        """Creates a new scheduler.
+
+        :param interval: The interval to start with, in seconds.
+        :param min_interval: The shortest interval, in seconds.
+        :param max_interval: The longest interval, in seconds.
+        :param cpu_budget: The most CPU the daemon should use, as a fraction of one CPU. 0 means no budget.
+        :param churn_threshold: The fraction of processes spawned or exited in a scan that counts as activity.
+        :param cpu_clock: Returns the CPU time the daemon has used, in seconds.
+        """
+        self.min_interval = max(0.0, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.cpu_budget = cpu_budget
+        self.churn_threshold = churn_threshold
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        self.reason = STEADY
+        self.__cpu_clock = cpu_clock
+        self.__last_cpu: float | None = None
+        self.__alerts = 0
+        self.__publish()
+
+    def record_alerts(self, count: int) -> None:
+        """Count alerts raised since the last scan.
+
+        :param count: The number of alerts raised.
+        """
+        self.__alerts += count
+
+    def next_interval(self, diff: ScanDiff) -> float:
+        """Choose the interval before the next scan, from a scan that has just finished.
+
+        :param diff: The diff from the scan.
+        :return: The number of seconds until the next scan.
+        """
+        changed = len(diff.spawned) + len(diff.exited)
+        churn = changed / max(1, len(diff.current))
+        if churn >= self.churn_threshold or self.__alerts:
+            interval, reason = self.interval * SPEED_UP, ACTIVITY
+        elif not changed:
+            interval, reason = self.interval * BACK_OFF, IDLE
+        else:
+            interval, reason = self.interval, STEADY
+        self.__alerts = 0
+        interval = min(max(interval, self.min_interval), self.max_interval)
+
+        cpu = self.__cpu_clock()
+        if self.__last_cpu is not None:
+            used = cpu - self.__last_cpu
+            cycle_cpu_seconds.set(used)
+            # Spending `used` seconds of CPU every `interval` seconds must stay within the budget.
+            floor = used / self.cpu_budget if self.cpu_budget > 0 else 0.0
+            if interval < floor:
+                interval, reason = min(floor, self.max_interval), CPU_BUDGET
+        self.__last_cpu = cpu
+
+        if reason != self.reason:
+            logger.debug("Scan interval %.1f s -> %.1f s (%s).", self.interval, interval, reason)
+        self.interval = interval
+        self.reason = reason
+        self.__publish()
+        return interval
+
+    def __publish(self) -> None:
+        scan_interval.set(self.interval)
+        for reason, gauge in interval_reasons.items():
+            gauge.set(1 if reason == self.reason else 0)
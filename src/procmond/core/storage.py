@@ -0,0 +1,301 @@
+"""Process history storage for ProcMonD.
+
+This module owns the daemon's SQLite database: it keeps one long-lived
+connection in WAL mode, migrates the schema once when the connection is
+opened, and writes each scan's snapshot in a single batched transaction.
+
+Each scan is a row in ``scans``; each process seen by the scan is a row in
+``process_snapshots`` that references its executable, interned once per
+distinct (path, hash, exists) in ``executables``.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from datetime import UTC, datetime
+from logging import getLogger
+from pathlib import Path
+from sqlite3 import Connection, Error, connect
+from time import perf_counter
+from typing import TYPE_CHECKING, cast
+
+from procmond.core.hash_cache import HashCache
+from procmond.core.metrics import registry
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+    from procmond.models.process_record import ProcessRecord
+    from procmond.models.process_snapshot import ProcessRow
+
+logger = getLogger(__name__)
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# The number of WAL pages after which the store checkpoints the WAL back into the database.
+CHECKPOINT_PAGES = 1000
+# The number of executable keys remembered, so that most rows are written without looking their executable up.
+DEFAULT_EXECUTABLE_CACHE_SIZE = 4096
+
+write_seconds = registry.gauge("procmond_db_write_seconds", "Time taken to write the last snapshot.")
+write_seconds_total = registry.counter("procmond_db_write_seconds_total", "Total time spent writing snapshots.")
+rows_written = registry.counter("procmond_db_rows_written_total", "Process rows written to the database.")
+transactions = registry.counter("procmond_db_transactions_total", "Snapshot transactions committed.")
+checkpoints = registry.counter("procmond_db_checkpoints_total", "WAL checkpoints run by the store.")
+fsyncs = registry.counter("procmond_db_fsyncs_total", "Estimated fsync calls made by SQLite for snapshot writes.")
+
+
+def _migrate_to_v1(conn: Connection) -> None:
+    """Create the processes table, its indexes and the hash cache table."""
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS processes "
+        "(id INTEGER, ppid INTEGER, updated_at DATETIME, name VARCHAR, path VARCHAR, "
+        'valid BIT, "hash" VARCHAR, accessible BIT, file_exists BIT, '
+        "CONSTRAINT processes_pk PRIMARY KEY (id, updated_at));"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS processes_name_hash_index ON processes (name DESC, hash DESC);")
+    conn.execute("CREATE INDEX IF NOT EXISTS processes_updated_at_index ON processes(updated_at DESC);")
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS processes_file_exists_accessible_updated_at_index "
+        "ON processes (file_exists, accessible, updated_at);"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS processes_id_path_hash_index ON processes (id, path, hash);")
+    HashCache.create_schema(conn.cursor())
+
+
+def _migrate_to_v2(conn: Connection) -> None:
+    """Normalize the processes table into scans, interned executables and per-scan process rows.
+
+    Existing history is carried over, and ``processes`` is replaced by a view with the same columns so
+    that ad-hoc queries against the old layout keep working.
+    """
+    conn.execute("CREATE TABLE scans (id INTEGER PRIMARY KEY, scanned_at DATETIME NOT NULL);")
+    conn.execute('CREATE TABLE executables (id INTEGER PRIMARY KEY, path VARCHAR, "hash" VARCHAR, file_exists BIT);')
+    conn.execute('CREATE UNIQUE INDEX executables_path_hash_index ON executables (path, "hash", file_exists);')
+    conn.execute(
+        "CREATE TABLE process_snapshots "
+        "(scan_id INTEGER NOT NULL REFERENCES scans (id), pid INTEGER NOT NULL, ppid INTEGER, create_time REAL, "
+        "name VARCHAR, executable_id INTEGER REFERENCES executables (id), valid BIT, accessible BIT, "
+        "CONSTRAINT process_snapshots_pk PRIMARY KEY (scan_id, pid));"
+    )
+    conn.execute("CREATE INDEX process_snapshots_executable_index ON process_snapshots (executable_id);")
+
+    conn.execute("INSERT INTO scans (scanned_at) SELECT DISTINCT updated_at FROM processes ORDER BY updated_at;")
+    conn.execute(
+        'INSERT INTO executables (path, "hash", file_exists) SELECT DISTINCT path, "hash", file_exists FROM processes;'
+    )
+    conn.execute(
+        "INSERT INTO process_snapshots (scan_id, pid, ppid, create_time, name, executable_id, valid, accessible) "
+        "SELECT s.id, p.id, p.ppid, NULL, p.name, e.id, p.valid, p.accessible "
+        "FROM processes p "
+        "JOIN scans s ON s.scanned_at = p.updated_at "
+        'JOIN executables e ON e.path IS p.path AND e."hash" IS p."hash" AND e.file_exists IS p.file_exists;'
+    )
+    conn.execute("DROP TABLE processes;")
+    conn.execute(
+        "CREATE VIEW processes AS "
+        'SELECT p.pid AS id, p.ppid, s.scanned_at AS updated_at, p.name, e.path, p.valid, e."hash", p.accessible, '
+        "e.file_exists "
+        "FROM process_snapshots p "
+        "JOIN scans s ON s.id = p.scan_id "
+        "LEFT JOIN executables e ON e.id = p.executable_id;"
+    )
+
+
+def _migrate_to_v3(conn: Connection) -> None:
+    """Track which scans have been compacted, and index process rows for lookups across scans."""
+    conn.execute("ALTER TABLE scans ADD COLUMN compacted BIT NOT NULL DEFAULT 0;")
+    conn.execute(
+        "CREATE INDEX process_snapshots_pid_index "
+        "ON process_snapshots (pid, create_time, executable_id, name, scan_id);"
+    )
+
+
+# Each migration brings the schema from the previous version, as recorded in PRAGMA user_version.
+MIGRATIONS: list[Callable[[Connection], None]] = [_migrate_to_v1, _migrate_to_v2, _migrate_to_v3]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class ProcessStore:
+    """The ProcessStore writes process snapshots to the database over a single persistent connection.
+
+    The connection isn't tied to the thread that opened it, but it must only be used by one thread at a time.
+    """
+
+    database_path: str
+    synchronous: str
+    cache_size: int
+    executable_cache_size: int
+
+    def __init__(
+        self,
+        database_path: str,
+        synchronous: str = "NORMAL",
+        cache_size: int = 16384,
+        hash_cache: HashCache | None = None,
+        executable_cache_size: int = DEFAULT_EXECUTABLE_CACHE_SIZE,
+    ) -> None:
+        """Creates a new store. The database is opened and migrated on first use.
+
+        :param database_path: The location of the SQLite database.
+        :param synchronous: The SQLite synchronous level: OFF, NORMAL, FULL or EXTRA.
+        :param cache_size: The SQLite page cache size, in KiB.
+        :param hash_cache: A hash cache to load when the database is opened, and to flush with each snapshot.
+        :param executable_cache_size: The most executable keys kept in memory, least recently used first out.
+        """
+        if synchronous.upper() not in SYNCHRONOUS_LEVELS:
+            msg = f"Invalid database synchronous level: {synchronous}"
+            raise ValueError(msg)
+        self.database_path = database_path
+        self.synchronous = synchronous.upper()
+        self.cache_size = cache_size
+        self.hash_cache = hash_cache
+        self.__conn: Connection | None = None
+        self.__page_size = 4096
+        self.executable_cache_size = max(1, executable_cache_size)
+        self.__executables: OrderedDict[tuple[str, str | None, bool], int] = OrderedDict()
+        self.last_scan_id = 0
+
+    @property
+    def conn(self) -> Connection:
+        """The open database connection, opening and migrating the database if needed.
+
+        :return: The connection to the process database.
+        """
+        if self.__conn is None:
+            return self.open()
+        return self.__conn
+
+    def open(self) -> Connection:
+        """Open the database, apply the connection pragmas and migrate the schema to the latest version.
+
+        :return: The connection to the process database.
+        """
+        if self.__conn is not None:
+            return self.__conn
+        conn = connect(self.database_path, check_same_thread=False)
+        # Only takes effect on a new database; an existing one needs a one-off VACUUM to switch over.
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        conn.execute("PRAGMA journal_mode = WAL;")
+        conn.execute(f"PRAGMA synchronous = {self.synchronous};")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size)};")
+        # The store checkpoints the WAL itself, so that it can account for the resulting fsyncs.
+        conn.execute("PRAGMA wal_autocheckpoint = 0;")
+        (self.__page_size,) = conn.execute("PRAGMA page_size;").fetchone()
+        self.__conn = conn
+        self.migrate()
+        if self.hash_cache is not None:
+            self.hash_cache.load(conn)
+        return conn
+
+    def migrate(self) -> None:
+        """Apply any schema migrations that the database hasn't seen yet."""
+        conn = self.conn
+        (version,) = conn.execute("PRAGMA user_version;").fetchone()
+        for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            logger.info("Migrating database %s to schema version %s.", self.database_path, target)
+            with conn:
+                # sqlite3 only opens a transaction before DML, so open one to take in the migration's DDL too.
+                conn.execute("BEGIN;")
+                migration(conn)
+                conn.execute(f"PRAGMA user_version = {target};")
+
+    def write_snapshot(
+        self, process_records: Iterable[ProcessRecord | ProcessRow], timestamp: datetime | None = None
+    ) -> int:
+        """Write the valid process records of a scan in a single transaction.
+
+        :param process_records: The process records from the scan, or the rows of a snapshot of them.
+        :param timestamp: The time of the scan. Defaults to now.
+        :return: The number of rows written.
+        """
+        if timestamp is None:
+            timestamp = datetime.now(UTC)
+        # Read the records first, so any lazy hashing isn't counted as write time.
+        records = [(p, (p.path, p.hash, p.exists)) for p in process_records if p.valid]
+        conn = self.conn
+        start = perf_counter()
+        try:
+            with conn:
+                scan_id = conn.execute("INSERT INTO scans (scanned_at) VALUES (?);", (timestamp,)).lastrowid
+                rows = [
+                    (
+                        scan_id,
+                        p.pid,
+                        p.ppid,
+                        p.create_time,
+                        p.name,
+                        self.__executable_id(conn, executable),
+                        p.valid,
+                        p.accessible,
+                    )
+                    for p, executable in records
+                ]
+                conn.executemany(
+                    "INSERT INTO process_snapshots "
+                    "(scan_id, pid, ppid, create_time, name, executable_id, valid, accessible) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                if self.hash_cache is not None:
+                    self.hash_cache.flush(conn)
+        except Error:
+            # Executables interned during the failed transaction were rolled back with it.
+            self.__executables.clear()
+            raise
+        self.last_scan_id = scan_id or 0
+        transactions.inc()
+        if self.synchronous in {"FULL", "EXTRA"}:
+            # In WAL mode, FULL and EXTRA sync the WAL on every commit; NORMAL only syncs on checkpoint.
+            fsyncs.inc()
+        self.__checkpoint_if_needed()
+        elapsed = perf_counter() - start
+        write_seconds.set(elapsed)
+        write_seconds_total.inc(elapsed)
+        rows_written.inc(len(rows))
+        logger.debug("Wrote %s process rows in %.1f ms.", len(rows), elapsed * 1000)
+        return len(rows)
+
+    def __executable_id(self, conn: Connection, executable: tuple[str, str | None, bool]) -> int:
+        """Return the key of an interned (path, hash, exists) row, inserting it if it's new."""
+        executable_id = self.__executables.get(executable)
+        if executable_id is not None:
+            self.__executables.move_to_end(executable)
+            return executable_id
+        row = conn.execute(
+            'SELECT id FROM executables WHERE path IS ? AND "hash" IS ? AND file_exists IS ?;', executable
+        ).fetchone()
+        if row is None:
+            cursor = conn.execute('INSERT INTO executables (path, "hash", file_exists) VALUES (?, ?, ?);', executable)
+            # Only None before a row has been inserted.
+            executable_id = cast("int", cursor.lastrowid)
+        else:
+            (executable_id,) = row
+        self.__executables[executable] = executable_id
+        if len(self.__executables) > self.executable_cache_size:
+            self.__executables.popitem(last=False)
+        return executable_id
+
+    def __checkpoint_if_needed(self) -> None:
+        wal_path = Path(f"{self.database_path}-wal")
+        try:
+            wal_size = wal_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if wal_size < CHECKPOINT_PAGES * self.__page_size:
+            return
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+        checkpoints.inc()
+        if self.synchronous != "OFF":
+            # A checkpoint syncs the WAL before copying it back, then syncs the database file.
+            fsyncs.inc(2)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
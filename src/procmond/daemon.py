@@ -12,12 +12,11 @@ for the ProcMonD process monitoring system.
 
 from __future__ import annotations
 
+import signal
 import sys
-from datetime import UTC, datetime
 from logging import basicConfig, fatal, getLogger
 from pathlib import Path
-from sqlite3 import OperationalError, connect
-from time import sleep
+from sqlite3 import OperationalError
 from typing import TYPE_CHECKING, Any, Self
 
 try:
@@ -56,22 +55,155 @@ except ImportError:
             return
 
 
-from psutil import AccessDenied, NoSuchProcess, ZombieProcess, process_iter
-
-from procmond.core import detectors
-from procmond.core.config_manager import ConfigManager
+from procmond.core.alert_state import AlertState
+from procmond.core.collector import ProcessCollector, create_backend
+from procmond.core.config_manager import ConfigManager, get_config, set_config
+from procmond.core.detector_engine import DetectorEngine
+from procmond.core.detector_registry import DetectionContext, DetectorRegistry
+from procmond.core.dispatcher import AlertDispatcher
+from procmond.core.hash_cache import HashCache
+from procmond.core.hashing import HashingEngine
+from procmond.core.proc_events import ProcEventListener
+from procmond.core.profiler import CycleProfiler
+from procmond.core.retention import Compactor
+from procmond.core.storage import ProcessStore
 from procmond.models.process_record import ProcessRecord
 
 if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from procmond.core.collector import ScanDiff
+    from procmond.core.metrics_server import MetricsServer
+    from procmond.core.pipeline import Pipeline
+    from procmond.core.scheduler import AdaptiveScheduler
     from procmond.models.alert import Alert
+    from procmond.models.process_snapshot import ProcessRow, ProcessSnapshot
 
-config = ConfigManager()
-daemon_ctx = DaemonContext()
 logger = getLogger(__name__)
 
+# The daemon's components, created from the config by configure().
+COMPONENTS = frozenset(
+    (
+        "config",
+        "daemon_ctx",
+        "collector",
+        "hash_cache",
+        "hashing_engine",
+        "store",
+        "compactor",
+        "detector_engine",
+        "detector_registry",
+        "proc_events",
+        "metrics_server",
+        "profiler",
+        "alert_state",
+        "alert_dispatcher",
+    )
+)
+
+config: ConfigManager
+daemon_ctx: Any
+collector: ProcessCollector
+hash_cache: HashCache
+hashing_engine: HashingEngine
+store: ProcessStore
+compactor: Compactor
+detector_engine: DetectorEngine
+detector_registry: DetectorRegistry
+proc_events: ProcEventListener
+metrics_server: MetricsServer | None
+profiler: CycleProfiler
+alert_state: AlertState
+alert_dispatcher: AlertDispatcher
+
+
+def configure(new_config: ConfigManager | None = None) -> None:
+    """Create the daemon's components from its configuration. Must be called before the daemon runs.
+
+    Importing this module does nothing but define it, so that commands that don't scan, and the alert handlers,
+    can import it cheaply.
+
+    :param new_config: The configuration to use. Defaults to loading the config file.
+    """
+    global config, daemon_ctx, collector, hash_cache, hashing_engine, store, compactor  # noqa: PLW0603
+    global detector_engine, detector_registry, proc_events, metrics_server, profiler  # noqa: PLW0603
+    global alert_state, alert_dispatcher  # noqa: PLW0603
+
+    if new_config is not None:
+        set_config(new_config)
+    config = get_config()
+    daemon_ctx = DaemonContext()
+    collector = ProcessCollector(create_backend(config.collector_backend, config.collector_workers))
+    hash_cache = HashCache(config.hash_cache_size)
+    ProcessRecord.hash_cache = hash_cache
+    hashing_engine = HashingEngine(
+        hash_cache,
+        workers=config.hash_workers,
+        buffer_size=config.hash_buffer_size,
+        byte_budget=config.hash_byte_budget,
+    )
+    store = ProcessStore(
+        config.database_path,
+        synchronous=config.database_synchronous,
+        cache_size=config.database_cache_size,
+        hash_cache=hash_cache,
+    )
+    compactor = Compactor(
+        store,
+        retention_hours=config.retention_hours,
+        batch_size=config.compaction_batch_size,
+        budget_ms=config.compaction_budget_ms,
+    )
+    detector_engine = DetectorEngine()
+    detector_registry = DetectorRegistry(
+        disabled=config.disabled_detectors,
+        budget_ms=config.detector_budget_ms,
+        budgets=config.detector_budgets,
+        over_budget=config.detector_over_budget,
+    )
+    proc_events = ProcEventListener()
+    metrics_server = None
+    if config.metrics_enabled:
+        from procmond.core.metrics_server import MetricsServer  # noqa: PLC0415
+
+        metrics_server = MetricsServer(config.metrics_address, config.metrics_port)
+    profiler = CycleProfiler(
+        config.root_path,
+        mode=config.profile_mode,
+        sample_interval=config.profile_sample_interval_ms / 1000,
+    )
+    alert_state = AlertState(config.alert_suppression_seconds, config.alert_state_size)
+    alert_dispatcher = AlertDispatcher(
+        queue_size=config.alert_queue_size,
+        batch_size=config.alert_batch_size,
+        linger=config.alert_linger_ms / 1000,
+        max_retries=config.alert_max_retries,
+        retry_delay=config.alert_retry_delay,
+    )
+
+
+def __getattr__(name: str) -> Any:  # noqa: ANN401
+    """Configure the daemon on first use of one of its components from outside, e.g. by a detector plugin.
+
+    :param name: The name of the module attribute.
+    :return: The component.
+    """
+    if name not in COMPONENTS:
+        msg = f"module {__name__!r} has no attribute {name!r}"
+        raise AttributeError(msg)
+    configure()
+    return globals()[name]
+
 
 def main() -> None:
-    """The main function that is run when the process monitoring daemon starts up."""
+    """The main function that is run when the process monitoring daemon starts up. Configures the daemon if needed."""
+    # Only the daemon needs asyncio, which is slow to import, so one-shot commands don't pay for it.
+    import asyncio  # noqa: PLC0415
+
+    from procmond.core.pipeline import Pipeline  # noqa: PLC0415
+
+    if "config" not in globals():
+        configure()
     basicConfig(
         format=config.log_message_format,
         datefmt=config.log_message_datefmt,
@@ -90,141 +222,214 @@ def main() -> None:
                 logger.info("Logging to email")
             if config.alert_to_webhook:
                 logger.info("Logging to webhook")
-
             try:
-                while True:
-                    logger.debug("Performing process checks.")
-                    process_records = get_processes()
-                    store_records(process_records)
-                    alerts = check_alerts()
-                    if alerts:
-                        action_alerts(alerts)
-
-                    sleep(config.refresh_rate)
-            except KeyboardInterrupt:
+                store.open()
+            except OperationalError:
+                fatal(f"Cannot open database file {config.database_path}")
                 daemon_ctx.close()
                 sys.exit(-1)
+            detector_engine.rebuild(store.conn)
+            if config.process_events:
+                proc_events.start()
+            if metrics_server is not None:
+                metrics_server.start()
+            start_profiler()
+            register_alert_sinks()
+
+            pipeline = Pipeline(
+                config.refresh_rate,
+                collect=scan_processes,
+                store=store_snapshot,
+                detect=check_alerts,
+                deliver=action_alerts,
+                events=proc_events,
+                observe=check_exec_events,
+                profiler=profiler,
+                scheduler=create_scheduler(),
+                cycle_budget=config.cycle_deadline_percent / 100,
+            )
+            try:
+                asyncio.run(pipeline.run())
+            except (KeyboardInterrupt, OperationalError) as e:
+                if isinstance(e, OperationalError):
+                    # Raised by store_records. The pipeline has already stopped its other stages.
+                    fatal(f"Cannot write to database file {config.database_path}")
+                shutdown(pipeline)
+                sys.exit(-1)
+
+
+def shutdown(pipeline: Pipeline) -> None:
+    """Stop the daemon's components once the pipeline has stopped, delivering what alerts are left.
+
+    :param pipeline: The pipeline the daemon was running.
+    """
+    proc_events.stop()
+    if metrics_server is not None:
+        metrics_server.stop()
+    pipeline.close()
+    collector.backend.close()
+    alert_dispatcher.close(timeout=5)
+    hashing_engine.close()
+    store.close()
+    daemon_ctx.close()
+
+
+def create_scheduler() -> AdaptiveScheduler | None:
+    """Create the adaptive scan scheduler, if it's enabled.
+
+    :return: The scheduler, or None to scan every RefreshRate seconds.
+    """
+    if not config.adaptive_refresh:
+        return None
+    from procmond.core.scheduler import AdaptiveScheduler  # noqa: PLC0415
+
+    return AdaptiveScheduler(
+        config.refresh_rate,
+        min_interval=config.min_refresh_rate,
+        max_interval=config.max_refresh_rate,
+        cpu_budget=config.cpu_budget_percent / 100,
+    )
+
+
+def start_profiler() -> None:
+    """Profile the first scan cycles if configured to, and profile more whenever SIGUSR1 is received."""
+    if config.profile_on_start:
+        profiler.request(config.profile_cycles)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda _signum, _frame: profiler.request(config.profile_cycles))
+
+
+def scan_processes() -> ScanDiff:
+    """Scan the process list and hash the executables of the processes found.
+
+    :return: The diff from the previous scan.
+    """
+    logger.debug("Performing process checks.")
+    diff = collector.scan()
+    hashing_engine.hash_records(diff.current)
+    return diff
+
+
+def check_exec_events(pids: list[int]) -> list[Alert]:
+    """Inspect processes that have just exec()ed, and check them for alerts.
+
+    The processes are stored with the next full scan, if they are still running by then.
+
+    :param pids: The IDs of the processes that exec()ed.
+    :return: A List of new alerts involving the new processes; anything else was reported by the last full scan.
+    """
+    diff = collector.observe(pids)
+    if not diff.spawned:
+        return []
+    hashing_engine.hash_records(diff.spawned)
+    pids_seen = {p.pid for p in diff.spawned}
+    names_seen = {p.name for p in diff.spawned}
+    alerts = [a for a in run_detectors(diff) if a.pid in pids_seen or a.name in names_seen]
+    # Only some of the alerts are checked here, so none of the reported conditions can be resolved.
+    return alert_state.update(alerts, checked=())
 
 
 def get_processes() -> list[ProcessRecord]:
     """Walk the current process list and return ProcessRecord objects.
 
+    Only processes that are new since the previous call are fully inspected; see ProcessCollector.
+
     :return: The collection of process records.
     """
-    process_records = []
-    for process in process_iter():
-        proc = ProcessRecord(process.pid)
-        try:
-            proc.name = process.name()
-            proc.ppid = process.ppid()
-            proc.path = process.exe()
-
-        except AccessDenied:
-            logger.warning("%s is not an accessible process.", proc)
-            proc.valid = False
-        except FileNotFoundError:
-            logger.warning("%s executable could not be found.", proc)
-            proc.valid = True
-            proc.accessible = True
-        except ZombieProcess:
-            logger.warning("%s is a zombie process.", proc)
-            proc.valid = False
-        except NoSuchProcess:
-            logger.warning("%s process no longer exists.", proc)
-            proc.valid = False
-        finally:
-            if proc.valid is True:
-                process_records.append(proc)
-
-    return process_records
-
-
-def store_records(process_records: list[ProcessRecord]) -> None:
-    """Stores a List of ProcessRecord objects in a SQLite3 database.
-
-    :param process_records: A List of ProcessRecords representing each process identified.
+    return collector.scan().current
+
+
+def store_records(process_records: Iterable[ProcessRecord | ProcessRow]) -> None:
+    """Stores a List of ProcessRecord objects, or a ProcessSnapshot, in a SQLite3 database.
+
+    A database that can't be written to raises OperationalError, which stops the pipeline and then the daemon.
+
+    :param process_records: A List of ProcessRecords representing each process identified, or a snapshot of them.
+    """
+    store.write_snapshot(process_records)
+    logger.debug("Hash cache: %s hits, %s misses.", hash_cache.hits, hash_cache.misses)
+
+
+def store_snapshot(snapshot: ProcessSnapshot) -> None:
+    """Store a snapshot of a scan's process records, then compact the older history.
+
+    :param snapshot: A snapshot of the process records from the scan.
     """
+    store_records(snapshot)
+    compact_history()
+
+
+def compact_history() -> None:
+    """Run a time-boxed compaction step over the process history, if retention is enabled."""
+    if config.retention_hours <= 0:
+        return
     try:
-        with connect(config.database_path) as conn:
-            cur = conn.cursor()
-            # Create the database if it doesn't already exist.
-            cur.execute(
-                "CREATE TABLE IF NOT EXISTS processes "
-                "(id INTEGER, ppid INTEGER, updated_at DATETIME, name VARCHAR, path VARCHAR, "
-                'valid BIT, "hash" VARCHAR, accessible BIT, file_exists BIT, '
-                "CONSTRAINT processes_pk PRIMARY KEY (id, updated_at));"
-            )
-            cur.execute("CREATE INDEX IF NOT EXISTS processes_name_hash_index ON processes (name DESC, hash DESC);")
-            cur.execute("CREATE INDEX IF NOT EXISTS processes_updated_at_index ON processes(updated_at DESC);")
-            cur.execute(
-                "CREATE INDEX IF NOT EXISTS processes_file_exists_accessible_updated_at_index "
-                "ON processes (file_exists, accessible, updated_at);"
-            )
-            cur.execute("CREATE INDEX IF NOT EXISTS processes_id_path_hash_index ON processes (id, path, hash);")
-            conn.commit()
-
-            # Now insert the new record.
-            timestamp = datetime.now(UTC)
-            insert_sql = (
-                "INSERT INTO processes (id, ppid, updated_at, name, path, valid, hash, accessible, "
-                "file_exists) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
-            )
-            for p in process_records:
-                if p.valid:
-                    cur.execute(
-                        insert_sql,
-                        (
-                            p.pid,
-                            p.ppid,
-                            timestamp,
-                            p.name,
-                            p.path,
-                            p.valid,
-                            p.hash,
-                            p.accessible,
-                            p.exists,
-                        ),
-                    )
-            conn.commit()
+        compactor.run()
     except OperationalError:
-        fatal(f"Cannot write to database file {config.database_path}")
-        daemon_ctx.close()
-        sys.exit(-1)
+        # Most likely another connection holds the database; try again after the next scan.
+        logger.warning("Could not compact the process history in %s.", config.database_path)
 
 
-def check_alerts() -> list[Alert]:
-    """Run each alert test to see if anything is amiss.
+def check_alerts(diff: ScanDiff | None = None) -> list[Alert]:
+    """Run each enabled detector to see if anything is amiss, leaving out conditions that were already reported.
 
-    :return: A List of alerts.
+    :param diff: The diff from the latest scan. Defaults to the collector's last scan.
+    :return: A List of new, reminder and resolved alerts.
     """
-    alerts = []
+    alerts = run_detectors(diff)
+    return alert_state.update(alerts, checked=detector_registry.completed)
 
-    alerts.extend(detectors.detect_process_without_exe())
-    alerts.extend(detectors.detect_process_with_hash_change())
-    alerts.extend(detectors.detect_process_with_duplicate_name())
-    return alerts
 
+def run_detectors(diff: ScanDiff | None = None) -> list[Alert]:
+    """Run each enabled detector against the latest scan.
 
-def action_alerts(alerts: list[Alert]) -> None:
-    """Trigger each enabled action type on the list of Alerts.
-
-    :param alerts: A List of Alert objects representing each alert to be processed.
+    :param diff: The diff from the latest scan. Defaults to the collector's last scan.
+    :return: A List of alerts for every suspicious condition present.
     """
+    if diff is None:
+        diff = collector.last_diff
+    if diff is not None:
+        detector_engine.apply(diff)
+    context = DetectionContext(
+        snapshot=diff.current if diff is not None else [],
+        diff=diff,
+        state=detector_engine,
+        database_path=config.database_path,
+    )
+    alerts = detector_registry.run(context)
+    logger.debug(
+        "Detector timings: %s",
+        ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in detector_registry.timings.items()),
+    )
+    return alerts
+
+
+def register_alert_sinks() -> None:
+    """Register each enabled alert handler with the alert dispatcher."""
     if config.alert_to_syslog:
         from procmond.handlers.syslog_alert_handler import syslog_alert_handler  # noqa: PLC0415
 
-        syslog_alert_handler(alerts)
+        alert_dispatcher.add_sink("syslog", syslog_alert_handler)
 
     if config.alert_to_email:
         from procmond.handlers.email_alert_handler import email_alert_handler  # noqa: PLC0415
 
-        email_alert_handler(alerts)
+        alert_dispatcher.add_sink("email", email_alert_handler)
 
     if config.alert_to_webhook:
         from procmond.handlers.webhook_alert_handler import webhook_alert_handler  # noqa: PLC0415
 
-        webhook_alert_handler(alerts)
+        alert_dispatcher.add_sink("webhook", webhook_alert_handler)
+
+
+def action_alerts(alerts: list[Alert]) -> None:
+    """Queue the list of Alerts for delivery by each enabled action type. Never blocks on delivery.
+
+    :param alerts: A List of Alert objects representing each alert to be processed.
+    """
+    if not alert_dispatcher.sinks:
+        register_alert_sinks()
+    alert_dispatcher.dispatch(alerts)
 
 
 if __name__ == "__main__":
@@ -12,7 +12,9 @@ from __future__ import annotations
 
 from email.message import EmailMessage
 from logging import getLogger
-from smtplib import SMTP, SMTP_SSL, SMTPAuthenticationError
+from smtplib import SMTP, SMTP_SSL, SMTPException, SMTPServerDisconnected
+from threading import Lock
+from time import monotonic
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -20,45 +22,133 @@ if TYPE_CHECKING:
 
     from procmond.models.alert import Alert
 
-from procmond.daemon import config
+from procmond.core.config_manager import get_config
 
 logger = getLogger(__name__)
 
 
+# The SMTP reply code for a successful NOOP.
+SMTP_OK = 250
+
+
+class SMTPClient:
+    """The SMTPClient keeps one SMTP connection open between batches, logging in only when it reconnects.
+
+    Before each message, the connection is checked with NOOP and replaced if the server has dropped it. A
+    connection that has been idle for longer than the idle timeout is closed rather than reused.
+    """
+
+    idle_timeout: float
+
+    def __init__(self, idle_timeout: float = 60) -> None:
+        """Creates a new client. The connection is opened on first use.
+
+        :param idle_timeout: How long an unused connection is kept open, in seconds.
+        """
+        self.idle_timeout = idle_timeout
+        self.__smtp: SMTP | None = None
+        self.__last_used = 0.0
+        self.__lock = Lock()
+
+    def send_message(self, msg: EmailMessage) -> None:
+        """Send a message, reusing the open connection if it is still alive.
+
+        :param msg: The message to send.
+        """
+        with self.__lock:
+            try:
+                try:
+                    self.__connection().send_message(msg)
+                except SMTPServerDisconnected:
+                    # The server hung up between the NOOP and the message; try once more on a new connection.
+                    logger.debug("SMTP server disconnected; reconnecting.")
+                    self.__discard()
+                    self.__connection().send_message(msg)
+            except Exception:
+                # Never keep a connection that a send has failed on.
+                self.__discard()
+                raise
+            self.__last_used = monotonic()
+
+    def close(self) -> None:
+        """Close the connection."""
+        with self.__lock:
+            self.__discard()
+
+    def __connection(self) -> SMTP:
+        if self.__smtp is not None and monotonic() - self.__last_used > self.idle_timeout:
+            logger.debug("Closing idle SMTP connection.")
+            self.__discard()
+        if self.__smtp is not None:
+            try:
+                code, _ = self.__smtp.noop()
+            except (SMTPServerDisconnected, OSError):
+                code = 0
+            if code == SMTP_OK:
+                return self.__smtp
+            logger.debug("SMTP connection failed its NOOP check; reconnecting.")
+            self.__discard()
+        self.__smtp = self.__connect()
+        return self.__smtp
+
+    @staticmethod
+    def __connect() -> SMTP:
+        email_config = get_config().email_config
+        smtp_class = SMTP_SSL if email_config["smtp_server_use_ssl"] else SMTP
+        smtp = smtp_class(
+            host=str(email_config["smtp_server_address"]),
+            port=int(email_config["smtp_server_port"]),
+        )
+        try:
+            if email_config["smtp_server_username"] and email_config["smtp_server_password"]:
+                smtp.login(
+                    user=str(email_config["smtp_server_username"]),
+                    password=str(email_config["smtp_server_password"]),
+                )
+        except Exception:
+            smtp.close()
+            raise
+        return smtp
+
+    def __discard(self) -> None:
+        smtp, self.__smtp = self.__smtp, None
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (SMTPException, OSError):
+            smtp.close()
+
+
+# Created on first use rather than on import, so that it is set up from the configuration the daemon runs with.
+client: SMTPClient | None = None
+
+
+def get_client() -> SMTPClient:
+    """Get the shared client, creating it from the configuration on first use.
+
+    :return: The client that alerts are sent through.
+    """
+    global client  # noqa: PLW0603
+    if client is None:
+        client = SMTPClient(get_config().alert_connection_idle_seconds)
+    return client
+
+
 def email_alert_handler(alerts: Iterable[Alert]) -> None:
     """Sends an email containing each alert via an SMTP server.
 
+    Connection and authentication errors are raised to the alert dispatcher, which retries the delivery.
+
     :param alerts: A List of Alert objects representing each alert to be processed.
     """
     message_text = ""
     for alert in alerts:
         message_text += f"{alert}\n"
+    email_config = get_config().email_config
     msg = EmailMessage()
-    msg["Subject"] = f"ProcMonD - {config.email_config['subject_prefix']} - Suspicious Process Alerts"
-    msg["From"] = config.email_config["sender_address"]
-    msg["To"] = config.email_config["destination_address"]
+    msg["Subject"] = f"ProcMonD - {email_config['subject_prefix']} - Suspicious Process Alerts"
+    msg["From"] = email_config["sender_address"]
+    msg["To"] = email_config["destination_address"]
     msg.set_content(message_text)
-
-    try:
-        if config.email_config["smtp_server_use_ssl"]:
-            s = SMTP_SSL(
-                host=str(config.email_config["smtp_server_address"]),
-                port=int(config.email_config["smtp_server_port"]),
-            )
-        else:
-            s = SMTP(
-                host=str(config.email_config["smtp_server_address"]),
-                port=int(config.email_config["smtp_server_port"]),
-            )
-
-        if config.email_config["smtp_server_username"] and config.email_config["smtp_server_password"]:
-            s.login(
-                user=str(config.email_config["smtp_server_username"]),
-                password=str(config.email_config["smtp_server_password"]),
-            )
-        s.send_message(msg)
-        s.quit()
-    except ConnectionRefusedError:
-        logger.exception("Connection refused to SMTP server.")
-    except SMTPAuthenticationError:
-        logger.exception("SMTP Server refused authentication.")
+    get_client().send_message(msg)
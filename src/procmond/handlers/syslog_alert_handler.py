@@ -13,8 +13,8 @@ from collections.abc import Iterable
 try:
     import syslog as _syslog_mod
 
-    LOG_DAEMON = getattr(_syslog_mod, "LOG_DAEMON", None)
-    LOG_WARNING = getattr(_syslog_mod, "LOG_WARNING", None)
+    _log_daemon: int | None = getattr(_syslog_mod, "LOG_DAEMON", None)
+    _log_warning: int = getattr(_syslog_mod, "LOG_WARNING", 4)
 
     def openlog(ident: str = "ProcMonD", facility: int | None = None) -> None:
         """Configure syslog with the given identifier and facility."""
@@ -28,8 +28,8 @@ except ImportError:
     # Provide a minimal fallback that logs via the standard logging module.
     import logging
 
-    LOG_DAEMON_FALLBACK: int | None = None
-    LOG_WARNING_FALLBACK: int = logging.WARNING
+    _log_daemon = None
+    _log_warning = logging.WARNING
 
     def openlog(ident: str = "ProcMonD", facility: int | None = None) -> None:  # noqa: ARG001, unused-parameter  # type: ignore[unused-parameter]
         """Configure a logger for fallback syslog behavior.
@@ -55,6 +55,11 @@ except ImportError:
         logger.log(level, message)
 
 
+# The facility and level that alerts are logged with, from whichever of the implementations above is available.
+LOG_DAEMON_FALLBACK = _log_daemon
+LOG_WARNING_FALLBACK = _log_warning
+
+
 def syslog_alert_handler(alerts: Iterable[object]) -> None:
     """Log each alert to the System Logging facility.
 
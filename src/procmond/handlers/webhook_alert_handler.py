@@ -11,21 +11,87 @@ when suspicious process behavior is detected.
 from __future__ import annotations
 
 from logging import getLogger
-from typing import TYPE_CHECKING
+from threading import Lock
+from time import monotonic
+from typing import TYPE_CHECKING, Any
 
-from requests import post
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
 
 if TYPE_CHECKING:
     from collections.abc import Iterable
 
     from procmond.models.alert import Alert
 
-from procmond.daemon import config
+from procmond.core.config_manager import get_config
 
 logger = getLogger(__name__)
 
-# HTTP status code constants
-HTTP_OK = 200
+# The number of connections kept open to each host. Alerts are sent one batch at a time, so one is usually enough.
+POOL_SIZE = 2
+
+
+class WebhookClient:
+    """The WebhookClient posts to webhooks over a long-lived session, so each batch reuses a kept-alive connection.
+
+    A session that has been idle for longer than the idle timeout is closed and replaced before its next
+    request, rather than risking a connection that the server has already dropped.
+    """
+
+    idle_timeout: float
+
+    def __init__(self, idle_timeout: float = 60) -> None:
+        """Creates a new client. The session is opened on first use.
+
+        :param idle_timeout: How long an unused session is kept open, in seconds.
+        """
+        self.idle_timeout = idle_timeout
+        self.__session: Session | None = None
+        self.__last_used = 0.0
+        self.__lock = Lock()
+
+    def post(self, url: str, **kwargs: Any) -> Response:  # noqa: ANN401
+        """Send a POST request over the pooled session.
+
+        :param url: The URL to post to.
+        :param kwargs: Any other arguments for ``requests.Session.post``.
+        :return: The response.
+        """
+        with self.__lock:
+            if self.__session is not None and monotonic() - self.__last_used > self.idle_timeout:
+                logger.debug("Closing idle webhook session.")
+                self.__session.close()
+                self.__session = None
+            if self.__session is None:
+                self.__session = Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                self.__session.mount("http://", adapter)
+                self.__session.mount("https://", adapter)
+            session = self.__session
+            self.__last_used = monotonic()
+        return session.post(url, **kwargs)
+
+    def close(self) -> None:
+        """Close the session and its connections."""
+        with self.__lock:
+            if self.__session is not None:
+                self.__session.close()
+                self.__session = None
+
+
+# Created on first use rather than on import, so that it is set up from the configuration the daemon runs with.
+client: WebhookClient | None = None
+
+
+def get_client() -> WebhookClient:
+    """Get the shared client, creating it from the configuration on first use.
+
+    :return: The client that alerts are sent through.
+    """
+    global client  # noqa: PLW0603
+    if client is None:
+        client = WebhookClient(get_config().alert_connection_idle_seconds)
+    return client
 
 
 def webhook_alert_handler(alerts: Iterable[Alert]) -> None:
@@ -38,10 +104,12 @@ def webhook_alert_handler(alerts: Iterable[Alert]) -> None:
         message_text += f"{alert}\n"
     data = {"text": message_text}
     # include a short timeout to avoid blocking the daemon
-    response = post(config.webhook_address, json=data, timeout=5)
-    if response.status_code != HTTP_OK:
+    response = get_client().post(get_config().webhook_address, json=data, timeout=5)
+    if not response.ok:
         logger.error(
             "Request to webhook returned an error %s, the response is:\n\t%s",
             response.status_code,
             response.text,
         )
+    # Any 2xx status means the alerts were delivered. Errors are raised to the alert dispatcher, which retries.
+    response.raise_for_status()
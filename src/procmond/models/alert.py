@@ -10,6 +10,19 @@ suspicious process event.
 
 from __future__ import annotations
 
+from enum import StrEnum
+
+
+class AlertStatus(StrEnum):
+    """Where an alert stands in the lifetime of the condition it reports."""
+
+    NEW = "new"
+    """The condition has just been detected."""
+    REMINDER = "reminder"
+    """The condition is still present, and was last reported a while ago."""
+    RESOLVED = "resolved"
+    """The condition is no longer present."""
+
 
 class Alert:
     """The Alert class encapsulates the metadata for a suspicious event."""
@@ -18,23 +31,48 @@ class Alert:
     path: str
     name: str
     pid: int
+    create_time: float
+    hash: str
+    detector: str
+    status: AlertStatus
 
-    def __init__(self, pid: int = 0, name: str = "", path: str = "", message: str = "") -> None:
+    def __init__(  # noqa: PLR0913
+        self,
+        pid: int = 0,
+        name: str = "",
+        path: str = "",
+        message: str = "",
+        *,
+        create_time: float = 0.0,
+        file_hash: str = "",
+        detector: str = "",
+        status: AlertStatus = AlertStatus.NEW,
+    ) -> None:
         """Creates a new Alert object that represents a detected suspicious event.
 
         :param pid: The ID of the suspicious process.
         :param name: The name of the process, as it appears in ps.
         :param path: The path on disk of the process's executable file.
         :param message: The alert message explaining the suspicious activity.
+        :param create_time: The time the process was created, which tells it apart from earlier users of its pid.
+        :param file_hash: The SHA256 hash of the process's executable file, if known.
+        :param detector: The name of the detector that raised the alert.
+        :param status: Whether the alert is new, a reminder, or reports that the condition has been resolved.
         """
         self.pid = pid
         self.name = name
         self.path = path
         self.message = message
+        self.create_time = create_time
+        self.hash = file_hash
+        self.detector = detector
+        self.status = status
 
     def __str__(self) -> str:
         """Return a string representation of the alert.
 
         :return: A string representation of the alert.
         """
-        return f"{self.name}({self.pid}) {self.message}"
+        if self.status == AlertStatus.NEW:
+            return f"{self.name}({self.pid}) {self.message}"
+        return f"{self.name}({self.pid}) {self.message} [{self.status}]"
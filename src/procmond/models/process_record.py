@@ -11,10 +11,15 @@ for individual running processes.
 from __future__ import annotations
 
 import sys
-from hashlib import sha256
 from logging import getLogger
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any, ClassVar
+
+from procmond.core.hashing import DEFAULT_BUFFER_SIZE, hash_file
+
+if TYPE_CHECKING:
+    from procmond.core.file_probe import FileProbe
+    from procmond.core.hash_cache import HashCache
 
 logger = getLogger(__name__)
 
@@ -24,10 +29,14 @@ class ProcessRecord:
 
     pid: int
     ppid: int
+    create_time: float
     file_path: str
     name: str
     valid: bool
     accessible: bool
+    deleted: bool
+    probe: FileProbe | None
+    hash_cache: ClassVar[HashCache | None] = None
 
     def __init__(self, pid: int) -> None:
         """Creates a new ProcessRecord to encapsulate the metadata for an individual running process.
@@ -38,9 +47,16 @@ class ProcessRecord:
         self.__path = ""
         self.pid = pid
         self.ppid = 0
+        self.create_time = 0.0
         self.valid = False
         self.accessible = False
+        # Set when the process runs an executable that has been deleted, whatever is at its path now.
+        self.deleted = False
+        # The executable's metadata from this scan, shared with every record with the same path.
+        self.probe = None
         self.__path = ""
+        self.__hash: str | None = None
+        self.__hash_known = False
 
     @property
     def to_dict(self) -> dict[str, Any]:
@@ -74,13 +90,22 @@ class ProcessRecord:
         else:
             self.valid = True
         self.__path = file_path
+        self.__hash = None
+        self.__hash_known = False
+        self.deleted = False
+        self.probe = None
 
     @property
-    def hash(self) -> str:
+    def hash(self) -> str | None:
         """Calculate and return the SHA256 hash of the process executable.
 
-        :return: The SHA256 hash of the process executable file.
+        The digest is computed once per record, and is shared between records through the
+        class-wide hash cache when one is configured.
+
+        :return: The SHA256 hash of the process executable file, or None if hashing was deferred.
         """
+        if self.__hash_known:
+            return self.__hash
         file_hash = ""
         if not self.exists:
             return file_hash
@@ -90,21 +115,17 @@ class ProcessRecord:
                 pm = sys.modules.get("procmond")
                 if pm is not None and hasattr(pm, "config"):
                     _config = pm.config
-                    _buf = getattr(_config, "hash_buffer_size", 1024)
+                    _buf = getattr(_config, "hash_buffer_size", DEFAULT_BUFFER_SIZE)
                 else:
-                    _buf = 1024
+                    _buf = DEFAULT_BUFFER_SIZE
             except (ImportError, AttributeError):
-                _buf = 1024
-
-            with Path(self.path).open("rb") as f:
-                hasher = sha256()
-                r = f.read(_buf)
-                while r:
-                    hasher.update(r)
-                    r = f.read(_buf)
-                file_hash = hasher.hexdigest()
-                self.valid = True
-                self.accessible = True
+                _buf = DEFAULT_BUFFER_SIZE
+
+            if self.hash_cache is not None:
+                file_hash = self.hash_cache.digest(self.path, lambda file_path: hash_file(file_path, _buf))
+            else:
+                file_hash = hash_file(self.path, _buf)
+            self.hash = file_hash
         except IsADirectoryError:
             if self.path == "/":
                 self.valid = False
@@ -117,16 +138,41 @@ class ProcessRecord:
             )
             self.accessible = False
             self.valid = True
+        except FileNotFoundError:
+            logger.warning("%s (%s) executable file was removed while hashing.", self.name, self.pid)
         return file_hash
 
+    @hash.setter  # noqa: A003
+    def hash(self, file_hash: str | None) -> None:
+        """Set a hash computed elsewhere, such as by the hashing engine.
+
+        :param file_hash: The SHA256 hash of the process executable, or None to defer hashing to a later scan.
+        """
+        if file_hash:
+            self.valid = True
+            self.accessible = True
+        self.__hash = file_hash
+        self.__hash_known = True
+
+    def reset_hash(self) -> None:
+        """Forget the computed hash so that it is checked again on the next access."""
+        self.__hash = None
+        self.__hash_known = False
+
     @property
     def exists(self) -> bool:
         """Check if the process executable file exists on disk.
 
+        Uses the scan's probe of the file when there is one, so the file is only stat-ed once per scan.
+
         :return: True if the file exists, False otherwise.
         """
-        if not self.path:
+        if not self.path or self.deleted:
             return False
+        if self.probe is not None:
+            if not self.probe.accessible:
+                self.accessible = False
+            return self.probe.exists
         try:
             return Path(self.path).exists()
         except PermissionError:
@@ -0,0 +1,270 @@
+"""Process snapshot model for ProcMonD.
+
+This module defines the ProcessSnapshot class, a compact, read-only copy of
+the process records from one scan. Numeric fields are kept in parallel typed
+arrays and names, paths and hashes in interned string tables, so that a scan
+of many processes that share a few executables costs a few bytes per process
+rather than a full Python object each.
+"""
+
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from __future__ import annotations
+
+import sys
+from array import array
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from procmond.models.process_record import ProcessRecord
+
+# Bits of a snapshot's flags column.
+VALID = 1
+ACCESSIBLE = 2
+EXISTS = 4
+
+# The hash index of a process whose hash is not known.
+NO_HASH = -1
+
+
+class StringTable:
+    """A StringTable stores each distinct string once, and refers to it by its index."""
+
+    __slots__ = ("__index", "__strings")
+
+    def __init__(self) -> None:
+        """Creates a new, empty table."""
+        self.__strings: list[str] = []
+        self.__index: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        """Return the number of distinct strings.
+
+        :return: The number of distinct strings.
+        """
+        return len(self.__strings)
+
+    def __getitem__(self, index: int) -> str:
+        """Return the string at an index.
+
+        :param index: The index returned by intern().
+        :return: The string.
+        """
+        return self.__strings[index]
+
+    def intern(self, value: str) -> int:
+        """Add a string to the table if it's new.
+
+        :param value: The string.
+        :return: The index of the string.
+        """
+        index = self.__index.get(value)
+        if index is None:
+            index = len(self.__strings)
+            self.__strings.append(value)
+            self.__index[value] = index
+        return index
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the table and its strings, in bytes.
+
+        :return: The size of the table in bytes.
+        """
+        return (
+            sys.getsizeof(self.__strings)
+            + sys.getsizeof(self.__index)
+            + sum(sys.getsizeof(value) for value in self.__strings)
+        )
+
+
+class ProcessSnapshot:
+    """The ProcessSnapshot holds the process records from one scan, one column per field.
+
+    Iterating over a snapshot, or indexing it, gives ProcessRow views that read like ProcessRecords.
+    A snapshot never does any I/O; every field is captured when the record is appended.
+    """
+
+    __slots__ = (
+        "create_times",
+        "flags",
+        "hash_ids",
+        "hash_table",
+        "name_ids",
+        "name_table",
+        "path_ids",
+        "path_table",
+        "pids",
+        "ppids",
+    )
+
+    def __init__(self) -> None:
+        """Creates a new, empty snapshot."""
+        self.pids = array("q")
+        self.ppids = array("q")
+        self.create_times = array("d")
+        self.flags = array("B")
+        self.name_ids = array("I")
+        self.path_ids = array("I")
+        self.hash_ids = array("i")
+        self.name_table = StringTable()
+        self.path_table = StringTable()
+        self.hash_table = StringTable()
+
+    @classmethod
+    def from_records(cls, records: Iterable[ProcessRecord]) -> ProcessSnapshot:
+        """Capture the current state of some process records.
+
+        :param records: The process records from a scan. Their hashes should already be known.
+        :return: A new snapshot.
+        """
+        snapshot = cls()
+        for record in records:
+            snapshot.append(record)
+        return snapshot
+
+    def __len__(self) -> int:
+        """Return the number of processes in the snapshot.
+
+        :return: The number of processes.
+        """
+        return len(self.pids)
+
+    def __getitem__(self, index: int) -> ProcessRow:
+        """Return a view of one process.
+
+        :param index: The position of the process in the snapshot.
+        :return: A view of the process.
+        """
+        if index < 0:
+            index += len(self.pids)
+        if not 0 <= index < len(self.pids):
+            msg = "ProcessSnapshot index out of range"
+            raise IndexError(msg)
+        return ProcessRow(self, index)
+
+    def __iter__(self) -> Iterator[ProcessRow]:
+        """Iterate over a view of each process.
+
+        :return: An iterator of views, in the order the processes were appended.
+        """
+        return (ProcessRow(self, index) for index in range(len(self.pids)))
+
+    def append(self, record: ProcessRecord) -> None:
+        """Capture the current state of a process record.
+
+        :param record: The process record.
+        """
+        file_hash = record.hash
+        exists = record.valid and record.exists
+        flags = (VALID if record.valid else 0) | (ACCESSIBLE if record.accessible else 0) | (EXISTS if exists else 0)
+        self.pids.append(record.pid)
+        self.ppids.append(record.ppid)
+        self.create_times.append(record.create_time)
+        self.flags.append(flags)
+        self.name_ids.append(self.name_table.intern(record.name))
+        self.path_ids.append(self.path_table.intern(record.path))
+        self.hash_ids.append(NO_HASH if file_hash is None else self.hash_table.intern(file_hash))
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the snapshot, in bytes.
+
+        :return: The size of the snapshot in bytes.
+        """
+        columns = (self.pids, self.ppids, self.create_times, self.flags, self.name_ids, self.path_ids, self.hash_ids)
+        tables = (self.name_table, self.path_table, self.hash_table)
+        return (
+            sys.getsizeof(self)
+            + sum(sys.getsizeof(column) for column in columns)
+            + sum(table.nbytes for table in tables)
+        )
+
+
+class ProcessRow:
+    """A ProcessRow is a read-only view of one process in a ProcessSnapshot, with the fields of a ProcessRecord."""
+
+    __slots__ = ("__index", "__snapshot")
+
+    def __init__(self, snapshot: ProcessSnapshot, index: int) -> None:
+        """Creates a view of one process in a snapshot.
+
+        :param snapshot: The snapshot.
+        :param index: The position of the process in the snapshot.
+        """
+        self.__snapshot = snapshot
+        self.__index = index
+
+    @property
+    def pid(self) -> int:
+        """The ID of the process."""
+        return self.__snapshot.pids[self.__index]
+
+    @property
+    def ppid(self) -> int:
+        """The ID of the process's parent."""
+        return self.__snapshot.ppids[self.__index]
+
+    @property
+    def create_time(self) -> float:
+        """The time the process was created."""
+        return self.__snapshot.create_times[self.__index]
+
+    @property
+    def name(self) -> str:
+        """The name of the process, as it appears in ps."""
+        return self.__snapshot.name_table[self.__snapshot.name_ids[self.__index]]
+
+    @property
+    def path(self) -> str:
+        """The path of the process executable."""
+        return self.__snapshot.path_table[self.__snapshot.path_ids[self.__index]]
+
+    @property
+    def hash(self) -> str | None:
+        """The SHA256 hash of the process executable, or None if hashing was deferred."""
+        hash_id = self.__snapshot.hash_ids[self.__index]
+        return None if hash_id == NO_HASH else self.__snapshot.hash_table[hash_id]
+
+    @property
+    def exists(self) -> bool:
+        """Whether the process executable existed on disk when the snapshot was taken."""
+        return bool(self.__snapshot.flags[self.__index] & EXISTS)
+
+    @property
+    def valid(self) -> bool:
+        """Whether the process has an executable path."""
+        return bool(self.__snapshot.flags[self.__index] & VALID)
+
+    @property
+    def accessible(self) -> bool:
+        """Whether the process executable could be read."""
+        return bool(self.__snapshot.flags[self.__index] & ACCESSIBLE)
+
+    @property
+    def to_dict(self) -> dict[str, Any]:
+        """Return a dictionary representation of the process, as for ProcessRecord.to_dict.
+
+        :return: A dictionary containing all process record fields.
+        """
+        return {
+            "pid": self.pid,
+            "ppid": self.ppid,
+            "name": self.name,
+            "path": self.path,
+            "hash": self.hash,
+            "exists": self.exists,
+            "valid": self.valid,
+            "accessible": self.accessible,
+        }
+
+    def __str__(self) -> str:
+        """Return a string representation of the process.
+
+        :return: A string representation of the process.
+        """
+        return f"{self.name} ({self.pid})"
@@ -0,0 +1,145 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import socket
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import StreamRequestHandler, ThreadingTCPServer
+
+import pytest
+from requests import HTTPError
+
+from procmond import daemon
+from procmond.handlers import email_alert_handler, webhook_alert_handler
+from procmond.models.alert import Alert
+
+ALERTS = [Alert(pid=1, name="evil", path="/tmp/evil", message="Process does not have executable on disk.")]
+
+
+class WebhookServer(ThreadingHTTPServer):
+    status = 200
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), WebhookRequestHandler)
+        self.clients: list[tuple[str, int]] = []
+
+
+class WebhookRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: WebhookServer
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.clients.append(self.client_address)
+        self.send_response(self.server.status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *_args: object) -> None:
+        pass
+
+
+class SMTPServer(ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), SMTPRequestHandler)
+        self.connections: list[socket.socket] = []
+        self.commands: list[bytes] = []
+        self.messages = 0
+
+    def drop_connections(self) -> None:
+        for conn in self.connections:
+            conn.shutdown(socket.SHUT_RDWR)
+
+
+class SMTPRequestHandler(StreamRequestHandler):
+    server: SMTPServer
+
+    def handle(self) -> None:
+        self.server.connections.append(self.connection)
+        self.wfile.write(b"220 localhost ESMTP\r\n")
+        for line in self.rfile:
+            command = line.split()[0].upper()
+            self.server.commands.append(command)
+            if command == b"DATA":
+                self.wfile.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                for data in self.rfile:
+                    if data == b".\r\n":
+                        break
+                self.server.messages += 1
+            elif command == b"QUIT":
+                self.wfile.write(b"221 Bye\r\n")
+                return
+            self.wfile.write(b"250 OK\r\n")
+
+
+@pytest.fixture
+def webhook_server(monkeypatch) -> Iterator[WebhookServer]:
+    server = WebhookServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(daemon.config, "webhook_address", f"http://127.0.0.1:{server.server_port}/hook", raising=False)
+    yield server
+    webhook_alert_handler.get_client().close()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def smtp_server(monkeypatch) -> Iterator[SMTPServer]:
+    server = SMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings = {
+        "subject_prefix": "test",
+        "smtp_server_address": "127.0.0.1",
+        "smtp_server_port": server.server_address[1],
+        "smtp_server_username": "",
+        "smtp_server_password": "",
+        "sender_address": "root@localhost",
+        "destination_address": "root@localhost",
+        "smtp_server_use_ssl": False,
+    }
+    for key, value in settings.items():
+        monkeypatch.setitem(daemon.config.email_config, key, value)
+    yield server
+    email_alert_handler.get_client().close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_webhook_reuses_its_connection(webhook_server: WebhookServer, monkeypatch) -> None:
+    for _ in range(3):
+        webhook_alert_handler.webhook_alert_handler(ALERTS)
+    assert len(webhook_server.clients) == 3
+    assert len(set(webhook_server.clients)) == 1
+
+    # an idle session is replaced with a new connection
+    monkeypatch.setattr(webhook_alert_handler.get_client(), "idle_timeout", -1)
+    webhook_alert_handler.webhook_alert_handler(ALERTS)
+    assert len(set(webhook_server.clients)) == 2
+
+
+def test_webhook_errors_are_raised(webhook_server: WebhookServer) -> None:
+    # any 2xx status is a delivery
+    webhook_server.status = 202
+    webhook_alert_handler.webhook_alert_handler(ALERTS)
+
+    webhook_server.status = 503
+    with pytest.raises(HTTPError, match="503"):
+        webhook_alert_handler.webhook_alert_handler(ALERTS)
+
+
+def test_smtp_reuses_its_connection_and_reconnects(smtp_server: SMTPServer) -> None:
+    for _ in range(3):
+        email_alert_handler.email_alert_handler(ALERTS)
+    assert smtp_server.messages == 3
+    assert len(smtp_server.connections) == 1
+    assert smtp_server.commands.count(b"NOOP") == 2
+
+    smtp_server.drop_connections()
+    email_alert_handler.email_alert_handler(ALERTS)
+    assert smtp_server.messages == 4
+    assert len(smtp_server.connections) == 2
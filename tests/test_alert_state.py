@@ -0,0 +1,111 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from procmond.core.alert_state import AlertState
+from procmond.core.collector import ScanDiff
+from procmond.core.detector_engine import DetectorEngine
+from procmond.core.detector_registry import DetectionContext, DetectorRegistry
+from procmond.models.alert import Alert, AlertStatus
+from procmond.models.process_record import ProcessRecord
+
+
+def make_alert(pid: int, detector: str = "missing_exe", file_hash: str = "") -> Alert:
+    return Alert(
+        pid=pid,
+        name="evil",
+        path="/tmp/evil",
+        message="Process does not have executable on disk.",
+        create_time=1.0,
+        file_hash=file_hash,
+        detector=detector,
+    )
+
+
+def statuses(alerts: list[Alert]) -> list[tuple[int, AlertStatus]]:
+    return [(a.pid, a.status) for a in alerts]
+
+
+def test_repeated_alerts_are_suppressed_until_a_reminder_is_due() -> None:
+    now = [0.0]
+    state = AlertState(suppression_seconds=60, clock=lambda: now[0])
+
+    assert statuses(state.update([make_alert(1), make_alert(2)])) == [(1, "new"), (2, "new")]
+    now[0] = 30
+    assert state.update([make_alert(1), make_alert(2)]) == []
+    # a changed hash is a different change to an executable, but the same missing executable
+    changed = [make_alert(1, file_hash="abc"), make_alert(2, "hash_change", "abc")]
+    assert statuses(state.update(changed)) == [(2, "new"), (2, "resolved")]
+    now[0] = 61
+    assert statuses(state.update(changed)) == [(1, "reminder")]
+
+    resolved = state.update([make_alert(2, "hash_change", "abc")])
+    assert statuses(resolved) == [(1, "resolved")]
+    assert str(resolved[0]) == "evil(1) Process does not have executable on disk. [resolved]"
+    assert len(state) == 1
+
+
+def test_unchecked_detectors_are_not_resolved() -> None:
+    state = AlertState()
+    state.update([make_alert(1), make_alert(2, detector="hash_change")])
+
+    assert state.update([], checked=()) == []
+    assert statuses(state.update([], checked=["hash_change"])) == [(2, "resolved")]
+    assert len(state) == 1
+
+
+def test_state_is_bounded_and_can_be_disabled() -> None:
+    state = AlertState(max_entries=2)
+    state.update([make_alert(pid) for pid in range(5)])
+    assert len(state) == 2
+    # the forgotten conditions are reported again
+    assert statuses(state.update([make_alert(0), make_alert(3), make_alert(4)], checked=())) == [(0, "new")]
+
+    unsuppressed = AlertState(suppression_seconds=0)
+    assert len(unsuppressed.update([make_alert(1)])) == len(unsuppressed.update([make_alert(1)])) == 1
+
+
+def test_registry_tags_alerts_with_their_detector(monkeypatch) -> None:
+    registry = DetectorRegistry(disabled=["hash_change", "duplicate_name"])
+    state = AlertState()
+    context = DetectionContext(snapshot=[], diff=object(), state=None, database_path="")  # type: ignore[arg-type]
+    monkeypatch.setattr(
+        "procmond.core.detector_registry.MissingExeDetector.detect", lambda _self, _context: [make_alert(1, "")]
+    )
+    registry.load()
+
+    alerts = state.update(registry.run(context), registry.completed)
+
+    assert [a.detector for a in alerts] == ["missing_exe"]
+    assert registry.completed == ["missing_exe"]
+
+
+def test_deferred_hashing_does_not_churn_alerts() -> None:
+    records = []
+    for pid, path in ((1, "/usr/sbin/sshd"), (2, "/tmp/sshd")):
+        pr = ProcessRecord(pid)
+        pr.name = "sshd"
+        pr.path = path
+        pr.create_time = 1.0
+        pr.hash = f"hash{pid}"
+        records.append(pr)
+    engine = DetectorEngine()
+    registry = DetectorRegistry()
+    registry.load()
+    state = AlertState()
+
+    def cycle(diff: ScanDiff) -> list[tuple[int, AlertStatus]]:
+        engine.apply(diff)
+        context = DetectionContext(snapshot=records, diff=diff, state=engine, database_path="")
+        return statuses(state.update(registry.run(context), checked=registry.completed))
+
+    # neither path exists here, so each process is also reported as missing its executable
+    assert cycle(ScanDiff(current=records, spawned=records, exited=[], unchanged=[])) == [
+        (1, "new"),
+        (2, "new"),
+        (1, "new"),
+    ]
+    for file_hash in (None, "hash1", None, "hash1"):
+        # hashing of /usr/sbin/sshd is deferred on every other cycle
+        records[0].hash = file_hash
+        assert cycle(ScanDiff(current=records, spawned=[], exited=[], unchanged=records)) == []
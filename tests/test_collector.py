@@ -0,0 +1,203 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import hashlib
+import os
+from functools import partial
+from pathlib import Path
+
+import pytest
+from psutil import AccessDenied
+
+from procmond.core import collector, file_probe
+from procmond.core.collector import CollectorBackend, ProcessCollector, ProcfsBackend, ShardedBackend
+from procmond.core.hashing import HashingEngine
+
+
+class FakeProcess:
+    def __init__(self, pid: int, name: str, exe: str, create_time: float = 1.0, *, denied: bool = False) -> None:
+        self.pid = pid
+        self.info = {"create_time": create_time, "name": name, "ppid": 1}
+        self.__exe = exe
+        self.denied = denied
+        self.inspections = 0
+
+    def exe(self) -> str:
+        self.inspections += 1
+        if self.denied:
+            raise AccessDenied(self.pid)
+        return self.__exe
+
+
+@pytest.fixture
+def process_table(monkeypatch) -> list[FakeProcess]:
+    table: list[FakeProcess] = []
+    monkeypatch.setattr(collector, "process_iter", lambda *_args: list(table))
+    return table
+
+
+def test_only_new_processes_are_inspected(process_table: list[FakeProcess]) -> None:
+    process_table.extend(FakeProcess(pid, "worker", "/usr/bin/worker") for pid in range(1, 6))
+    process_table.append(FakeProcess(6, "secret", "/usr/bin/secret", denied=True))
+    scanner = ProcessCollector()
+
+    first = scanner.scan()
+    assert len(first.spawned) == len(first.current) == 5
+    assert not first.exited
+
+    del process_table[0]
+    process_table.append(FakeProcess(7, "worker", "/usr/bin/worker"))
+    second = scanner.scan()
+
+    assert [p.pid for p in second.spawned] == [7]
+    assert [p.pid for p in second.exited] == [1]
+    assert len(second.unchanged) == 4
+    assert all(p.inspections == 1 for p in process_table)
+
+
+def test_pid_reuse_and_exec_count_as_spawns(process_table: list[FakeProcess]) -> None:
+    process_table.extend([FakeProcess(1, "sh", "/bin/sh"), FakeProcess(2, "sh", "/bin/sh")])
+    scanner = ProcessCollector()
+    scanner.scan()
+
+    process_table[:] = [FakeProcess(1, "sh", "/bin/sh", create_time=2.0), FakeProcess(2, "evil", "/tmp/evil")]
+    diff = scanner.scan()
+
+    assert sorted(p.pid for p in diff.spawned) == [1, 2]
+    assert [p.pid for p in diff.exited] == [1]
+    assert not diff.unchanged
+
+
+def test_uninspectable_processes_are_inspected_again_after_exec(process_table: list[FakeProcess]) -> None:
+    process_table.append(FakeProcess(1, "sudo", "/usr/bin/sudo", denied=True))
+    scanner = ProcessCollector()
+    assert not scanner.scan().current
+    assert not scanner.scan().current
+    assert process_table[0].inspections == 1
+
+    # the process drops its privileges and exec()s, keeping its pid and create_time
+    process_table[0] = FakeProcess(1, "evil", "/tmp/evil")
+    diff = scanner.scan()
+
+    assert [(p.pid, p.path) for p in diff.spawned] == [(1, "/tmp/evil")]
+
+
+def write_proc_entry(proc_root: Path, pid: int, name: str, exe: Path | None, state: str = "S") -> None:
+    pid_dir = proc_root / str(pid)
+    pid_dir.mkdir()
+    fields = [state, "1", *["0"] * 17, str(pid * 100), *["0"] * 20]
+    (pid_dir / "stat").write_text(f"{pid} ({name}) {' '.join(fields)}\n")
+    if exe is not None:
+        (pid_dir / "exe").symlink_to(exe)
+
+
+def test_procfs_backend_reads_stat_and_exe(tmp_path: Path) -> None:
+    proc_root = tmp_path / "proc"
+    proc_root.mkdir()
+    (proc_root / "stat").write_text("cpu 0 0 0 0\nbtime 1000\n")
+    exe = tmp_path / "bin" / "worker"
+    exe.parent.mkdir()
+    exe.write_bytes(b"worker")
+    write_proc_entry(proc_root, 10, "worker (1)", exe)
+    write_proc_entry(proc_root, 11, "kthreadd", None)
+    write_proc_entry(proc_root, 12, "defunct", exe, state="Z")
+    (proc_root / "self").mkdir()
+
+    diff = ProcessCollector(ProcfsBackend(str(proc_root))).scan()
+
+    assert len(diff.current) == 1
+    proc = diff.current[0]
+    assert (proc.pid, proc.ppid, proc.name, proc.path) == (10, 1, "worker (1)", str(exe))
+    assert proc.create_time == 1000 + 1000 / os.sysconf("SC_CLK_TCK")
+
+
+def test_sharded_backend_matches_a_single_process_scan(tmp_path: Path) -> None:
+    proc_root = tmp_path / "proc"
+    proc_root.mkdir()
+    (proc_root / "stat").write_text("btime 1000\n")
+    exe = tmp_path / "bin" / "worker"
+    exe.parent.mkdir()
+    exe.write_bytes(b"worker")
+    for pid in range(10, 20):
+        write_proc_entry(proc_root, pid, f"worker{pid}", exe)
+    write_proc_entry(proc_root, 20, "kthreadd", None)
+    write_proc_entry(proc_root, 21, "defunct", exe, state="Z")
+    write_proc_entry(proc_root, 22, "gone", Path(f"{exe} (deleted)"))
+
+    def scan(backend: CollectorBackend) -> list[tuple]:
+        diff = ProcessCollector(backend).scan()
+        return sorted((p.pid, p.ppid, p.create_time, p.name, p.path, p.deleted, p.exists) for p in diff.current)
+
+    sharded = ShardedBackend(partial(ProcfsBackend, str(proc_root)), workers=3)
+    try:
+        assert scan(sharded) == scan(ProcfsBackend(str(proc_root)))
+        assert len(scan(sharded)) == 11
+        assert sharded.get_process(10) is not None
+    finally:
+        sharded.close()
+
+
+def test_sharded_scans_notice_exec_without_a_name_change(tmp_path: Path) -> None:
+    proc_root = tmp_path / "proc"
+    proc_root.mkdir()
+    (proc_root / "stat").write_text("btime 1000\n")
+    worker = tmp_path / "worker"
+    worker.write_bytes(b"worker")
+    write_proc_entry(proc_root, 10, "worker", worker)
+    write_proc_entry(proc_root, 11, "worker", worker)
+    sharded = ShardedBackend(partial(ProcfsBackend, str(proc_root)), workers=2)
+    try:
+        scanner = ProcessCollector(sharded)
+        scanner.scan()
+        (proc_root / "11" / "exe").unlink()
+        (proc_root / "11" / "exe").symlink_to(tmp_path / "impostor")
+        diff = scanner.scan()
+    finally:
+        sharded.close()
+
+    assert [(p.pid, p.path) for p in diff.spawned] == [(11, str(tmp_path / "impostor"))]
+    assert [p.pid for p in diff.unchanged] == [10]
+
+
+def test_observe_inspects_exec_events(tmp_path: Path) -> None:
+    proc_root = tmp_path / "proc"
+    proc_root.mkdir()
+    (proc_root / "stat").write_text("btime 1000\n")
+    exe = tmp_path / "worker"
+    exe.write_bytes(b"worker")
+    write_proc_entry(proc_root, 10, "worker", exe)
+    scanner = ProcessCollector(ProcfsBackend(str(proc_root)))
+    scanner.scan()
+
+    # pid 11 exec()s and exits before the next scan, and pid 12 is already gone when its event is handled
+    write_proc_entry(proc_root, 11, "dropper", exe)
+    diff = scanner.observe([11, 12])
+
+    assert [p.pid for p in diff.spawned] == [11]
+    assert sorted(p.pid for p in diff.current) == [10, 11]
+    (proc_root / "11" / "stat").unlink()
+    assert [p.pid for p in scanner.scan().exited] == [11]
+
+
+def test_executables_are_probed_once_and_deleted_ones_not_at_all(tmp_path: Path) -> None:
+    proc_root = tmp_path / "proc"
+    proc_root.mkdir()
+    (proc_root / "stat").write_text("btime 1000\n")
+    exe = tmp_path / "worker"
+    exe.write_bytes(b"worker")
+    write_proc_entry(proc_root, 10, "worker", exe)
+    write_proc_entry(proc_root, 11, "worker", exe)
+    # pid 12 still runs the old worker, which an upgrade has since replaced
+    write_proc_entry(proc_root, 12, "worker", Path(f"{exe} (deleted)"))
+    probed = file_probe.files_probed.value
+
+    first, second, upgraded = ProcessCollector(ProcfsBackend(str(proc_root))).scan().current
+    HashingEngine().hash_records([first, second, upgraded])
+
+    assert file_probe.files_probed.value == probed + 1
+    assert first.probe is second.probe
+    assert (upgraded.path, upgraded.deleted) == (str(exe), True)
+    assert (first.exists, upgraded.exists) == (True, False)
+    assert first.hash == hashlib.sha256(b"worker").hexdigest()
+    assert upgraded.hash == ""
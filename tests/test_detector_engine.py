@@ -0,0 +1,131 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from procmond import daemon
+from procmond.core.collector import ScanDiff
+from procmond.core.detector_engine import DetectorEngine
+from procmond.core.detectors import (
+    detect_process_with_duplicate_name,
+    detect_process_with_hash_change,
+    detect_process_without_exe,
+)
+from procmond.core.storage import ProcessStore
+from procmond.models.process_record import ProcessRecord
+
+
+def make_record(pid: int, name: str, path: Path, file_hash: str, create_time: float = 1.0) -> ProcessRecord:
+    pr = ProcessRecord(pid)
+    pr.name = name
+    pr.path = str(path)
+    pr.create_time = create_time
+    pr.hash = file_hash
+    return pr
+
+
+def make_diff(
+    spawned: list[ProcessRecord] | None = None,
+    exited: list[ProcessRecord] | None = None,
+) -> ScanDiff:
+    return ScanDiff(current=[], spawned=spawned or [], exited=exited or [], unchanged=[])
+
+
+def summarize(alerts: list) -> list[tuple[int, str, str]]:
+    return [(a.pid, a.name, a.message) for a in alerts]
+
+
+def without_pids(alerts: list) -> list[tuple[str, str]]:
+    # the SQL duplicate name detector reports an arbitrary one of the processes
+    return [(a.name, a.message) for a in alerts]
+
+
+def test_engine_follows_scan_diffs(tmp_path: Path) -> None:
+    real, fake = tmp_path / "sshd", tmp_path / "evil"
+    real.write_bytes(b"real")
+    fake.write_bytes(b"fake")
+    sshd = make_record(1, "sshd", real, "aaa")
+    impostor = make_record(2, "sshd", fake, "bbb")
+    engine = DetectorEngine()
+
+    engine.apply(make_diff(spawned=[sshd, impostor]))
+    assert summarize(engine.alerts()) == [(1, "sshd", "2 processes exist with the same name, but different paths.")]
+
+    # the executable is replaced while sshd keeps running
+    sshd.hash = "ccc"
+    engine.apply(make_diff())
+    assert summarize(engine.alerts())[0] == (
+        1,
+        "sshd",
+        "Process executable has been modified on disk while the process was running.",
+    )
+
+    real.unlink()
+    sshd.hash = ""
+    engine.apply(make_diff(exited=[impostor]))
+    assert summarize(engine.alerts()) == [
+        (1, "sshd", "Process does not have executable on disk."),
+        (1, "sshd", "Process executable has been modified on disk while the process was running."),
+    ]
+
+    engine.apply(make_diff(exited=[sshd]))
+    assert engine.alerts() == []
+    assert len(engine) == 0
+
+
+def test_rebuild_matches_sql_detectors(monkeypatch, tmp_path: Path) -> None:
+    real, fake = tmp_path / "sshd", tmp_path / "evil"
+    real.write_bytes(b"real")
+    fake.write_bytes(b"fake")
+    db = tmp_path / "test.db"
+    store = ProcessStore(str(db))
+    start = datetime.now(UTC)
+    store.write_snapshot([make_record(1, "sshd", real, "aaa"), make_record(2, "sshd", fake, "bbb")], start)
+    store.write_snapshot(
+        [make_record(1, "sshd", real, "ccc"), make_record(2, "sshd", fake, "bbb")],
+        start + timedelta(seconds=30),
+    )
+    monkeypatch.setattr(daemon.config, "database_path", str(db))
+    expected = detect_process_without_exe() + detect_process_with_hash_change() + detect_process_with_duplicate_name()
+
+    engine = DetectorEngine()
+    engine.rebuild(store.conn)
+    store.close()
+    assert len(engine) == 2
+    assert without_pids(engine.alerts()) == without_pids(expected)
+    assert summarize(engine.alerts())[0] == summarize(expected)[0]
+
+    # only sshd is still running when the daemon's first scan comes in
+    engine.apply(make_diff(spawned=[make_record(1, "sshd", real, "ccc")]))
+    assert summarize(engine.alerts()) == [
+        (1, "sshd", "Process executable has been modified on disk while the process was running."),
+    ]
+
+
+def test_deleted_executables_do_not_stand_for_their_path(tmp_path: Path) -> None:
+    exe = tmp_path / "worker"
+    exe.write_bytes(b"new")
+    old = make_record(1, "worker", exe, "")
+    old.deleted = True
+    new = make_record(2, "worker", exe, "aaa")
+    engine = DetectorEngine()
+
+    engine.apply(make_diff(spawned=[old, new]))
+    engine.apply(make_diff())
+
+    assert summarize(engine.alerts()) == [(1, "worker", "Process does not have executable on disk.")]
+
+
+def test_duplicate_names_include_deleted_executables(tmp_path: Path) -> None:
+    live = make_record(1, "foo", tmp_path / "x" / "foo", "aaa")
+    gone = make_record(2, "foo", tmp_path / "y" / "foo", "")
+    gone.deleted = True
+    engine = DetectorEngine()
+
+    engine.apply(make_diff(spawned=[live, gone]))
+
+    assert without_pids(engine.duplicate_name_alerts()) == [
+        ("foo", "2 processes exist with the same name, but different paths.")
+    ]
@@ -0,0 +1,115 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from itertools import count
+from types import SimpleNamespace
+
+import pytest
+
+from procmond.core import detector_registry
+from procmond.core.collector import ScanDiff
+from procmond.core.deadline import Deadline, deadline_scope
+from procmond.core.detector_engine import DetectorEngine
+from procmond.core.detector_registry import DetectionContext, Detector, DetectorInput, DetectorRegistry
+from procmond.models.alert import Alert
+
+
+class SlowDetector(Detector):
+    name = "slow"
+    inputs = DetectorInput.SNAPSHOT
+
+    def __init__(self) -> None:
+        self.runs = 0
+
+    def detect(self, context: DetectionContext) -> list[Alert]:
+        self.runs += 1
+        return [Alert(pid=1, name="slow", path="/slow", message=f"{len(context.snapshot)} processes")]
+
+
+def make_context(diff: ScanDiff | None = None) -> DetectionContext:
+    return DetectionContext(snapshot=[], diff=diff, state=DetectorEngine(), database_path="test.db")
+
+
+def fake_entry_point(name: str, loaded: object) -> SimpleNamespace:
+    return SimpleNamespace(name=name, value=f"plugin:{name}", load=lambda: loaded)
+
+
+def test_load_registers_builtins_and_entry_points(monkeypatch) -> None:
+    def broken() -> None:
+        raise ImportError
+
+    entry_points = [
+        fake_entry_point("slow", SlowDetector),
+        fake_entry_point("not_a_detector", object()),
+        SimpleNamespace(name="broken", value="plugin:broken", load=broken),
+    ]
+    monkeypatch.setattr(detector_registry, "entry_points", lambda **_kwargs: entry_points)
+    registry = DetectorRegistry(disabled=["hash_change"])
+    registry.load()
+
+    assert [d.name for d in registry.detectors] == ["missing_exe", "duplicate_name", "slow"]
+
+
+def test_detectors_run_only_with_their_inputs() -> None:
+    registry = DetectorRegistry()
+    registry.register(SlowDetector())
+
+    registry.run(make_context())
+    assert set(registry.timings) == {"slow"}
+
+    registry.run(make_context(ScanDiff([], [], [], [])))
+    assert set(registry.timings) == {"slow", "missing_exe", "hash_change", "duplicate_name"}
+
+
+def test_over_budget_detectors_are_skipped_with_backoff(monkeypatch) -> None:
+    # every call to the clock advances it by 50 ms, so each detector run takes 50 ms
+    clock = count(step=0.05)
+    monkeypatch.setattr(detector_registry, "perf_counter", lambda: next(clock))
+    detector = SlowDetector()
+    registry = DetectorRegistry(budget_ms=1000, budgets={"slow": 10}, over_budget="skip")
+    registry.register(detector)
+
+    with deadline_scope(Deadline.after(60)):
+        for _ in range(7):
+            registry.run(make_context())
+    # runs on cycle 1, skips 2, runs on cycle 4, skips 4, runs on cycle 9
+    assert detector.runs == 2
+    # runs for process events between scans don't count down the cycles to skip
+    for _ in range(8):
+        registry.run(make_context())
+    assert detector.runs == 2
+    with deadline_scope(Deadline.after(60)):
+        registry.run(make_context())
+        assert detector.runs == 2
+        registry.run(make_context())
+    assert detector.runs == 3
+
+
+def test_detector_names_are_made_safe_for_metric_names() -> None:
+    detector = SlowDetector()
+    detector.name = "my-plugin.rule"
+    registry = DetectorRegistry()
+    registry.register(detector)
+
+    registry.run(make_context())
+    assert "procmond_detector_my_plugin_rule_seconds" in {m.name for m in detector_registry.registry.collect()}
+
+
+def test_detectors_past_the_deadline_run_next_cycle() -> None:
+    detector = SlowDetector()
+    registry = DetectorRegistry()
+    registry.register(detector)
+
+    with deadline_scope(Deadline.after(0)):
+        assert registry.run(make_context()) == []
+        assert detector.runs == 0
+        # deferred last cycle, so it runs this one even though the deadline has passed again
+        assert len(registry.run(make_context())) == 1
+        assert registry.run(make_context()) == []
+    assert detector.runs == 1
+
+
+def test_invalid_over_budget_action() -> None:
+    with pytest.raises(ValueError, match="over-budget"):
+        DetectorRegistry(over_budget="panic")
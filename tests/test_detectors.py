@@ -3,10 +3,21 @@
 # Copyright (C) 2019 Krystal Melton
 
 import sqlite3
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
 
 from procmond import daemon
-from procmond.core.detectors import detect_process_without_exe
+from procmond.core.detectors import (
+    DETECTOR_QUERIES,
+    detect_process_with_duplicate_name,
+    detect_process_with_hash_change,
+    detect_process_without_exe,
+)
+from procmond.core.storage import ProcessStore
 from procmond.models.alert import Alert
+from procmond.models.process_record import ProcessRecord
 
 
 def create_test_db(path: str) -> sqlite3.Connection:
@@ -32,6 +43,8 @@ def test_detect_process_without_exe(monkeypatch, tmp_path) -> None:
         (1, 0, "2025-01-01", "fake", "C:/nope", 1, "", 1, 0),
     )
     conn.commit()
+    # migrate the legacy table to the current schema
+    ProcessStore(str(db)).open()
 
     # point config to our db
     monkeypatch.setattr(daemon.config, "database_path", str(db))
@@ -40,3 +53,68 @@ def test_detect_process_without_exe(monkeypatch, tmp_path) -> None:
     assert isinstance(result, list)
     assert len(result) == 1
     assert isinstance(result[0], Alert)
+
+
+def make_record(pid: int, name: str, path: str, file_hash: str, create_time: float = 1.0) -> ProcessRecord:
+    pr = ProcessRecord(pid)
+    pr.name = name
+    pr.path = path
+    pr.create_time = create_time
+    pr.hash = file_hash
+    return pr
+
+
+def test_detect_process_with_hash_change(monkeypatch, tmp_path: Path) -> None:
+    db = tmp_path / "test.db"
+    store = ProcessStore(str(db))
+    start = datetime.now(UTC)
+    store.write_snapshot([make_record(1, "sshd", "/usr/sbin/sshd", "aaa"), make_record(2, "cron", "/bin/cron", "ccc")])
+    # pid 2 is reused by a new process with a different executable hash, which is not a change
+    store.write_snapshot(
+        [make_record(1, "sshd", "/usr/sbin/sshd", "bbb"), make_record(2, "cron", "/bin/cron", "ddd", 2.0)],
+        start + timedelta(seconds=30),
+    )
+    store.close()
+    monkeypatch.setattr(daemon.config, "database_path", str(db))
+
+    result = detect_process_with_hash_change()
+    assert [(a.pid, a.path) for a in result] == [(1, "/usr/sbin/sshd")]
+
+
+def test_detect_process_with_duplicate_name(monkeypatch, tmp_path: Path) -> None:
+    db = tmp_path / "test.db"
+    store = ProcessStore(str(db))
+    store.write_snapshot([make_record(1, "sshd", "/usr/sbin/sshd", "aaa"), make_record(2, "sshd", "/tmp/sshd", "b")])
+    store.close()
+    monkeypatch.setattr(daemon.config, "database_path", str(db))
+
+    result = detect_process_with_duplicate_name()
+    assert len(result) == 1
+    assert result[0].name == "sshd"
+
+
+# Planner statistics for a history of 10M process rows: 1,000 scans of 10,000 processes, running 5,000 executables.
+TEN_MILLION_ROW_STATS = [
+    ("scans", None, "1000"),
+    ("executables", "executables_path_hash_index", "5000 2 1 1"),
+    ("process_snapshots", "sqlite_autoindex_process_snapshots_1", "10000000 10000 1"),
+    ("process_snapshots", "process_snapshots_executable_index", "10000000 2000"),
+    ("process_snapshots", "process_snapshots_pid_index", "10000000 1000 1000 1000 1000 1"),
+]
+
+
+@pytest.mark.parametrize("query", DETECTOR_QUERIES.values(), ids=DETECTOR_QUERIES.keys())
+def test_detector_queries_do_not_scan_the_history(tmp_path: Path, query: str) -> None:
+    store = ProcessStore(str(tmp_path / "test.db"))
+    conn = store.conn
+    conn.execute("ANALYZE;")
+    conn.execute("DELETE FROM sqlite_stat1;")
+    conn.executemany("INSERT INTO sqlite_stat1 (tbl, idx, stat) VALUES (?, ?, ?);", TEN_MILLION_ROW_STATS)
+    # Reloads the statistics into the planner.
+    conn.execute("ANALYZE sqlite_schema;")
+
+    plan = [detail for *_, detail in conn.execute(f"EXPLAIN QUERY PLAN {query}")]
+    store.close()
+
+    # Scanning a subquery's results is fine; scanning a table or an index is not.
+    assert not [step for step in plan if step.startswith("SCAN ") and not step.startswith("SCAN (subquery")], plan
@@ -0,0 +1,81 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import threading
+
+from procmond.core.dispatcher import AlertDispatcher, SinkWorker
+from procmond.core.metrics import registry
+from procmond.models.alert import Alert
+
+
+def make_alerts(count: int, start: int = 0) -> list[Alert]:
+    return [Alert(pid=pid, name="evil", path="/tmp/evil", message="Process is evil.") for pid in range(start, count)]
+
+
+def test_alerts_are_delivered_in_batches() -> None:
+    batches: list[list[int]] = []
+    dispatcher = AlertDispatcher(batch_size=3, linger=0.05)
+    dispatcher.add_sink("batched", lambda alerts: batches.append([a.pid for a in alerts]))
+
+    dispatcher.dispatch(make_alerts(7))
+    dispatcher.close(timeout=5)
+
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert registry.counter("procmond_alert_batched_delivered_total", "").value == 7
+
+
+def test_failed_deliveries_are_retried_then_dropped() -> None:
+    attempts: list[int] = []
+    done = threading.Event()
+
+    def flaky(alerts: list[Alert]) -> None:
+        attempts.append(len(alerts))
+        if len(attempts) < 3:
+            msg = "connection refused"
+            raise ConnectionRefusedError(msg)
+        done.set()
+
+    worker = SinkWorker("flaky", flaky, linger=0, max_retries=2, retry_delay=0.01)
+    worker.submit(make_alerts(2))
+    assert done.wait(5)
+    worker.close(timeout=5)
+    assert attempts == [2, 2, 2]
+    assert registry.counter("procmond_alert_flaky_failures_total", "").value == 2
+
+    retried = threading.Event()
+
+    def broken(_alerts: list[Alert]) -> None:
+        if done.is_set():
+            retried.set()
+        done.set()
+        raise TimeoutError
+
+    done.clear()
+    worker = SinkWorker("broken", broken, linger=0, max_retries=1, retry_delay=0.01)
+    worker.submit(make_alerts(2))
+    assert retried.wait(5)
+    worker.close(timeout=5)
+    assert registry.counter("procmond_alert_broken_dropped_total", "").value == 2
+
+
+def test_full_queues_drop_the_oldest_alerts() -> None:
+    delivered: list[int] = []
+    in_flight = threading.Event()
+    release = threading.Event()
+
+    def slow(alerts: list[Alert]) -> None:
+        in_flight.set()
+        release.wait(5)
+        delivered.extend(a.pid for a in alerts)
+
+    worker = SinkWorker("slow", slow, queue_size=2, batch_size=10, linger=0)
+    worker.submit(make_alerts(1))
+    assert in_flight.wait(5)
+    worker.submit(make_alerts(5, start=1))
+    assert len(worker) == 2
+    release.set()
+    worker.close(timeout=5)
+
+    assert delivered == [0, 3, 4]
+    assert registry.counter("procmond_alert_slow_dropped_total", "").value == 2
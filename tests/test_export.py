@@ -0,0 +1,79 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import csv
+import gzip
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from procmond.core.export import SnapshotExporter
+from procmond.core.storage import ProcessStore
+from procmond.models.process_record import ProcessRecord
+
+
+def make_record(pid: int) -> ProcessRecord:
+    pr = ProcessRecord(pid)
+    pr.name = f"proc{pid}"
+    pr.path = f"/usr/bin/proc{pid}"
+    pr.hash = "aaa"
+    return pr
+
+
+def read_csv_rows(output_dir: Path) -> list[dict[str, str]]:
+    rows = []
+    for path in sorted(output_dir.glob("date=*/*.csv.gz")):
+        with gzip.open(path, "rt", newline="") as f:
+            rows.extend(csv.DictReader(f))
+    return rows
+
+
+def test_export_is_chunked_partitioned_and_incremental(tmp_path: Path) -> None:
+    database = str(tmp_path / "test.db")
+    output_dir = tmp_path / "export"
+    store = ProcessStore(database)
+    midnight = datetime(2024, 3, 1, tzinfo=UTC)
+    # three scans of three processes either side of midnight
+    for minutes in (-2, -1, 1):
+        store.write_snapshot([make_record(pid) for pid in (1, 2, 3)], midnight + timedelta(minutes=minutes))
+
+    exporter = SnapshotExporter(database, output_dir, export_format="csv", chunk_rows=4)
+    result = exporter.run()
+
+    assert (result.rows_exported, result.last_scan_id) == (9, 3)
+    # chunks of 4, 4 and 1 rows, the second split at midnight
+    assert result.files_written == 4
+    assert sorted(p.name for p in output_dir.iterdir()) == ["date=2024-02-29", "date=2024-03-01", "export-state.json"]
+    rows = read_csv_rows(output_dir)
+    assert [(row["scan_id"], row["pid"]) for row in rows] == [(str(s), str(p)) for s in (1, 2, 3) for p in (1, 2, 3)]
+    assert rows[0]["path"] == "/usr/bin/proc1"
+
+    assert exporter.run().rows_exported == 0
+    store.write_snapshot([make_record(4)], midnight + timedelta(minutes=2))
+    result = SnapshotExporter(database, output_dir, export_format="csv").run()
+    assert (result.rows_exported, result.last_scan_id) == (1, 4)
+    assert len(read_csv_rows(output_dir)) == 10
+    store.close()
+
+
+def test_parquet_export(tmp_path: Path) -> None:
+    pq = pytest.importorskip("pyarrow.parquet")
+    database = str(tmp_path / "test.db")
+    store = ProcessStore(database)
+    store.write_snapshot([make_record(1), make_record(2)])
+    store.close()
+
+    result = SnapshotExporter(database, tmp_path / "export", export_format="parquet").run()
+
+    assert result.files_written == 1
+    (path,) = (tmp_path / "export").glob("date=*/*.parquet")
+    table = pq.read_table(path)
+    assert table.column("pid").to_pylist() == [1, 2]
+    assert table.column("valid").to_pylist() == [True, True]
+
+
+def test_unknown_export_format(tmp_path: Path) -> None:
+    with pytest.raises(ValueError, match="export format"):
+        SnapshotExporter(str(tmp_path / "test.db"), tmp_path, export_format="xlsx")
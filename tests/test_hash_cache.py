@@ -0,0 +1,71 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import hashlib
+import os
+import sqlite3
+from collections.abc import Callable
+from pathlib import Path
+
+from procmond.core.hash_cache import FileIdentity, HashCache
+from procmond.core.hashing import hash_file
+from procmond.models.process_record import ProcessRecord
+
+
+def counting_hasher(calls: list[str]) -> Callable[[str], str]:
+    def compute(file_path: str) -> str:
+        calls.append(file_path)
+        return hash_file(file_path)
+
+    return compute
+
+
+def test_digest_is_cached_until_file_changes(tmp_path: Path) -> None:
+    f = tmp_path / "fakeexe.bin"
+    f.write_bytes(b"hello world")
+    cache = HashCache()
+    calls: list[str] = []
+
+    assert cache.digest(str(f), counting_hasher(calls)) == hashlib.sha256(b"hello world").hexdigest()
+    assert cache.digest(str(f), counting_hasher(calls)) == hashlib.sha256(b"hello world").hexdigest()
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    f.write_bytes(b"goodbye world")
+    os.utime(f, ns=(0, 0))
+    assert cache.digest(str(f), counting_hasher(calls)) == hashlib.sha256(b"goodbye world").hexdigest()
+    assert len(calls) == 2
+
+
+def test_records_sharing_an_executable_hash_it_once(tmp_path: Path, monkeypatch) -> None:
+    f = tmp_path / "fakeexe.bin"
+    f.write_bytes(b"shared")
+    cache = HashCache()
+    monkeypatch.setattr(ProcessRecord, "hash_cache", cache)
+
+    for pid in range(10):
+        pr = ProcessRecord(pid)
+        pr.path = str(f)
+        assert pr.hash == pr.hash == hashlib.sha256(b"shared").hexdigest()
+
+    assert (cache.hits, cache.misses) == (9, 1)
+
+
+def test_lru_eviction_and_persistence(tmp_path: Path) -> None:
+    cache = HashCache(max_entries=2)
+    identities = [FileIdentity(1, inode, 10, 0, 0) for inode in range(3)]
+    for identity in identities:
+        cache.put(identity, f"digest-{identity.inode}")
+
+    assert len(cache) == 2
+    assert cache.get(identities[0]) is None
+
+    with sqlite3.connect(tmp_path / "test.db") as conn:
+        HashCache.create_schema(conn.cursor())
+        cache.flush(conn)
+        reloaded = HashCache(max_entries=2)
+        reloaded.load(conn)
+
+    assert reloaded.get(identities[1]) == "digest-1"
+    assert reloaded.get(identities[2]) == "digest-2"
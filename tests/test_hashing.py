@@ -0,0 +1,79 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import hashlib
+from pathlib import Path
+
+from procmond.core.deadline import Deadline, deadline_scope
+from procmond.core.hash_cache import HashCache
+from procmond.core.hashing import HashingEngine, hash_file
+from procmond.models.process_record import ProcessRecord
+
+
+def test_hash_file_buffered_and_mmap_agree(tmp_path: Path) -> None:
+    f = tmp_path / "large.bin"
+    content = bytes(range(256)) * 4096
+    f.write_bytes(content)
+    expected = hashlib.sha256(content).hexdigest()
+
+    assert hash_file(str(f), buffer_size=1000, mmap_threshold=0) == expected
+    assert hash_file(str(f), mmap_threshold=1) == expected
+
+
+def test_hash_records_shares_digests_between_records(tmp_path: Path) -> None:
+    paths = []
+    for i in range(4):
+        f = tmp_path / f"exe{i}"
+        f.write_bytes(f"binary {i}".encode())
+        paths.append(f)
+    records = []
+    for pid in range(12):
+        pr = ProcessRecord(pid)
+        pr.path = str(paths[pid % 4])
+        records.append(pr)
+
+    cache = HashCache()
+    engine = HashingEngine(cache, workers=3)
+    engine.hash_records(records)
+    engine.hash_records(records)
+    engine.close()
+
+    for pr in records:
+        assert pr.hash == hashlib.sha256(Path(pr.path).read_bytes()).hexdigest()
+        assert pr.accessible is True
+    assert engine.files_hashed == 4
+    assert (cache.hits, cache.misses) == (4, 4)
+
+
+def test_byte_budget_defers_remaining_files(tmp_path: Path) -> None:
+    paths = []
+    for i in range(3):
+        f = tmp_path / f"exe{i}"
+        f.write_bytes(b"x" * 100)
+        paths.append(str(f))
+
+    engine = HashingEngine(HashCache(), byte_budget=150)
+    first = engine.hash_paths(paths)
+    second = engine.hash_paths(paths)
+    engine.close()
+
+    assert sum(digest is None for digest in first.values()) == 2
+    assert sum(digest is None for digest in second.values()) == 1
+    assert engine.files_deferred == 3
+
+
+def test_expired_deadline_defers_files_to_the_next_cycle(tmp_path: Path) -> None:
+    f = tmp_path / "exe"
+    f.write_bytes(b"binary")
+
+    engine = HashingEngine(HashCache())
+    with deadline_scope(Deadline.after(0)):
+        late = engine.hash_paths([str(f)])
+    with deadline_scope(Deadline.after(60)):
+        on_time = engine.hash_paths([str(f)])
+    engine.close()
+
+    assert late == {str(f): None}
+    assert on_time == {str(f): hashlib.sha256(b"binary").hexdigest()}
+    assert engine.files_deferred == 1
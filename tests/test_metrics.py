@@ -0,0 +1,51 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import pytest
+
+from procmond.core.metrics import MetricsRegistry
+from procmond.core.metrics_server import MetricsServer
+
+
+def test_registry_renders_prometheus_text() -> None:
+    metrics = MetricsRegistry()
+    metrics.counter("procmond_rows_total", "Rows written.").inc(3)
+    metrics.gauge("procmond_lag_seconds", "Scan lag.").set(0.25)
+    histogram = metrics.histogram("procmond_scan_seconds", "Scan time.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert metrics.render().splitlines() == [
+        "# HELP procmond_lag_seconds Scan lag.",
+        "# TYPE procmond_lag_seconds gauge",
+        "procmond_lag_seconds 0.25",
+        "# HELP procmond_rows_total Rows written.",
+        "# TYPE procmond_rows_total counter",
+        "procmond_rows_total 3",
+        "# HELP procmond_scan_seconds Scan time.",
+        "# TYPE procmond_scan_seconds histogram",
+        'procmond_scan_seconds_bucket{le="0.1"} 2',
+        'procmond_scan_seconds_bucket{le="1"} 3',
+        'procmond_scan_seconds_bucket{le="+Inf"} 4',
+        "procmond_scan_seconds_sum 2.65",
+        "procmond_scan_seconds_count 4",
+    ]
+
+
+def test_server_exposes_metrics() -> None:
+    metrics = MetricsRegistry()
+    metrics.counter("procmond_alerts_emitted_total", "Alerts sent.").inc()
+    server = MetricsServer("127.0.0.1", 0, metrics)
+    assert server.start()
+    try:
+        with urlopen(f"http://127.0.0.1:{server.port}/metrics", timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "procmond_alerts_emitted_total 1" in response.read().decode()
+        with pytest.raises(HTTPError, match="404"):
+            urlopen(f"http://127.0.0.1:{server.port}/", timeout=5)
+    finally:
+        server.stop()
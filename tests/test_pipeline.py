@@ -0,0 +1,83 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from procmond.core import pipeline
+from procmond.core.collector import ScanDiff
+from procmond.core.pipeline import Pipeline
+from procmond.models.alert import Alert
+from procmond.models.process_record import ProcessRecord
+from procmond.models.process_snapshot import ProcessSnapshot
+
+
+def make_diff() -> ScanDiff:
+    record = ProcessRecord(1)
+    record.name = "evil"
+    return ScanDiff([record], [record], [], [])
+
+
+def test_slow_alert_delivery_does_not_delay_scans() -> None:
+    scan_times: list[float] = []
+    stored: list[ProcessSnapshot] = []
+    delivered: list[list[Alert]] = []
+    last_scan = threading.Event()
+
+    def collect() -> ScanDiff:
+        scan_times.append(time.monotonic())
+        if len(scan_times) == 6:
+            last_scan.set()
+        return make_diff()
+
+    def detect(_diff: ScanDiff) -> list[Alert]:
+        return [Alert(pid=len(scan_times), name="evil", path="/tmp/evil", message="Process is evil.")]
+
+    def deliver(alerts: list[Alert]) -> None:
+        # delivery is stuck until every scan has run
+        last_scan.wait(5)
+        delivered.append(alerts)
+
+    dropped = pipeline.alert_batches_dropped.value
+    runner = Pipeline(0.05, collect=collect, store=stored.append, detect=detect, deliver=deliver, queue_size=1)
+    asyncio.run(runner.run(cycles=6))
+    runner.close()
+
+    assert len(scan_times) == len(stored) == 6
+    assert scan_times[-1] - scan_times[0] < 0.5
+    assert all(isinstance(snapshot, ProcessSnapshot) for snapshot in stored)
+    # the oldest waiting batches made way for newer ones, and the newest was delivered
+    assert len(delivered) + pipeline.alert_batches_dropped.value - dropped == 6
+    assert pipeline.alert_batches_dropped.value - dropped >= 3
+    assert delivered[-1][0].pid == 6
+
+
+def test_overrunning_scans_skip_missed_ticks() -> None:
+    def collect() -> ScanDiff:
+        time.sleep(0.12)
+        return make_diff()
+
+    skipped = pipeline.scans_skipped.value
+    runner = Pipeline(
+        0.05, collect=collect, store=lambda _snapshot: None, detect=lambda _diff: [], deliver=lambda _alerts: None
+    )
+    asyncio.run(runner.run(cycles=3))
+    runner.close()
+
+    # each 120 ms scan misses one 50 ms tick before the next scan starts
+    assert pipeline.scans_skipped.value >= skipped + 2
+
+
+def test_stage_failures_stop_the_pipeline() -> None:
+    def store(_snapshot: ProcessSnapshot) -> None:
+        msg = "disk full"
+        raise OSError(msg)
+
+    runner = Pipeline(0.01, collect=make_diff, store=store, detect=lambda _diff: [], deliver=lambda _alerts: None)
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(runner.run())
+    runner.close()
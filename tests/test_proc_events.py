@@ -0,0 +1,55 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import struct
+
+from procmond.core import proc_events
+from procmond.core.proc_events import (
+    CN_MSG,
+    NLMSG_DONE,
+    NLMSGHDR,
+    PROC_EVENT_EXEC,
+    PROC_EVENT_EXIT,
+    PROC_EVENT_FORK,
+    ProcEvent,
+    ProcEventListener,
+    parse_events,
+)
+
+
+def make_message(what: int, *data: int) -> bytes:
+    payload = struct.pack(f"=IIQ{len(data)}I", what, 0, 0, *data)
+    cn_msg = CN_MSG.pack(1, 1, 0, 0, len(payload), 0)
+    return NLMSGHDR.pack(NLMSGHDR.size + len(cn_msg) + len(payload), NLMSG_DONE, 0, 0, 0) + cn_msg + payload
+
+
+def test_parse_events_skips_threads() -> None:
+    data = b"".join(
+        [
+            make_message(PROC_EVENT_FORK, 1, 1, 100, 100),
+            # a new thread in process 100
+            make_message(PROC_EVENT_FORK, 100, 100, 101, 100),
+            make_message(PROC_EVENT_EXEC, 100, 100),
+            make_message(PROC_EVENT_EXIT, 100, 100, 0, 17),
+        ]
+    )
+
+    assert parse_events(data) == [
+        ProcEvent(PROC_EVENT_FORK, 100, 100),
+        ProcEvent(PROC_EVENT_EXEC, 100, 100),
+        ProcEvent(PROC_EVENT_EXIT, 100, 100),
+    ]
+
+
+def test_listener_falls_back_when_unavailable(monkeypatch) -> None:
+    def denied(*_args: object) -> None:
+        raise PermissionError(1, "Operation not permitted")
+
+    monkeypatch.setattr(proc_events.socket, "socket", denied)
+    listener = ProcEventListener()
+
+    assert listener.start() is False
+    assert not listener.running
+    assert listener.wait(0) == []
+    listener.stop()
@@ -0,0 +1,64 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from pathlib import Path
+
+import pytest
+
+from procmond.core.storage import ProcessStore
+from procmond.models.process_record import ProcessRecord
+from procmond.models.process_snapshot import ProcessSnapshot
+
+
+def make_records(tmp_path: Path) -> list[ProcessRecord]:
+    exe = tmp_path / "worker"
+    exe.write_bytes(b"worker")
+    records = []
+    for pid in range(1, 101):
+        pr = ProcessRecord(pid)
+        pr.name = "worker"
+        pr.ppid = 1
+        pr.create_time = 1000.0 + pid
+        pr.path = str(exe) if pid % 10 else str(tmp_path / "deleted")
+        pr.hash = "abc" if pid % 10 else ""
+        records.append(pr)
+    kernel_thread = ProcessRecord(200)
+    kernel_thread.name = "kthreadd"
+    records.append(kernel_thread)
+    return records
+
+
+def test_rows_read_like_records(tmp_path: Path) -> None:
+    records = make_records(tmp_path)
+    snapshot = ProcessSnapshot.from_records(records)
+
+    assert len(snapshot) == len(records)
+    assert [row.to_dict for row in snapshot] == [record.to_dict for record in records]
+    assert [row.create_time for row in snapshot] == [record.create_time for record in records]
+    assert str(snapshot[-1]) == "kthreadd (200)"
+    with pytest.raises(IndexError):
+        snapshot[len(records)]
+    # every process shares a name table entry, and there are only three paths
+    assert (len(snapshot.name_table), len(snapshot.path_table)) == (2, 3)
+
+    # the snapshot is a copy, unaffected by the next scan
+    records[0].path = "/bin/other"
+    assert snapshot[0].path == str(tmp_path / "worker")
+
+
+def test_snapshot_is_smaller_and_can_be_stored(tmp_path: Path) -> None:
+    records = make_records(tmp_path)
+    snapshot = ProcessSnapshot.from_records(records)
+    assert snapshot.nbytes < len(records) * 100
+
+    store = ProcessStore(str(tmp_path / "test.db"))
+    store.open()
+    assert store.write_snapshot(snapshot) == 100
+    rows = store.conn.execute(
+        'SELECT p.pid, p.create_time, e."hash", e.file_exists FROM process_snapshots p '
+        "JOIN executables e ON e.id = p.executable_id ORDER BY p.pid LIMIT 10;"
+    ).fetchall()
+    store.close()
+    assert rows[-1] == (10, 1010.0, "", 0)
+    assert rows[0] == (1, 1001.0, "abc", 1)
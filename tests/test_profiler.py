@@ -0,0 +1,47 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import asyncio
+import pstats
+import time
+
+import pytest
+
+from procmond.core.collector import ScanDiff
+from procmond.core.pipeline import Pipeline
+from procmond.core.profiler import CycleProfiler
+
+
+def slow_collect() -> ScanDiff:
+    deadline = time.perf_counter() + 0.03
+    while time.perf_counter() < deadline:
+        pass
+    return ScanDiff([], [], [], [])
+
+
+@pytest.mark.parametrize("mode", ["sample", "cprofile"])
+def test_profile_covers_requested_cycles_then_switches_off(tmp_path, mode) -> None:
+    profiler = CycleProfiler(tmp_path, mode=mode, sample_interval=0.001)
+    profiler.request(2)
+    runner = Pipeline(
+        0.01,
+        collect=slow_collect,
+        store=lambda _snapshot: None,
+        detect=lambda _diff: [],
+        deliver=lambda _alerts: None,
+        profiler=profiler,
+    )
+    asyncio.run(runner.run(cycles=4))
+    runner.close()
+
+    assert not profiler.active
+    (profile,) = tmp_path.iterdir()
+    if mode == "sample":
+        assert profile.suffix == ".folded"
+        stacks = [line.rsplit(" ", 1)[0] for line in profile.read_text().splitlines()]
+        assert any(stack.startswith("collect;") and "slow_collect" in stack for stack in stacks)
+    else:
+        assert profile.suffix == ".pstats"
+        functions = {name for _file, _line, name in pstats.Stats(str(profile)).stats}  # type: ignore[attr-defined]
+        assert "slow_collect" in functions
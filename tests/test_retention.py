@@ -0,0 +1,73 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+from procmond.core.retention import Compactor
+from procmond.core.storage import ProcessStore
+from procmond.models.process_record import ProcessRecord
+
+
+def make_record(pid: int, file_hash: str) -> ProcessRecord:
+    pr = ProcessRecord(pid)
+    pr.name = f"proc{pid}"
+    pr.path = f"/usr/bin/proc{pid}"
+    pr.create_time = 1.0
+    pr.hash = file_hash
+    return pr
+
+
+def test_old_scans_are_compacted_to_change_events(tmp_path: Path) -> None:
+    store = ProcessStore(str(tmp_path / "test.db"))
+    now = datetime.now(UTC)
+    for minutes in range(60, 0, -1):
+        # process 1 is unchanged throughout; process 2's executable changes 30 minutes ago
+        records = [make_record(1, "aaa"), make_record(2, "bbb" if minutes > 30 else "ccc")]
+        store.write_snapshot(records, now - timedelta(minutes=minutes))
+
+    compactor = Compactor(store, retention_hours=0.25, batch_size=7, budget_ms=10_000)
+    result = compactor.run(now)
+
+    # 45 scans are older than the 15 minute retention period; all but 3 of their 90 rows are redundant
+    assert result.rows_deleted == 87
+    assert result.scans_compacted == 45
+    # only the first scan and the one where process 2 changed have rows left
+    assert result.scans_deleted == 43
+    assert result.pages_reclaimed >= 0
+    history = store.conn.execute(
+        'SELECT id, "hash", count(*) FROM processes GROUP BY id, "hash" ORDER BY id, "hash";'
+    ).fetchall()
+    assert history == [(1, "aaa", 16), (2, "bbb", 1), (2, "ccc", 16)]
+    assert compactor.run(now).rows_deleted == 0
+    store.close()
+
+
+def test_reverted_executables_are_kept(tmp_path: Path) -> None:
+    store = ProcessStore(str(tmp_path / "test.db"))
+    now = datetime.now(UTC)
+    # the executable goes from A to B and back to A, two scans each
+    for minutes, file_hash in zip(range(60, 0, -10), "AABBAA", strict=True):
+        store.write_snapshot([make_record(1, file_hash)], now - timedelta(minutes=minutes))
+
+    result = Compactor(store, retention_hours=0.1).run(now)
+
+    # the newest scan is kept even though its only row was redundant
+    assert (result.rows_deleted, result.scans_deleted) == (3, 2)
+    history = store.conn.execute('SELECT "hash" FROM processes ORDER BY updated_at;').fetchall()
+    assert history == [("A",), ("B",), ("A",)]
+    store.close()
+
+
+def test_compaction_stops_at_the_time_budget(tmp_path: Path) -> None:
+    store = ProcessStore(str(tmp_path / "test.db"))
+    now = datetime.now(UTC)
+    for minutes in range(20, 0, -1):
+        store.write_snapshot([make_record(1, "aaa")], now - timedelta(hours=minutes))
+
+    result = Compactor(store, retention_hours=1, budget_ms=0).run(now)
+
+    assert result.rows_deleted == 0
+    assert Compactor(store, retention_hours=1).run(now).rows_deleted == 18
+    store.close()
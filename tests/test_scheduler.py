@@ -0,0 +1,52 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+from procmond.core import scheduler
+from procmond.core.collector import ScanDiff
+from procmond.core.scheduler import AdaptiveScheduler
+from procmond.models.process_record import ProcessRecord
+
+
+def make_diff(current: int, changed: int = 0) -> ScanDiff:
+    records = [ProcessRecord(pid) for pid in range(current)]
+    return ScanDiff(records, records[:changed], [], records[changed:])
+
+
+def test_interval_follows_churn_and_alerts_within_bounds() -> None:
+    schedule = AdaptiveScheduler(30, min_interval=5, max_interval=60, cpu_budget=0, cpu_clock=lambda: 0.0)
+
+    assert schedule.next_interval(make_diff(100)) == 37.5
+    assert schedule.reason == "idle"
+    for _ in range(5):
+        schedule.next_interval(make_diff(100))
+    assert schedule.interval == 60
+
+    assert schedule.next_interval(make_diff(1000, changed=5)) == 60
+    assert schedule.reason == "steady"
+
+    assert schedule.next_interval(make_diff(100, changed=10)) == 30
+    schedule.record_alerts(3)
+    assert schedule.next_interval(make_diff(100)) == 15
+    assert schedule.reason == "activity"
+    for _ in range(3):
+        schedule.next_interval(make_diff(100, changed=10))
+    assert schedule.interval == 5
+    assert scheduler.scan_interval.value == 5
+    assert scheduler.interval_reasons["activity"].value == 1
+    assert scheduler.interval_reasons["idle"].value == 0
+
+
+def test_cpu_budget_holds_the_interval_back() -> None:
+    cpu = [0.0]
+    schedule = AdaptiveScheduler(10, min_interval=1, max_interval=60, cpu_budget=0.05, cpu_clock=lambda: cpu[0])
+    schedule.next_interval(make_diff(100, changed=50))
+
+    # a cycle took 1 s of CPU, so scans may come no more than once every 20 s
+    cpu[0] += 1
+    assert schedule.next_interval(make_diff(100, changed=50)) == 20
+    assert schedule.reason == "cpu_budget"
+
+    cpu[0] += 0.1
+    assert schedule.next_interval(make_diff(100, changed=50)) == 10
+    assert schedule.reason == "activity"
@@ -0,0 +1,56 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import os
+import subprocess
+import sys
+
+# Modules that only some commands or configurations need, and that are slow to import.
+LAZY_MODULES = {
+    "rich",
+    "requests",
+    "smtplib",
+    "asyncio",
+    "http.server",
+    "multiprocessing",
+    "importlib.metadata",
+    "cProfile",
+    "procmond.core.metrics_server",
+    "procmond.core.pipeline",
+    "procmond.handlers.email_alert_handler",
+    "procmond.handlers.webhook_alert_handler",
+}
+# A generous bound on importing the CLI and the daemon, in microseconds, to catch a heavy import sneaking back in.
+IMPORT_BUDGET_US = 200_000
+
+
+def import_times(code: str) -> dict[str, int]:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, check=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self, cumulative, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_importing_the_daemon_is_cheap_and_has_no_side_effects() -> None:
+    times = import_times("import procmond.cli, procmond.daemon as d; assert 'config' not in vars(d)")
+
+    assert LAZY_MODULES.isdisjoint(times)
+    assert "procmond.core.config_manager" in times
+    assert times["procmond.cli"] + times["procmond.daemon"] < IMPORT_BUDGET_US
+
+
+def test_importing_the_alert_handlers_does_not_load_the_config() -> None:
+    # The config is loaded when the daemon is configured, so that --config and set_config() are honoured.
+    import_times(
+        "import procmond.handlers.email_alert_handler, procmond.handlers.webhook_alert_handler\n"
+        "from procmond.core import config_manager\n"
+        "assert config_manager._config is None"
+    )
@@ -0,0 +1,119 @@
+#  ProcMonD-Prototype - A simple daemon for monitoring running processes for suspicious behavior.
+# SPDX-License-Identifier: GPL-3.0-or-later
+# Copyright (C) 2019 Krystal Melton
+
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from procmond.core import storage
+from procmond.core.hash_cache import HashCache
+from procmond.core.storage import SCHEMA_VERSION, ProcessStore
+from procmond.models.process_record import ProcessRecord
+
+
+def make_records(tmp_path: Path, count: int) -> list[ProcessRecord]:
+    exe = tmp_path / "fakeexe.bin"
+    exe.write_bytes(b"hello world")
+    records = []
+    for pid in range(count):
+        pr = ProcessRecord(pid)
+        pr.name = "fake"
+        pr.path = str(exe)
+        records.append(pr)
+    return records
+
+
+def test_open_migrates_once_and_enables_wal(tmp_path: Path) -> None:
+    db = tmp_path / "test.db"
+    store = ProcessStore(str(db))
+    store.open()
+    assert store.conn.execute("PRAGMA journal_mode;").fetchone() == ("wal",)
+    assert store.conn.execute("PRAGMA user_version;").fetchone() == (SCHEMA_VERSION,)
+    store.close()
+
+    with sqlite3.connect(db) as conn:
+        conn.execute("DROP INDEX process_snapshots_executable_index;")
+    store.open()
+    indexes = store.conn.execute("SELECT name FROM sqlite_master WHERE type = 'index';").fetchall()
+    assert ("process_snapshots_executable_index",) not in indexes
+    store.close()
+
+
+def test_write_snapshot_batches_rows_and_flushes_hash_cache(tmp_path: Path, monkeypatch) -> None:
+    cache = HashCache()
+    monkeypatch.setattr(ProcessRecord, "hash_cache", cache)
+    records = make_records(tmp_path, 50)
+    records[0].path = "/"
+    store = ProcessStore(str(tmp_path / "test.db"), synchronous="full", hash_cache=cache)
+    transactions = storage.transactions.value
+
+    assert store.write_snapshot(records) == 49
+    assert storage.transactions.value == transactions + 1
+    assert store.conn.execute("SELECT count(*), count(DISTINCT updated_at) FROM processes;").fetchone() == (49, 1)
+    assert store.conn.execute("SELECT count(*) FROM executables;").fetchone() == (1,)
+    assert store.conn.execute("SELECT count(*) FROM hash_cache;").fetchone() == (1,)
+    store.close()
+
+
+def test_evicted_executables_are_found_again(tmp_path: Path) -> None:
+    records = make_records(tmp_path, 3)
+    for pr in records:
+        pr.path = f"{pr.path}.{pr.pid}"
+        pr.hash = f"hash{pr.pid}"
+    store = ProcessStore(str(tmp_path / "test.db"), executable_cache_size=2)
+
+    store.write_snapshot(records)
+    store.write_snapshot(records)
+
+    assert store.conn.execute("SELECT count(*) FROM executables;").fetchone() == (3,)
+    assert store.conn.execute("SELECT count(DISTINCT executable_id) FROM process_snapshots;").fetchone() == (3,)
+    store.close()
+
+
+def test_invalid_synchronous_level() -> None:
+    with pytest.raises(ValueError, match="synchronous"):
+        ProcessStore("test.db", synchronous="sometimes")
+
+
+def test_failed_migrations_are_rolled_back(tmp_path: Path, monkeypatch) -> None:
+    def broken_migration(conn: sqlite3.Connection) -> None:
+        conn.execute("CREATE TABLE scans (id INTEGER PRIMARY KEY);")
+        msg = "disk I/O error"
+        raise sqlite3.OperationalError(msg)
+
+    db = tmp_path / "test.db"
+    monkeypatch.setattr(storage, "MIGRATIONS", [storage.MIGRATIONS[0], broken_migration])
+    store = ProcessStore(str(db))
+    with pytest.raises(sqlite3.OperationalError, match="disk I/O"):
+        store.open()
+    store.close()
+
+    with sqlite3.connect(db) as conn:
+        assert conn.execute("PRAGMA user_version;").fetchone() == (1,)
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'scans';").fetchone() is None
+
+
+def test_migrates_legacy_processes_table(tmp_path: Path) -> None:
+    db = tmp_path / "test.db"
+    legacy = [
+        (1, 0, "2025-01-01 00:00:00", "init", "/sbin/init", 1, "aaa", 1, 1),
+        (2, 1, "2025-01-01 00:00:00", "sshd", "/usr/sbin/sshd", 1, "bbb", 1, 1),
+        (1, 0, "2025-01-01 00:00:30", "init", "/sbin/init", 1, "aaa", 1, 1),
+        (3, 1, "2025-01-01 00:00:30", "ghost", "/tmp/ghost", 1, None, 1, 0),
+    ]
+    with sqlite3.connect(db) as conn:
+        conn.execute(
+            "CREATE TABLE processes (id INTEGER, ppid INTEGER, updated_at DATETIME, name VARCHAR, "
+            'path VARCHAR, valid BIT, "hash" VARCHAR, accessible BIT, file_exists BIT, '
+            "CONSTRAINT processes_pk PRIMARY KEY (id, updated_at));",
+        )
+        conn.executemany("INSERT INTO processes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", legacy)
+
+    store = ProcessStore(str(db))
+    conn = store.conn
+    assert conn.execute("SELECT count(*) FROM scans;").fetchone() == (2,)
+    assert conn.execute("SELECT count(*) FROM executables;").fetchone() == (3,)
+    assert sorted(conn.execute("SELECT * FROM processes;").fetchall()) == sorted(legacy)
+    store.close()